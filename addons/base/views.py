@@ -36,6 +36,7 @@ from osf.models import (BaseFileNode, TrashedFileNode,
                         OSFUser, AbstractNode,
                         NodeLog, DraftRegistration, MetaSchema,
                         Guid, FileVersionUserMetadata)
+from osf.models.files import forget_waterbutler_metadata
 from website.profile.utils import get_profile_image_url
 from website.project import decorators
 from website.project.decorators import must_be_contributor_or_public, must_be_valid_project, check_contributor_auth
@@ -348,6 +349,7 @@ def create_waterbutler_log(payload, **kwargs):
 
         auth = Auth(user=user)
         node = kwargs['node'] or kwargs['project']
+        forget_waterbutler_metadata(node)
 
         if action in (NodeLog.FILE_MOVED, NodeLog.FILE_COPIED):
 
@@ -375,6 +377,7 @@ def create_waterbutler_log(payload, **kwargs):
 
             destination_node = node  # For clarity
             source_node = AbstractNode.load(payload['source']['nid'])
+            forget_waterbutler_metadata(source_node)
 
             source = source_node.get_addon(payload['source']['provider'])
             destination = node.get_addon(payload['destination']['provider'])
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('addons_wiki', '0010_migrate_node_wiki_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wikiversion',
+            name='rendered_html',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='wikiversion',
+            name='rendered_text',
+            field=models.TextField(blank=True, null=True),
+        ),
+    ]
@@ -10,6 +10,7 @@ from bleach.callbacks import nofollow
 from bleach import Cleaner
 from functools import partial
 from bleach.linkifier import LinkifyFilter
+from dirtyfields import DirtyFieldsMixin
 from django.db import models
 from framework.forms.utils import sanitize
 from markdown.extensions import codehilite, fenced_code, wikilinks
@@ -85,11 +86,14 @@ def build_wiki_url(node, label, base, end):
     return '/{pid}/wiki/{wname}/'.format(pid=node._id, wname=label)
 
 
-class WikiVersion(ObjectIDMixin, BaseModel):
+class WikiVersion(ObjectIDMixin, BaseModel, DirtyFieldsMixin):
     user = models.ForeignKey('osf.OSFUser', null=True, blank=True, on_delete=models.CASCADE)
     wiki_page = models.ForeignKey('WikiPage', null=True, blank=True, on_delete=models.CASCADE, related_name='versions')
     content = models.TextField(default='', blank=True)
     identifier = models.IntegerField(default=1)
+    # The page rendered for the node of the page, see render
+    rendered_html = models.TextField(null=True, blank=True)
+    rendered_text = models.TextField(null=True, blank=True)
 
     @property
     def is_current(self):
@@ -97,6 +101,34 @@ class WikiVersion(ObjectIDMixin, BaseModel):
 
     def html(self, node):
         """The cleaned HTML of the page"""
+        if node.id != self.wiki_page.node_id:
+            return self._render_html(node)
+        if self.rendered_html is None:
+            self.render(save=True)
+        return self.rendered_html
+
+    def raw_text(self, node):
+        """ The raw text of the page, suitable for using in a test search"""
+        if node.id != self.wiki_page.node_id:
+            return sanitize(self._render_html(node), tags=[], strip=True)
+        if self.rendered_text is None:
+            self.render(save=True)
+        return self.rendered_text
+
+    def render(self, save=False):
+        """Render the HTML and the raw text of the page for the node of the page. Versions don't
+        change once saved, so they are rendered when saved, or the first time they are shown if
+        they were saved before. With ``save``, store them without saving the version.
+        """
+        self.rendered_html = self._render_html(self.wiki_page.node)
+        self.rendered_text = sanitize(self.rendered_html, tags=[], strip=True)
+        if save and self.pk:
+            WikiVersion.objects.filter(pk=self.pk).update(
+                rendered_html=self.rendered_html,
+                rendered_text=self.rendered_text,
+            )
+
+    def _render_html(self, node):
         html_output = build_html_output(self.content, node=node)
         try:
             cleaner = Cleaner(
@@ -110,11 +142,6 @@ class WikiVersion(ObjectIDMixin, BaseModel):
             logger.warning('Returning unlinkified content.')
             return render_content(self.content, node=node)
 
-    def raw_text(self, node):
-        """ The raw text of the page, suitable for using in a test search"""
-
-        return sanitize(self.html(node), tags=[], strip=True)
-
     @property
     def rendered_before_update(self):
         return self.created < WIKI_CHANGE_DATE
@@ -141,6 +168,9 @@ class WikiVersion(ObjectIDMixin, BaseModel):
         return self.content
 
     def save(self, *args, **kwargs):
+        # Versions don't change once saved, unless they are moved to another page
+        if self.wiki_page.node and (self.pk is None or 'wiki_page' in self.get_dirty_fields(check_relationship=True)):
+            self.render()
         rv = super(WikiVersion, self).save(*args, **kwargs)
         if self.wiki_page.node:
             self.wiki_page.node.update_search()
@@ -273,9 +303,7 @@ class WikiPage(GuidMixin, BaseModel):
         new_wiki_page.user = user
         new_wiki_page.save()
         for version in self.versions.all().order_by('created'):
-            new_version = version.clone_version(new_wiki_page, user)
-            if save:
-                new_version.save()
+            version.clone_version(new_wiki_page, user)
         return
 
     @classmethod
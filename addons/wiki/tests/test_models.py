@@ -1,3 +1,4 @@
+import mock
 import pytest
 import pytz
 import datetime
@@ -5,6 +6,7 @@ from addons.wiki.exceptions import NameMaximumLengthError
 
 from addons.wiki.models import WikiPage, WikiVersion
 from addons.wiki.tests.factories import WikiFactory, WikiVersionFactory
+from osf.management.commands.backfill_wiki_rendered import backfill_wiki_rendered
 from osf_tests.factories import NodeFactory, UserFactory, ProjectFactory
 from tests.base import OsfTestCase, fake
 
@@ -47,6 +49,65 @@ class TestWikiPageModel:
         page.save()
         assert ver1.is_current is False
 
+    def test_version_is_rendered_when_saved(self):
+        node = NodeFactory()
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        version = page.create_version(user=UserFactory(), content='See [[bar]]')
+        version.reload()
+        assert '/{}/wiki/bar/'.format(node._id) in version.rendered_html
+        assert version.rendered_text == 'See bar'
+        with mock.patch.object(WikiVersion, '_render_html') as render_html:
+            assert version.html(node) == version.rendered_html
+            assert version.raw_text(node) == 'See bar'
+            assert not render_html.called
+
+    def test_version_saved_before_is_rendered_once(self):
+        node = NodeFactory()
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        version = page.create_version(user=UserFactory(), content='See [[bar]]')
+        WikiVersion.objects.filter(pk=version.pk).update(rendered_html=None, rendered_text=None)
+        version.reload()
+
+        html = version.html(node)
+        assert '/{}/wiki/bar/'.format(node._id) in html
+        assert WikiVersion.objects.get(pk=version.pk).rendered_html == html
+
+        backfill_wiki_rendered(batch_size=10)
+        assert WikiVersion.objects.filter(rendered_html__isnull=True).count() == 0
+
+    def test_version_is_rendered_for_other_nodes(self):
+        node = NodeFactory()
+        other = NodeFactory()
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        version = page.create_version(user=UserFactory(), content='See [[bar]]')
+        assert '/{}/wiki/bar/'.format(other._id) in version.html(other)
+        assert '/{}/wiki/bar/'.format(node._id) in version.html(node)
+
+    def test_version_is_rendered_once_when_saved_again(self):
+        node = NodeFactory()
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        version = page.create_version(user=UserFactory(), content='See [[bar]]')
+        with mock.patch.object(WikiVersion, '_render_html', return_value='') as render_html:
+            version.save()
+            assert not render_html.called
+
+    def test_cloned_versions_are_rendered_once_for_the_copy(self):
+        user = UserFactory()
+        node = NodeFactory(creator=user)
+        copy = NodeFactory(creator=user)
+        page = WikiPage(page_name='foo', node=node)
+        page.save()
+        page.create_version(user=user, content='See [[bar]]')
+        with mock.patch.object(WikiVersion, '_render_html', wraps=WikiVersion._render_html, autospec=True) as render_html:
+            page.clone_wiki_page(copy, user)
+        assert render_html.call_count == 1
+        cloned = WikiVersion.objects.get(wiki_page__node=copy)
+        assert '/{}/wiki/bar/'.format(copy._id) in cloned.rendered_html
+
 
 class TestWikiPage(OsfTestCase):
 
@@ -1,5 +1,6 @@
 import datetime
 import functools
+import logging
 import operator
 import re
 
@@ -12,6 +13,7 @@ from api.base.exceptions import (InvalidFilterComparisonType,
                                  InvalidFilterValue)
 from api.base.serializers import RelationshipField, ShowIfVersion, TargetField
 from dateutil import parser as date_parser
+from django.conf import settings as django_settings
 from django.core.exceptions import ValidationError
 from django.db.models import QuerySet as DjangoQuerySet
 from django.db.models import Q, Exists, OuterRef
@@ -21,6 +23,8 @@ from osf.models import Subject, PreprintProvider, Node
 from osf.models.base import GuidMixin
 from osf.utils.workflows import DefaultStates
 
+logger = logging.getLogger(__name__)
+
 
 def lowercase(lower):
     if hasattr(lower, '__call__'):
@@ -28,22 +32,35 @@ def lowercase(lower):
     return lower
 
 
-def sort_multiple(fields):
-    fields = list(fields)
-    def sort_fn(a, b):
-        sort_direction = 1
-        for field in fields:
-            if field[0] == '-':
-                sort_direction = -1
-                field = field[1:]
-            a_field = getattr(a, field)
-            b_field = getattr(b, field)
-            if a_field > b_field:
-                return 1 * sort_direction
-            elif a_field < b_field:
-                return -1 * sort_direction
-        return 0
-    return sort_fn
+def sort_list(items, ordering):
+    """Sort ``items`` by the attributes in ``ordering``, descending for those prefixed with '-'."""
+    items = list(items)
+    # Stable sorts, from the least significant attribute to the most
+    for field in reversed(ordering):
+        items.sort(key=operator.attrgetter(field.lstrip('-')), reverse=field.startswith('-'))
+    return items
+
+
+def get_field_expressions(view):
+    """Return the ``field_expressions`` of the serializer of ``view``, see ``ListFilterMixin``."""
+    if hasattr(view, 'get_serializer_class'):
+        serializer_class = view.get_serializer_class()
+    else:
+        serializer_class = getattr(view, 'serializer_class', None)
+    return getattr(serializer_class, 'field_expressions', {})
+
+
+def expression_alias(field_name):
+    return 'expression_{}'.format(field_name)
+
+
+def annotate_expression(queryset, field_name, expression):
+    """Annotate ``queryset`` with ``expression`` as the value of ``field_name``, once."""
+    alias = expression_alias(field_name)
+    if alias not in queryset.query.annotations:
+        queryset = queryset.annotate(**{alias: expression})
+    return queryset
+
 
 class OSFOrderingFilter(OrderingFilter):
     """Adaptation of rest_framework.filters.OrderingFilter to work with modular-odm."""
@@ -57,14 +74,27 @@ class OSFOrderingFilter(OrderingFilter):
                 order_fields = tuple([field.lstrip('-') for field in ordering])
                 distinct_fields = queryset.query.distinct_fields
                 queryset.query.distinct_fields = tuple(set(distinct_fields + order_fields))
-            return super(OSFOrderingFilter, self).filter_queryset(request, queryset, view)
+            if ordering:
+                expressions = get_field_expressions(view)
+                ordering = list(ordering)
+                for index, term in enumerate(ordering):
+                    field_name = term.lstrip('-')
+                    if field_name in expressions:
+                        queryset = annotate_expression(queryset, field_name, expressions[field_name])
+                        ordering[index] = term.replace(field_name, expression_alias(field_name))
+                return queryset.order_by(*ordering)
+            return queryset
         if ordering:
             if isinstance(ordering, (list, tuple)):
-                sorted_list = sorted(queryset, cmp=sort_multiple(ordering))
-                return sorted_list
+                return sort_list(queryset, ordering)
             return queryset.sort(*ordering)
         return queryset
 
+    # override
+    def get_valid_fields(self, queryset, view, context={}):
+        valid_fields = super(OSFOrderingFilter, self).get_valid_fields(queryset, view, context)
+        return list(valid_fields) + [(field_name, field_name) for field_name in get_field_expressions(view)]
+
 
 class FilterMixin(object):
     """ View mixin with helper functions for filtering. """
@@ -331,6 +361,10 @@ class ListFilterMixin(FilterMixin):
 
     Serializers that want to restrict which fields are used for filtering need to have a variable called
     filterable_fields which is a frozenset of strings representing the field names as they appear in the serialization.
+
+    Serializers can map fields that aren't model fields, e.g. SerializerMethodFields, to SQL expressions with a dict
+    called field_expressions, so that querysets are filtered and sorted on them in the database. Lists are still
+    filtered in Python, up to settings.MAX_PYTHON_FILTER_ROWS of them.
     """
     FILTERS = {
         'eq': operator.eq,
@@ -361,6 +395,7 @@ class ListFilterMixin(FilterMixin):
         filters = self.parse_query_params(query_params)
         queryset = default_queryset
         query_parts = []
+        expressions = getattr(self.serializer_class, 'field_expressions', {})
 
         if filters:
             for key, field_names in filters.iteritems():
@@ -372,6 +407,12 @@ class ListFilterMixin(FilterMixin):
                         for operation in operations:
                             queryset = self.get_filtered_queryset(field_name, operation, queryset)
                     else:
+                        if field_name in expressions:
+                            queryset = annotate_expression(queryset, field_name, expressions[field_name])
+                            for operation in operations:
+                                # Unless postprocess_query_param chose a model field to filter on
+                                if operation['source_field_name'] == field_name:
+                                    operation['source_field_name'] = expression_alias(field_name)
                         sub_query_parts.append(
                             functools.reduce(operator.and_, [
                                 self.build_query_from_field(field_name, operation)
@@ -441,11 +482,13 @@ class ListFilterMixin(FilterMixin):
         """filters default queryset based on the serializer field type"""
         field = self.serializer_class._declared_fields[field_name]
         source_field_name = params['source_field_name']
+        items = self.capped_items(default_queryset, field_name)
 
         if isinstance(field, ser.SerializerMethodField):
+            serializer_method = self.get_serializer_method(field_name)
             return_val = [
-                item for item in default_queryset
-                if self.FILTERS[params['op']](self.get_serializer_method(field_name)(item), params['value'])
+                item for item in items
+                if self.FILTERS[params['op']](serializer_method(item), params['value'])
             ]
         elif isinstance(field, ser.CharField):
             if source_field_name in ('_id', 'root'):
@@ -453,18 +496,18 @@ class ListFilterMixin(FilterMixin):
                 # Respect special-case behavior, and enforce exact match for these list fields.
                 options = set(item.lower() for item in params['value'])
                 return_val = [
-                    item for item in default_queryset
+                    item for item in items
                     if getattr(item, source_field_name, '') in options
                 ]
             else:
                 # TODO: What is {}.lower()? Possible bug
                 return_val = [
-                    item for item in default_queryset
+                    item for item in items
                     if params['value'].lower() in getattr(item, source_field_name, {}).lower()
                 ]
         elif isinstance(field, ser.ListField):
             return_val = [
-                item for item in default_queryset
+                item for item in items
                 if params['value'].lower() in [
                     lowercase(i.lower) for i in getattr(item, source_field_name, [])
                 ]
@@ -472,7 +515,7 @@ class ListFilterMixin(FilterMixin):
         else:
             try:
                 return_val = [
-                    item for item in default_queryset
+                    item for item in items
                     if self.FILTERS[params['op']](getattr(item, source_field_name, None), params['value'])
                 ]
             except TypeError:
@@ -480,6 +523,19 @@ class ListFilterMixin(FilterMixin):
 
         return return_val
 
+    def capped_items(self, default_queryset, field_name):
+        """Yield the items to filter in Python, up to settings.MAX_PYTHON_FILTER_ROWS of them."""
+        if isinstance(default_queryset, DjangoQuerySet):
+            default_queryset = default_queryset.iterator()
+        for count, item in enumerate(default_queryset):
+            if count >= django_settings.MAX_PYTHON_FILTER_ROWS:
+                logger.warning(
+                    'Stopped filtering %s on %s in Python after %s rows, map the field to a SQL expression instead',
+                    type(self).__name__, field_name, count
+                )
+                return
+            yield item
+
     def get_serializer_method(self, field_name):
         """
         :param field_name: The name of a SerializerMethodField
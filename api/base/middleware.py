@@ -17,6 +17,10 @@ from framework.celery_tasks.handlers import (
     celery_after_request,
     celery_teardown_request
 )
+from osf.utils.permission_resolver import (
+    permission_resolver_before_request,
+    permission_resolver_teardown_request
+)
 from .api_globals import api_globals
 from api.base import settings as api_settings
 
@@ -59,6 +63,22 @@ class DjangoGlobalMiddleware(object):
         return response
 
 
+class PermissionResolverMiddleware(object):
+    """
+    Give each request a fresh permission resolver, so permission checks are memoized per request.
+    """
+    def process_request(self, request):
+        permission_resolver_before_request()
+
+    def process_exception(self, request, exception):
+        permission_resolver_teardown_request(error=exception)
+        return None
+
+    def process_response(self, request, response):
+        permission_resolver_teardown_request()
+        return response
+
+
 class CorsMiddleware(corsheaders.middleware.CorsMiddleware):
     """
     Augment CORS origin white list with the Institution model's domains.
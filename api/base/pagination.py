@@ -1,8 +1,16 @@
+import json
+import operator
+from datetime import datetime
+
 from django.utils import six
 from collections import OrderedDict
+from django.core import signing
 from django.core.urlresolvers import reverse
 from django.core.paginator import InvalidPage, Paginator as DjangoPaginator
-from django.db.models import QuerySet
+from django.db import connection
+from django.db.models import Q, QuerySet
+from django.core.cache import cache
+from django.utils.functional import cached_property
 
 from rest_framework import pagination
 from rest_framework.exceptions import NotFound
@@ -10,25 +18,187 @@ from rest_framework.response import Response
 from rest_framework.utils.urls import (
     replace_query_param, remove_query_param
 )
+from api.base.exceptions import InvalidQueryStringError
 from api.base.serializers import is_anonymized
 from api.base.settings import MAX_PAGE_SIZE
-from api.base.utils import absolute_reverse
+from api.base.utils import absolute_reverse, is_truthy
+from api.caching.counts import list_count_key
 
 from osf.models import AbstractNode, Comment, Guid
+from website import settings as osf_settings
 from website.search.elastic_search import DOC_TYPE_TO_MODEL
 
 
+def estimate_count(queryset):
+    """Return Postgres' planner estimate of the number of rows of ``queryset``, which costs
+    no more than planning the query.
+    """
+    if hasattr(queryset, 'include'):
+        queryset = queryset.include(None)
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, six.string_types):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else '-' + field for field in ordering)
+
+
+def keyset_filter(ordering, position):
+    """Return a ``Q`` matching the rows that come after ``position``, the values of the
+    fields of ``ordering`` of a row, in that ordering.
+    """
+    clauses = []
+    for i, field in enumerate(ordering):
+        lookups = {name.lstrip('-'): value for name, value in zip(ordering[:i], position[:i])}
+        lookups['{}__{}'.format(field.lstrip('-'), 'lt' if field.startswith('-') else 'gt')] = position[i]
+        clauses.append(Q(**lookups))
+    return reduce(operator.or_, clauses)
+
+
+class ListCountPaginator(DjangoPaginator):
+    """Paginator whose count is cached under ``count_key`` for ``API_LIST_COUNT_CACHE_TIMEOUT``
+    seconds. A queryset the planner estimates to have more than ``API_LIST_COUNT_ESTIMATE_THRESHOLD``
+    rows isn't counted, its count is the estimate and ``count_is_estimate`` is set.
+    """
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super(ListCountPaginator, self).__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        timeout = osf_settings.API_LIST_COUNT_CACHE_TIMEOUT
+        if self.count_key and timeout:
+            cached = cache.get(self.count_key)
+            if cached is not None:
+                count, self.count_is_estimate = cached
+                return count
+
+        threshold = osf_settings.API_LIST_COUNT_ESTIMATE_THRESHOLD
+        count = None
+        if threshold is not None and isinstance(self.object_list, QuerySet):
+            count = estimate_count(self.object_list)
+            self.count_is_estimate = count > threshold
+        if not self.count_is_estimate:
+            count = super(ListCountPaginator, self).count
+
+        if self.count_key and timeout:
+            cache.set(self.count_key, (count, self.count_is_estimate), timeout)
+        return count
+
+
 class JSONAPIPagination(pagination.PageNumberPagination):
     """
     Custom paginator that formats responses in a JSON-API compatible format.
 
     Properly handles pagination of embedded objects.
 
+    A request with ``page[cursor]`` is paginated by keyset instead, over the view's ``cursor_ordering``
+    (a stable ordering, ending in a unique field), so that walking to the last page doesn't count
+    the queryset or scan past the rows of the previous pages. Cursors are signed, opaque strings
+    given in the ``next`` and ``prev`` links; an empty cursor starts at the first page. The total is
+    only returned with ``page[total]=true``, estimated by the planner.
     """
 
     page_size_query_param = 'page[size]'
     max_page_size = MAX_PAGE_SIZE
 
+    cursor_query_param = 'page[cursor]'
+    total_query_param = 'page[total]'
+    cursor_salt = 'api.base.pagination.cursor'
+    default_cursor_ordering = ('id', )
+
+    cursor_page = None
+
+    def encode_cursor(self, obj, reverse):
+        position = []
+        for field in self.cursor_ordering:
+            value = getattr(obj, field.lstrip('-'))
+            position.append(value.isoformat() if isinstance(value, datetime) else value)
+        return signing.dumps({'p': position, 'r': reverse}, salt=self.cursor_salt, compress=True)
+
+    def decode_cursor(self, cursor):
+        """Return the position and direction of ``cursor``, ``(None, False)`` for the first page."""
+        if not cursor:
+            return None, False
+        try:
+            data = signing.loads(cursor, salt=self.cursor_salt)
+        except signing.BadSignature:
+            data = None
+        if not isinstance(data, dict) or len(data.get('p') or []) != len(self.cursor_ordering):
+            raise InvalidQueryStringError(detail='Invalid cursor.', parameter=self.cursor_query_param)
+        return data['p'], bool(data.get('r'))
+
+    def paginate_queryset_by_cursor(self, queryset, request, view):
+        self.request = request
+        self.cursor_ordering = tuple(getattr(view, 'cursor_ordering', None) or self.default_cursor_ordering)
+        self.cursor_page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(request.query_params[self.cursor_query_param])
+
+        self.cursor_queryset = queryset
+        ordering = reverse_ordering(self.cursor_ordering) if reverse else self.cursor_ordering
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(keyset_filter(ordering, position))
+
+        results = list(queryset[:self.cursor_page_size + 1])
+        has_more = len(results) > self.cursor_page_size
+        results = results[:self.cursor_page_size]
+        if reverse:
+            results.reverse()
+            self.has_next_cursor, self.has_previous_cursor = True, has_more
+        else:
+            self.has_next_cursor, self.has_previous_cursor = has_more, position is not None
+        self.cursor_page = results
+        return results
+
+    def cursor_query(self, url, cursor):
+        url = remove_query_param(self.request.build_absolute_uri(url), '_')
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_cursor_response_dict(self, data, url):
+        first_link = self.cursor_query(url, '') if self.has_previous_cursor else None
+        prev_link = next_link = None
+        if self.cursor_page and self.has_previous_cursor:
+            prev_link = self.cursor_query(url, self.encode_cursor(self.cursor_page[0], reverse=True))
+        if self.cursor_page and self.has_next_cursor:
+            next_link = self.cursor_query(url, self.encode_cursor(self.cursor_page[-1], reverse=False))
+
+        meta = OrderedDict([('per_page', self.cursor_page_size)])
+        if is_truthy(self.request.query_params.get(self.total_query_param, False)):
+            meta['total'] = estimate_count(self.cursor_queryset)
+            meta['total_is_estimate'] = True
+
+        if self.request.version < '2.1':
+            return OrderedDict([
+                ('data', data),
+                ('links', OrderedDict([
+                    ('first', first_link),
+                    ('last', None),
+                    ('prev', prev_link),
+                    ('next', next_link),
+                    ('meta', meta),
+                ])),
+            ])
+        return OrderedDict([
+            ('data', data),
+            ('meta', meta),
+            ('links', OrderedDict([
+                ('self', self.request.build_absolute_uri(url)),
+                ('first', first_link),
+                ('last', None),
+                ('prev', prev_link),
+                ('next', next_link),
+            ])),
+        ])
+
     def page_number_query(self, url, page_number):
         """
         Builds uri and adds page param.
@@ -68,6 +238,15 @@ class JSONAPIPagination(pagination.PageNumberPagination):
         page_number = self.page.next_page_number()
         return self.page_number_query(url, page_number)
 
+    def get_meta(self):
+        meta = OrderedDict([
+            ('total', self.page.paginator.count),
+            ('per_page', self.page.paginator.per_page),
+        ])
+        if getattr(self.page.paginator, 'count_is_estimate', False):
+            meta['total_is_estimate'] = True
+        return meta
+
     def get_response_dict_deprecated(self, data, url):
         return OrderedDict([
             ('data', data),
@@ -76,20 +255,14 @@ class JSONAPIPagination(pagination.PageNumberPagination):
                 ('last', self.get_last_real_link(url)),
                 ('prev', self.get_previous_real_link(url)),
                 ('next', self.get_next_real_link(url)),
-                ('meta', OrderedDict([
-                    ('total', self.page.paginator.count),
-                    ('per_page', self.page.paginator.per_page),
-                ]))
+                ('meta', self.get_meta()),
             ])),
         ])
 
     def get_response_dict(self, data, url):
         return OrderedDict([
             ('data', data),
-            ('meta', OrderedDict([
-                ('total', self.page.paginator.count),
-                ('per_page', self.page.paginator.per_page),
-            ])),
+            ('meta', self.get_meta()),
             ('links', OrderedDict([
                 ('self', self.get_self_real_link(url)),
                 ('first', self.get_first_real_link(url)),
@@ -115,7 +288,9 @@ class JSONAPIPagination(pagination.PageNumberPagination):
         if embedded:
             reversed_url = reverse(view_name, kwargs=kwargs)
 
-        if self.request.version < '2.1':
+        if self.cursor_page is not None:
+            response_dict = self.get_cursor_response_dict(data, reversed_url)
+        elif self.request.version < '2.1':
             response_dict = self.get_response_dict_deprecated(data, reversed_url)
         else:
             response_dict = self.get_response_dict(data, reversed_url)
@@ -156,8 +331,38 @@ class JSONAPIPagination(pagination.PageNumberPagination):
             self.request = request
             return list(self.page)
 
-        else:
-            return super(JSONAPIPagination, self).paginate_queryset(queryset, request, view=None)
+        elif self.cursor_query_param in request.query_params and isinstance(queryset, QuerySet):
+            return self.paginate_queryset_by_cursor(queryset, request, request.parser_context['view'])
+
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        # Only the views whose totals are invalidated on writes cache them, see api.caching.counts
+        count_key = None
+        view = request.parser_context['view']
+        if isinstance(queryset, QuerySet) and getattr(view, 'cache_list_count', False):
+            count_key = list_count_key(request, view, queryset.model)
+        paginator = ListCountPaginator(queryset, page_size, count_key=count_key)
+
+        page_number = request.query_params.get(self.page_query_param, 1)
+        if page_number in self.last_page_strings:
+            page_number = paginator.num_pages
+
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            msg = self.invalid_page_message.format(
+                page_number=page_number, message=six.text_type(exc)
+            )
+            raise NotFound(msg)
+
+        if paginator.num_pages > 1 and self.template is not None:
+            # The browsable API should display pagination controls.
+            self.display_page_controls = True
+
+        self.request = request
+        return list(self.page)
 
 
 class MaxSizePagination(JSONAPIPagination):
@@ -207,10 +412,14 @@ class NodeContributorPagination(JSONAPIPagination):
         """ Add number of bibliographic contributors to links.meta"""
         response = super(NodeContributorPagination, self).get_paginated_response(data)
         response_dict = response.data
-        kwargs = self.request.parser_context['kwargs'].copy()
-        node_id = kwargs.get('node_id', None)
-        node = AbstractNode.load(node_id)
-        total_bibliographic = node.visible_contributors.count()
+        view = self.request.parser_context.get('view')
+        # Counted for each node when its contributors were prefetched to embed them in a page of nodes
+        total_bibliographic = getattr(view, 'embed_batch_meta', {}).get('total_bibliographic')
+        if total_bibliographic is None:
+            kwargs = self.request.parser_context['kwargs'].copy()
+            node_id = kwargs.get('node_id', None)
+            node = AbstractNode.load(node_id)
+            total_bibliographic = node.visible_contributors.count()
         if self.request.version < '2.1':
             response_dict['links']['meta']['total_bibliographic'] = total_bibliographic
         else:
@@ -1,3 +1,4 @@
+from django.http import HttpRequest
 from rest_framework.request import Request
 
 from osf.models import Node
@@ -31,3 +32,43 @@ class EmbeddedRequest(Request):
         Returns the user from the original request
         """
         return self.original_user
+
+
+class EmbeddedObjects(object):
+    """
+    Objects that a page of results embeds, loaded by guid all at once.
+
+    The guids of the objects are added before the page is serialized, the first
+    lookup of one of them loads all of them with one query per model.
+    """
+    def __init__(self):
+        self.pending = set()
+        self.loaded = {}
+
+    def add(self, guid):
+        self.pending.add(guid)
+
+    def get(self, model_cls, guid):
+        """
+        Returns the object of ``model_cls`` with the ``guid``, or None if it is not known
+        """
+        if guid not in self.pending:
+            return None
+        if (model_cls, guid) not in self.loaded:
+            guids = [each for each in self.pending if (model_cls, each) not in self.loaded]
+            for each in guids:
+                self.loaded[(model_cls, each)] = None
+            for obj in model_cls.objects.filter(guids___id__in=guids):
+                self.loaded[(model_cls, obj._id)] = obj
+        return self.loaded[(model_cls, guid)]
+
+
+def get_embedded_objects(request):
+    """
+    Returns the ``EmbeddedObjects`` of the response to ``request``, shared by its embedded requests
+    """
+    while not isinstance(request, HttpRequest):
+        request = request._request
+    if not hasattr(request, '_embedded_objects'):
+        request._embedded_objects = EmbeddedObjects()
+    return request._embedded_objects
@@ -65,7 +65,10 @@ class ConditionalField(ser.Field):
     """
     Skips the inner field based on `should_show` or `should_hide`; override whichever makes the logic more readable.
     If you'd prefer to return `None` rather skipping the field, override `should_be_none` as well.
+    Set `depends_on_instance` to False if the conditions only depend on the request, so that
+    `JSONAPISerializer` checks them once per request rather than for each object.
     """
+    depends_on_instance = True
 
     def __init__(self, field, **kwargs):
         super(ConditionalField, self).__init__(**kwargs)
@@ -117,6 +120,7 @@ class ShowIfVersion(ConditionalField):
     Skips the field if the specified request version is not after a feature's earliest supported version,
     or not before the feature's latest supported version.
     """
+    depends_on_instance = False
 
     def __init__(self, field, min_version, max_version, **kwargs):
         super(ShowIfVersion, self).__init__(field, **kwargs)
@@ -446,6 +450,33 @@ class AnonymizedRegexField(AuthorizedCharField):
 
         return value
 
+class RelatedCounts(object):
+    """The ``related_meta`` counts of a page of objects, counted for the whole page at once.
+
+    A serializer that can count a relationship of many objects with one query defines, next to the
+    method ``get_<name>_count(obj)`` named in ``related_meta``, ``get_<name>_count_batch(objs)``
+    returning a dict of counts keyed by object pk. The batch method is only called the first time
+    a count is needed, so a page serialized without ``related_counts`` costs nothing.
+    """
+
+    def __init__(self, objects):
+        self.objects = objects
+        self.pks = {getattr(obj, 'pk', None) for obj in objects}
+        self.counts = {}
+
+    def get(self, serializer, method_name, obj):
+        """Return the count of ``method_name`` for ``obj`` if it can be batched, else ``None``."""
+        if getattr(serializer, 'field', None):
+            serializer = serializer.parent
+        batch_method = getattr(serializer, '{}_batch'.format(method_name), None)
+        if batch_method is None or obj.pk is None or obj.pk not in self.pks:
+            return None
+        key = (type(serializer), method_name)
+        if key not in self.counts:
+            self.counts[key] = batch_method(self.objects)
+        return self.counts[key].get(obj.pk, 0)
+
+
 class RelationshipField(ser.HyperlinkedIdentityField):
     """
     RelationshipField that permits the return of both self and related links, along with optional
@@ -608,11 +639,11 @@ class RelationshipField(ser.HyperlinkedIdentityField):
                 field_counts_requested = self.process_related_counts_parameters(show_related_counts, value)
 
                 if utils.is_truthy(show_related_counts):
-                    meta[key] = functional.rapply(meta_data[key], _url_val, obj=value, serializer=self.parent, request=self.context['request'])
+                    meta[key] = self.get_related_count(meta_data[key], value)
                 elif utils.is_falsy(show_related_counts):
                     continue
                 elif self.field_name in field_counts_requested:
-                    meta[key] = functional.rapply(meta_data[key], _url_val, obj=value, serializer=self.parent, request=self.context['request'])
+                    meta[key] = self.get_related_count(meta_data[key], value)
                 else:
                     continue
             elif key == 'projects_in_common':
@@ -625,6 +656,18 @@ class RelationshipField(ser.HyperlinkedIdentityField):
                 meta[key] = functional.rapply(meta_data[key], _url_val, obj=value, serializer=self.parent, request=self.context['request'])
         return meta
 
+    def get_related_count(self, meta_value, value):
+        """
+        Returns a related count from the page's ``RelatedCounts`` if the view provided one, otherwise
+        calls the serializer method.
+        """
+        related_counts = self.context.get('related_counts')
+        if related_counts is not None and isinstance(meta_value, basestring):
+            count = related_counts.get(self.parent, meta_value, value)
+            if count is not None:
+                return count
+        return functional.rapply(meta_value, _url_val, obj=value, serializer=self.parent, request=self.context['request'])
+
     def lookup_attribute(self, obj, lookup_field):
         """
         Returns attribute from target object unless attribute surrounded in angular brackets where it returns the lookup field.
@@ -1111,6 +1154,10 @@ class JSONAPIListSerializer(ser.ListSerializer):
                 self.child.to_esi_representation(item, envelope=None) for item in data
             ]
         else:
+            # Load what the items embed for all of them at once
+            for partial in self.context.get('embed', {}).values():
+                if hasattr(partial, 'prefetch'):
+                    partial.prefetch(data)
             ret = [
                 self.child.to_representation(item, envelope=envelope) for item in data
             ]
@@ -1120,6 +1167,13 @@ class JSONAPIListSerializer(ser.ListSerializer):
 
         return ret
 
+    # overrides ListSerializer
+    def create(self, validated_data):
+        # Let the child serializer create all of the resources at once if it knows how to
+        if hasattr(self.child, 'bulk_create'):
+            return self.child.bulk_create(validated_data)
+        return super(JSONAPIListSerializer, self).create(validated_data)
+
     # Overrides ListSerializer which doesn't support multiple update by default
     def update(self, instance, validated_data):
 
@@ -1209,6 +1263,62 @@ class BaseAPISerializer(ser.Serializer, SparseFieldsetMixin):
                                   for name, field in self.fields.iteritems()]
 
 
+PlannedField = collections.namedtuple('PlannedField', ['name', 'field', 'source', 'is_link', 'embed', 'show_relationship'])
+
+
+class FieldPlan(object):
+    """How `JSONAPISerializer.to_representation` serializes each field, worked out once for a
+    request's version, sparse fieldset and anonymity and the embeds of the serializer's context.
+
+    `fields` are the fields to serialize in order with the field that gets their attribute,
+    whether they are relationships, whether they are embedded and whether the relationship is shown.
+    Conditional fields that only depend on the request and are hidden are left out.
+    """
+
+    def __init__(self, serializer, embeds, is_anonymous):
+        to_be_removed = set()
+        if is_anonymous and hasattr(serializer, 'non_anonymized_fields'):
+            # Drop any fields that are not specified in the `non_anonymized_fields` variable.
+            allowed = set(serializer.non_anonymized_fields)
+            existing = set(serializer.fields.keys())
+            to_be_removed = existing - allowed
+
+        fields = [field for field in serializer.fields.values() if
+                  not field.write_only and field.field_name not in to_be_removed]
+
+        invalid_embeds = serializer.invalid_embeds(fields, embeds)
+        invalid_embeds = invalid_embeds - to_be_removed
+        if invalid_embeds:
+            raise api_exceptions.InvalidQueryStringError(parameter='embed',
+                                          detail='The following fields are not embeddable: {}'.format(
+                                              ', '.join(invalid_embeds)))
+
+        self.fields = []
+        for field in fields:
+            if (isinstance(field, ConditionalField) and not field.depends_on_instance and
+                    not field.should_show(None) and not field.should_be_none(None)):
+                continue
+            if hasattr(field, 'child_relation'):
+                source = nested_field = field.child_relation
+            else:
+                source = field
+                nested_field = getattr(field, 'field', None)
+            is_link = bool(getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False))
+            self.fields.append(PlannedField(
+                name=field.field_name,
+                field=field,
+                source=source,
+                is_link=is_link,
+                # If embed=field_name is appended to the query string or 'always_embed' flag is True, directly embed the
+                # results in addition to adding a relationship link
+                embed=bool(is_link and embeds and (field.field_name in embeds or getattr(field, 'always_embed', None))),
+                show_relationship=not (
+                    is_anonymous and
+                    getattr(field, 'view_name', None) in serializer.views_to_hide_if_anonymous
+                ),
+            ))
+
+
 class JSONAPISerializer(BaseAPISerializer):
     """Base serializer. Requires that a `type_` option is set on `class Meta`. Also
     allows for enveloping of both single resources and collections.  Looks to nest fields
@@ -1259,6 +1369,22 @@ class JSONAPISerializer(BaseAPISerializer):
                 _validated_data[field] = self.initial_data[field]
         return _validated_data
 
+    def get_field_plan(self, embeds, is_anonymous):
+        """Return the `FieldPlan` of the current request, built the first time it is serialized."""
+        request = self.context['request']
+        key = (
+            getattr(request, 'version', None),
+            request.query_params.get('fields[{}]'.format(self.Meta.type_)),
+            is_anonymous,
+            tuple(sorted(embeds)),
+        )
+        if not hasattr(self, '_field_plans'):
+            self._field_plans = {}
+        if key not in self._field_plans:
+            self.parse_sparse_fields(allow_unsafe=True, context=self.context)
+            self._field_plans[key] = FieldPlan(self, embeds, is_anonymous)
+        return self._field_plans[key]
+
     # overrides Serializer
     def to_representation(self, obj, envelope='data'):
         """Serialize to final representation.
@@ -1270,7 +1396,6 @@ class JSONAPISerializer(BaseAPISerializer):
         meta = getattr(self, 'Meta', None)
         type_ = getattr(meta, 'type_', None)
         assert type_ is not None, 'Must define Meta.type_'
-        self.parse_sparse_fields(allow_unsafe=True, context=self.context)
 
         data = {
             'id': '',
@@ -1287,87 +1412,52 @@ class JSONAPISerializer(BaseAPISerializer):
             context_envelope = None
         enable_esi = self.context.get('enable_esi', False)
         is_anonymous = is_anonymized(self.context['request'])
-        to_be_removed = set()
-        if is_anonymous and hasattr(self, 'non_anonymized_fields'):
-            # Drop any fields that are not specified in the `non_anonymized_fields` variable.
-            allowed = set(self.non_anonymized_fields)
-            existing = set(self.fields.keys())
-            to_be_removed = existing - allowed
-
-        fields = [field for field in self.fields.values() if
-                  not field.write_only and field.field_name not in to_be_removed]
+        plan = self.get_field_plan(embeds, is_anonymous)
 
-        invalid_embeds = self.invalid_embeds(fields, embeds)
-        invalid_embeds = invalid_embeds - to_be_removed
-        if invalid_embeds:
-            raise api_exceptions.InvalidQueryStringError(parameter='embed',
-                                          detail='The following fields are not embeddable: {}'.format(
-                                              ', '.join(invalid_embeds)))
-
-        for field in fields:
+        for planned in plan.fields:
             try:
-                if hasattr(field, 'child_relation'):
-                    attribute = field.child_relation.get_attribute(obj)
-                else:
-                    attribute = field.get_attribute(obj)
+                attribute = planned.source.get_attribute(obj)
             except SkipField:
                 continue
 
-            if hasattr(field, 'child_relation'):
-                nested_field = field.child_relation
-            else:
-                nested_field = getattr(field, 'field', None)
             if attribute is None:
                 # We skip `to_representation` for `None` values so that
                 # fields do not have to explicitly deal with that case.
-                data['attributes'][field.field_name] = None
-            else:
-                try:
-                    if hasattr(field, 'child_relation'):
-                        if hasattr(attribute, 'all'):
-                            representation = field.child_relation.to_representation(attribute.all())
-                        else:
-                            representation = field.child_relation.to_representation(attribute)
-                    else:
-                        if hasattr(attribute, 'all'):
-                            representation = field.to_representation(attribute.all())
-                        else:
-                            representation = field.to_representation(attribute)
-                except SkipField:
-                    continue
-                if getattr(field, 'json_api_link', False) or getattr(nested_field, 'json_api_link', False):
-                    # If embed=field_name is appended to the query string or 'always_embed' flag is True, directly embed the
-                    # results in addition to adding a relationship link
-                    if embeds and (field.field_name in embeds or getattr(field, 'always_embed', None)):
-                        if enable_esi:
-                            try:
-                                result = field.to_esi_representation(attribute, envelope=envelope)
-                            except SkipField:
-                                continue
-                        else:
-                            try:
-                                # If a field has an empty representation, it should not be embedded.
-                                result = self.context['embed'][field.field_name](obj)
-                            except SkipField:
-                                result = None
-
-                        if result:
-                            data['embeds'][field.field_name] = result
-                        else:
-                            data['embeds'][field.field_name] = {'error': 'This field is not embeddable.'}
-                    try:
-                        if not (is_anonymous and
-                                    hasattr(field, 'view_name') and
-                                        field.view_name in self.views_to_hide_if_anonymous):
-                            data['relationships'][field.field_name] = representation
-                    except SkipField:
-                        continue
-                elif field.field_name == 'id':
-                    data['id'] = representation
-                elif field.field_name == 'links':
-                    data['links'] = representation
+                data['attributes'][planned.name] = None
+                continue
+            try:
+                if hasattr(attribute, 'all'):
+                    representation = planned.source.to_representation(attribute.all())
                 else:
-                    data['attributes'][field.field_name] = representation
+                    representation = planned.source.to_representation(attribute)
+            except SkipField:
+                continue
+            if planned.is_link:
+                if planned.embed:
+                    if enable_esi:
+                        try:
+                            result = planned.field.to_esi_representation(attribute, envelope=envelope)
+                        except SkipField:
+                            continue
+                    else:
+                        try:
+                            # If a field has an empty representation, it should not be embedded.
+                            result = embeds[planned.name](obj)
+                        except SkipField:
+                            result = None
+
+                    if result:
+                        data['embeds'][planned.name] = result
+                    else:
+                        data['embeds'][planned.name] = {'error': 'This field is not embeddable.'}
+                if planned.show_relationship:
+                    data['relationships'][planned.name] = representation
+            elif planned.name == 'id':
+                data['id'] = representation
+            elif planned.name == 'links':
+                data['links'] = representation
+            else:
+                data['attributes'][planned.name] = representation
 
         if not data['relationships']:
             del data['relationships']
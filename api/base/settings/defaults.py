@@ -130,6 +130,13 @@ BULK_SETTINGS = {
 
 MAX_PAGE_SIZE = 100
 
+# Most rows that a list filter scans in Python, for fields that can't be filtered in the database
+MAX_PYTHON_FILTER_ROWS = 10000
+
+# Forks of nodes with more primary descendants than this are made by a celery task, and the user
+# is emailed when the fork is done. None forks every tree while the client waits
+FORK_ASYNC_NODE_THRESHOLD = 200
+
 REST_FRAMEWORK = {
     'PAGE_SIZE': 10,
     'DEFAULT_RENDERER_CLASSES': (
@@ -198,6 +205,7 @@ MIDDLEWARE_CLASSES = (
     'api.base.middleware.DjangoGlobalMiddleware',
     'api.base.middleware.CeleryTaskMiddleware',
     'api.base.middleware.PostcommitTaskMiddleware',
+    'api.base.middleware.PermissionResolverMiddleware',
     # A profiling middleware. ONLY FOR DEV USE
     # Uncomment and add "prof" to url params to recieve a profile for that url
     # 'api.base.middleware.ProfileMiddleware',
@@ -271,6 +279,10 @@ ADDONS_OAUTH = ADDONS_FOLDER_CONFIGURABLE + ['dataverse', 'github', 'bitbucket',
 
 BYPASS_THROTTLE_TOKEN = 'test-token'
 
+# How api.base.throttling.BaseThrottle counts requests: 'history' keeps the time of each request in the cache,
+# 'sliding-window' keeps two atomic counters per client
+THROTTLE_ENGINE = 'history'
+
 OSF_SHELL_USER_IMPORTS = None
 
 # Settings for use in the admin
@@ -8,6 +8,10 @@ logger = logging.getLogger(__name__)
 
 class BaseThrottle(SimpleRateThrottle):
 
+    def __init__(self):
+        super(BaseThrottle, self).__init__()
+        self.engine = settings.THROTTLE_ENGINE
+
     def get_ident(self, request):
         if request.META.get('HTTP_X_THROTTLE_TOKEN'):
             return request.META['HTTP_X_THROTTLE_TOKEN']
@@ -28,6 +32,9 @@ class BaseThrottle(SimpleRateThrottle):
         if self.key is None:
             return True
 
+        if self.engine == 'sliding-window':
+            return self.allow_request_in_window()
+
         self.history = self.cache.get(self.key, [])
         self.now = self.timer()
 
@@ -39,6 +46,45 @@ class BaseThrottle(SimpleRateThrottle):
             return self.throttle_failure()
         return self.throttle_success()
 
+    def allow_request_in_window(self):
+        """
+        Count requests in fixed windows of the throttle duration, with atomic increments, and
+        estimate the requests of the sliding window that ends now from the current window and the
+        part of the previous window that it still covers.
+        """
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        remaining = (window + 1) * self.duration - self.now
+        key = '{}:{}'.format(self.key, window)
+
+        previous = self.cache.get('{}:{}'.format(self.key, window - 1), 0)
+        # A window is kept for as long as it can be the previous one
+        self.cache.add(key, 0, 2 * self.duration)
+        try:
+            current = self.cache.incr(key)
+        except ValueError:
+            # Expired between add and incr
+            self.cache.set(key, 1, 2 * self.duration)
+            current = 1
+
+        if previous * remaining / float(self.duration) + current > self.num_requests:
+            # Refused requests don't count
+            try:
+                self.cache.decr(key)
+            except ValueError:
+                pass
+            self.wait_time = remaining
+            return self.throttle_failure()
+        return True
+
+    def wait(self):
+        """
+        Returns the recommended next request time in seconds.
+        """
+        if self.engine == 'sliding-window':
+            return getattr(self, 'wait_time', None)
+        return super(BaseThrottle, self).wait()
+
 
 class NonCookieAuthThrottle(BaseThrottle, AnonRateThrottle):
 
@@ -11,10 +11,11 @@ from rest_framework.reverse import reverse
 
 from api.base.authentication.drf import get_session_from_cookie
 from api.base.exceptions import Gone, UserGone
+from api.base.requests import EmbeddedRequest, get_embedded_objects
 from framework.auth import Auth
 from framework.auth.cas import CasResponse
 from framework.auth.oauth_scopes import ComposedScopes, normalize_scopes
-from osf.models import OSFUser, Contributor, Node, Registration
+from osf.models import OSFUser, Contributor, Node, NodeReadAccess, Registration
 from osf.models.base import GuidMixin
 from osf.utils.requests import check_select_for_update
 from website import settings as website_settings
@@ -84,6 +85,9 @@ def get_object_or_error(model_cls, query_or_pk, request, display_name=None):
         if issubclass(model_cls, GuidMixin):
             # if it's a subclass of GuidMixin we know it's primary_identifier_name
             query = {'guids___id': query_or_pk}
+            if isinstance(request, EmbeddedRequest):
+                # The objects embedded in a page of results are loaded together
+                obj = get_embedded_objects(request).get(model_cls, query_or_pk)
         else:
             if hasattr(model_cls, 'primary_identifier_name'):
                 # primary_identifier_name gives us the natural key for the model
@@ -132,6 +136,9 @@ def default_node_permission_queryset(user, model_cls):
     assert model_cls in {Node, Registration}
     if user.is_anonymous:
         return model_cls.objects.filter(is_public=True)
+    if website_settings.ENABLE_NODE_READ_ACCESS_INDEX:
+        contributor_node_ids = NodeReadAccess.objects.filter(user_id=user.id, is_contributor=True).values('node_id')
+        return model_cls.objects.filter(Q(id__in=contributor_node_ids) | Q(is_public=True))
     sub_qs = Contributor.objects.filter(node=OuterRef('pk'), user__id=user.id, read=True)
     return model_cls.objects.annotate(contrib=Exists(sub_qs)).filter(Q(contrib=True) | Q(is_public=True))
 
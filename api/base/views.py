@@ -3,6 +3,7 @@ from collections import defaultdict
 from django_bulk_update.helper import bulk_update
 from django.conf import settings as django_settings
 from django.db import transaction
+from django.db.models import Count
 from django.http import JsonResponse
 from rest_framework import generics
 from rest_framework import permissions as drf_permissions
@@ -18,11 +19,12 @@ from api.base.exceptions import RelationshipPostMakesNoChanges
 from api.base.filters import ListFilterMixin
 from api.base.parsers import JSONAPIRelationshipParser
 from api.base.parsers import JSONAPIRelationshipParserForRegularJSON
-from api.base.requests import EmbeddedRequest
+from api.base.requests import EmbeddedRequest, get_embedded_objects
 from api.base.serializers import (
     MaintenanceStateSerializer,
     LinkedNodesRelationshipSerializer,
-    LinkedRegistrationsRelationshipSerializer
+    LinkedRegistrationsRelationshipSerializer,
+    RelatedCounts,
 )
 from api.base.throttling import RootAnonThrottle, UserRateThrottle
 from api.base.utils import is_bulk_request, get_user_auth
@@ -50,90 +52,20 @@ class JSONAPIBaseView(generics.GenericAPIView):
 
         :param str field_name: Name of field of the view's serializer_class to load
         results for
-        :return function object -> dict:
+        :return EmbedPartial: callable object -> dict
         """
         if getattr(field, 'field', None):
             field = field.field
+        return EmbedPartial(self, field_name, field)
 
-        def partial(item):
-            # resolve must be implemented on the field
-            v, view_args, view_kwargs = field.resolve(item, field_name, self.request)
-            if not v:
-                return None
-
-            if isinstance(self.request, EmbeddedRequest):
-                request = EmbeddedRequest(self.request._request)
-            else:
-                request = EmbeddedRequest(self.request)
-
-            if not hasattr(request._request._request, '_embed_cache'):
-                request._request._request._embed_cache = {}
-            cache = request._request._request._embed_cache
-
-            request.parents.setdefault(type(item), {})[item._id] = item
-
-            view_kwargs.update({
-                'request': request,
-                'is_embedded': True,
-            })
-
-            # Setup a view ourselves to avoid all the junk DRF throws in
-            # v is a function that hides everything v.cls is the actual view class
-            view = v.cls()
-            view.args = view_args
-            view.kwargs = view_kwargs
-            view.request = request
-            view.request.parser_context['kwargs'] = view_kwargs
-            view.format_kwarg = view.get_format_suffix(**view_kwargs)
-
-            if not isinstance(view, ListModelMixin):
-                try:
-                    item = view.get_object()
-                except Exception as e:
-                    with transaction.atomic():
-                        ret = view.handle_exception(e).data
-                    return ret
-
-            _cache_key = (v.cls, field_name, view.get_serializer_class(), (type(item), item.id))
-            if _cache_key in cache:
-                # We already have the result for this embed, return it
-                return cache[_cache_key]
-
-            # Cache serializers. to_representation of a serializer should NOT augment it's fields so resetting the context
-            # should be sufficient for reuse
-            if not view.get_serializer_class() in cache:
-                cache[view.get_serializer_class()] = view.get_serializer_class()(many=isinstance(view, ListModelMixin), context=view.get_serializer_context())
-            ser = cache[view.get_serializer_class()]
-
-            try:
-                ser._context = view.get_serializer_context()
-
-                if not isinstance(view, ListModelMixin):
-                    ret = ser.to_representation(item)
-                else:
-                    queryset = view.filter_queryset(view.get_queryset())
-                    page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
-
-                    ret = ser.to_representation(page or queryset)
-
-                    if page is not None:
-                        request.parser_context['view'] = view
-                        request.parser_context['kwargs'].pop('request')
-                        view.paginator.request = request
-                        ret = view.paginator.get_paginated_response(ret).data
-            except Exception as e:
-                with transaction.atomic():
-                    ret = view.handle_exception(e).data
-
-            # Allow request to be gc'd
-            ser._context = None
-
-            # Cache our final result
-            cache[_cache_key] = ret
-
-            return ret
-
-        return partial
+    def get_serializer(self, *args, **kwargs):
+        """Let the serializer of a page of objects count their relationships for the whole page,
+        see ``RelatedCounts``.
+        """
+        serializer = super(JSONAPIBaseView, self).get_serializer(*args, **kwargs)
+        if kwargs.get('many') and args and isinstance(args[0], list):
+            serializer.context['related_counts'] = RelatedCounts(args[0])
+        return serializer
 
     def get_serializer_context(self):
         """Inject request into the serializer context. Additionally, inject partial functions
@@ -179,6 +111,158 @@ class JSONAPIBaseView(generics.GenericAPIView):
         return context
 
 
+class EmbedPartial(object):
+    """Fetches the values of an embedded field, see ``JSONAPIBaseView._get_embed_partial``.
+
+    ``prefetch`` with a page of objects first loads what the page embeds all at once: the
+    objects of embedded detail views by guid, see ``EmbeddedObjects``, and the objects of
+    embedded list views that define ``get_embed_batch``. Such views may also define
+    ``get_embed_batch_meta``, whose values for an item are set as ``embed_batch_meta`` on the
+    view that lists them. Permissions and errors are still checked for each object when it is
+    called with it.
+    """
+
+    def __init__(self, view, field_name, field):
+        self.parent_view = view
+        self.field_name = field_name
+        self.field = field
+        self.resolved = {}
+        self.batches = {}
+        self.batch_meta = {}
+
+    def resolve(self, item):
+        key = (type(item), getattr(item, 'pk', None))
+        if key[1] is None:
+            # resolve must be implemented on the field
+            return self.field.resolve(item, self.field_name, self.parent_view.request)
+        if key not in self.resolved:
+            self.resolved[key] = self.field.resolve(item, self.field_name, self.parent_view.request)
+        v, view_args, view_kwargs = self.resolved[key]
+        return v, view_args, dict(view_kwargs or {})
+
+    def get_view(self, v, view_args, view_kwargs, item):
+        if isinstance(self.parent_view.request, EmbeddedRequest):
+            request = EmbeddedRequest(self.parent_view.request._request)
+        else:
+            request = EmbeddedRequest(self.parent_view.request)
+
+        request.parents.setdefault(type(item), {})[item._id] = item
+
+        view_kwargs.update({
+            'request': request,
+            'is_embedded': True,
+        })
+
+        # Setup a view ourselves to avoid all the junk DRF throws in
+        # v is a function that hides everything v.cls is the actual view class
+        view = v.cls()
+        view.args = view_args
+        view.kwargs = view_kwargs
+        view.request = request
+        view.request.parser_context['kwargs'] = view_kwargs
+        view.format_kwarg = view.get_format_suffix(**view_kwargs)
+        return view
+
+    def prefetch(self, items):
+        """Load what ``items`` embed with one query per model or list view."""
+        if not hasattr(self.field, 'resolve'):
+            return
+        embedded_objects = get_embedded_objects(self.parent_view.request)
+        parents = defaultdict(list)
+        for item in items:
+            if getattr(item, 'pk', None) is None:
+                continue
+            try:
+                v, view_args, view_kwargs = self.resolve(item)
+            except Exception:
+                # Resolved, and failed, again when the item is embedded
+                continue
+            if not v:
+                continue
+            for value in view_kwargs.values():
+                if isinstance(value, basestring):
+                    embedded_objects.add(value)
+            # Only list views of the item itself are batched, e.g. the contributors of a node
+            batch_kwarg = getattr(v.cls, 'embed_batch_kwarg', None)
+            if batch_kwarg and view_kwargs.get(batch_kwarg) == item._id:
+                parents[v].append((view_args, view_kwargs, item))
+
+        for v, lookups in parents.items():
+            view = self.get_view(v, *lookups[0])
+            batch_items = [lookup[-1] for lookup in lookups]
+            groups = view.get_embed_batch(batch_items)
+            meta = view.get_embed_batch_meta(batch_items) if hasattr(view, 'get_embed_batch_meta') else {}
+            for item in batch_items:
+                self.batches[(v.cls, item.pk)] = groups.get(item.pk, [])
+                self.batch_meta[(v.cls, item.pk)] = meta.get(item.pk, {})
+
+    def __call__(self, item):
+        v, view_args, view_kwargs = self.resolve(item)
+        if not v:
+            return None
+
+        view = self.get_view(v, view_args, view_kwargs, item)
+        request = view.request
+
+        if not hasattr(request._request._request, '_embed_cache'):
+            request._request._request._embed_cache = {}
+        cache = request._request._request._embed_cache
+
+        if not isinstance(view, ListModelMixin):
+            try:
+                item = view.get_object()
+            except Exception as e:
+                with transaction.atomic():
+                    ret = view.handle_exception(e).data
+                return ret
+
+        _cache_key = (v.cls, self.field_name, view.get_serializer_class(), (type(item), item.id))
+        if _cache_key in cache:
+            # We already have the result for this embed, return it
+            return cache[_cache_key]
+
+        # Cache serializers. to_representation of a serializer should NOT augment it's fields so resetting the context
+        # should be sufficient for reuse
+        if not view.get_serializer_class() in cache:
+            cache[view.get_serializer_class()] = view.get_serializer_class()(many=isinstance(view, ListModelMixin), context=view.get_serializer_context())
+        ser = cache[view.get_serializer_class()]
+
+        try:
+            ser._context = view.get_serializer_context()
+
+            if not isinstance(view, ListModelMixin):
+                ret = ser.to_representation(item)
+            else:
+                # get_queryset checks the permissions even if the objects were prefetched
+                queryset = view.get_queryset()
+                batch = self.batches.get((v.cls, item.pk))
+                if batch is None:
+                    queryset = view.filter_queryset(queryset)
+                else:
+                    queryset = batch
+                    view.embed_batch_meta = self.batch_meta[(v.cls, item.pk)]
+                page = view.paginate_queryset(getattr(queryset, '_results_cache', None) or queryset)
+
+                ret = ser.to_representation(page or queryset)
+
+                if page is not None:
+                    request.parser_context['view'] = view
+                    request.parser_context['kwargs'].pop('request')
+                    view.paginator.request = request
+                    ret = view.paginator.get_paginated_response(ret).data
+        except Exception as e:
+            with transaction.atomic():
+                ret = view.handle_exception(e).data
+
+        # Allow request to be gc'd
+        ser._context = None
+
+        # Cache our final result
+        cache[_cache_key] = ret
+
+        return ret
+
+
 class LinkedNodesRelationship(JSONAPIBaseView, generics.RetrieveUpdateDestroyAPIView, generics.CreateAPIView):
     """ Relationship Endpoint for Linked Node relationships
 
@@ -461,12 +545,32 @@ class BaseContributorDetail(JSONAPIBaseView, generics.RetrieveAPIView):
 class BaseContributorList(JSONAPIBaseView, generics.ListAPIView, ListFilterMixin):
 
     ordering = ('-modified',)
+    # Embedded in a page of nodes, the contributors of all of them are loaded at once, see EmbedPartial
+    embed_batch_kwarg = 'node_id'
 
     def get_default_queryset(self):
         node = self.get_node()
 
         return node.contributor_set.all().include('user__guids')
 
+    def get_embed_batch(self, nodes):
+        """Return the contributors of each of ``nodes`` by node id, in the order of the list."""
+        nodes_by_id = {node.id: node for node in nodes}
+        contributors = defaultdict(list)
+        for contributor in self.filter_queryset(Contributor.objects.filter(node__in=nodes).include('user__guids')):
+            contributor.node = nodes_by_id[contributor.node_id]
+            contributors[contributor.node_id].append(contributor)
+        return contributors
+
+    def get_embed_batch_meta(self, nodes):
+        """Count the bibliographic contributors of each of ``nodes``, whatever the embed filters."""
+        counts = (
+            Contributor.objects.filter(node__in=nodes, visible=True)
+            .values('node_id').annotate(count=Count('id')).values_list('node_id', 'count')
+        )
+        totals = dict(counts)
+        return {node.pk: {'total_bibliographic': totals.get(node.pk, 0)} for node in nodes}
+
     def get_queryset(self):
         queryset = self.get_queryset_from_request()
         # If bulk request, queryset only contains contributors in request
@@ -0,0 +1,54 @@
+"""Cache of the totals of paginated API lists, see ``api.base.pagination.ListCountPaginator``.
+
+Only views with ``cache_list_count`` set cache their totals, and the model they list must start
+a new generation whenever a write can change a total, see ``invalidate_list_counts``.
+
+A total is cached by view, filters and user, under the current generation of the listed model.
+Starting a new generation means the totals cached before are not used. Lists filtered on fields
+that change on every write, like ``date_modified``, are not cached.
+"""
+import hashlib
+import json
+
+from django.core.cache import cache
+
+GENERATION_KEY = 'api:list-count-generation:{}'
+COUNT_KEY = 'api:list-count:{}:{}'
+
+# Query parameters that don't change which objects are listed
+UNFILTERED_PARAMS = {
+    '_', 'embed', 'embed[]', 'envelope', 'esi', 'format', 'page', 'page[size]', 'related_counts', 'version',
+}
+# Filters on fields that change without starting a new generation
+VOLATILE_FILTERS = ('filter[date_modified]', 'filter[modified]', 'filter[last_logged]')
+
+
+def model_label(model):
+    return model._meta.concrete_model._meta.label_lower
+
+
+def invalidate_list_counts(model):
+    """Forget the cached totals of the lists of ``model``."""
+    key = GENERATION_KEY.format(model_label(model))
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def list_count_key(request, view, model):
+    """Return the cache key of the total of the objects of ``model`` that ``view`` lists for
+    ``request``, or None if the total must not be cached.
+    """
+    filters = sorted(
+        (param, sorted(request.query_params.getlist(param)))
+        for param in request.query_params
+        if param not in UNFILTERED_PARAMS and not param.startswith('fields[')
+    )
+    if any(param.startswith(VOLATILE_FILTERS) for param, _ in filters):
+        return None
+    user = request.user
+    fingerprint = None if user.is_anonymous else user.pk
+    raw = json.dumps([getattr(view, 'view_fqn', type(view).__name__), sorted(view.kwargs.items()), filters, fingerprint], default=repr)
+    generation = cache.get(GENERATION_KEY.format(model_label(model)), 0)
+    return COUNT_KEY.format(generation, hashlib.sha1(raw).hexdigest())
@@ -1,88 +1,211 @@
+import os
+import re
+import threading
 import urlparse
+from collections import OrderedDict
 
+import gevent
 import requests
 import logging
+from gevent.pool import Pool
 
+from framework import outbound
 from framework.celery_tasks import app
+from framework.postcommit_tasks.handlers import enqueue_postcommit_task, postcommit_queue
 from website import settings
 
 logger = logging.getLogger(__name__)
 
+_local = threading.local()
+_metrics = {'paths': 0, 'patterns': 0, 'bans': 0, 'sent': 0, 'retried': 0, 'failed': 0}
+
+REGEX_SPECIAL_CHARACTERS = re.compile(r'([\\.^$|?*+()\[\]{}])')
+
 
 def get_varnish_servers():
     #  TODO: this should get the varnish servers from HAProxy or a setting
     return settings.VARNISH_SERVERS
 
 
-def get_bannable_urls(instance):
+def ban_metrics():
+    """Counts of the bans of this process: the ``paths`` to ban, the regex ``patterns`` they were
+    collapsed into, the ``bans`` of those patterns sent to each server, and how many of those were
+    ``sent``, ``retried`` or ``failed``.
+    """
+    return dict(_metrics)
+
+
+def get_bannable_paths(instance):
+    """Return the paths of the API urls to ban when ``instance`` changes, and the hostname of the API."""
     from osf.models import Comment
-    bannable_urls = []
-    parsed_absolute_url = {}
 
     if not hasattr(instance, 'absolute_api_v2_url'):
         logger.warning('Tried to ban {}:{} but it didn\'t have a absolute_api_v2_url method'.format(instance.__class__, instance))
         return [], ''
 
+    parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
+    paths = [parsed_absolute_url.path]
+    if isinstance(instance, Comment):
+        try:
+            paths.append(urlparse.urlparse(instance.target.referent.absolute_api_v2_url).path)
+        except AttributeError:
+            # some referents don't have an absolute_api_v2_url
+            # I'm looking at you NodeWikiPage
+            # Note: NodeWikiPage has been deprecated. Is this an issue with WikiPage/WikiVersion?
+            pass
+
+        try:
+            paths.append(urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url).path)
+        except AttributeError:
+            # some root_targets don't have an absolute_api_v2_url
+            pass
+
+    return paths, parsed_absolute_url.hostname
+
+
+def get_bannable_urls(instance):
+    bannable_urls = []
+    paths, hostname = get_bannable_paths(instance)
     for host in get_varnish_servers():
-        # add instance url
         varnish_parsed_url = urlparse.urlparse(host)
-        parsed_absolute_url = urlparse.urlparse(instance.absolute_api_v2_url)
-        url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                          netloc=varnish_parsed_url.netloc,
-                                                          path=parsed_absolute_url.path)
-        bannable_urls.append(url_string)
-        if isinstance(instance, Comment):
-            try:
-                parsed_target_url = urlparse.urlparse(instance.target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some referents don't have an absolute_api_v2_url
-                # I'm looking at you NodeWikiPage
-                # Note: NodeWikiPage has been deprecated. Is this an issue with WikiPage/WikiVersion?
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                                  netloc=varnish_parsed_url.netloc,
-                                                                  path=parsed_target_url.path)
-                bannable_urls.append(url_string)
-
-            try:
-                parsed_root_target_url = urlparse.urlparse(instance.root_target.referent.absolute_api_v2_url)
-            except AttributeError:
-                # some root_targets don't have an absolute_api_v2_url
-                pass
-            else:
-                url_string = '{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
-                                                              netloc=varnish_parsed_url.netloc,
-                                                              path=parsed_root_target_url.path)
-                bannable_urls.append(url_string)
-
-    return bannable_urls, parsed_absolute_url.hostname
+        for path in paths:
+            bannable_urls.append('{scheme}://{netloc}{path}.*'.format(scheme=varnish_parsed_url.scheme,
+                                                                     netloc=varnish_parsed_url.netloc,
+                                                                     path=path))
+    return bannable_urls, hostname
+
+
+def _escape(path):
+    return REGEX_SPECIAL_CHARACTERS.sub(r'\\\1', path)
+
+
+def _alternation(paths):
+    if len(paths) == 1:
+        return '{}.*'.format(_escape(paths[0]))
+    prefix = os.path.commonprefix(paths)
+    prefix = prefix[:prefix.rfind('/') + 1]
+    return '{}({}).*'.format(_escape(prefix), '|'.join(_escape(path[len(prefix):]) for path in paths))
+
+
+def collapse_paths(paths):
+    """Return the fewest regexes, of at most ``settings.VARNISH_BAN_MAX_LENGTH`` characters unless a
+    single path is longer, that match every url starting with one of ``paths``.
+
+    Paths that start with another of the paths are dropped, and the rest are grouped, in order,
+    into alternations after their common prefix, e.g. ``/v2/nodes/(abc12/|def34/).*``.
+    """
+    kept = []
+    # Sorted, any path that starts with a kept path comes right after it
+    for path in sorted(set(paths)):
+        if not kept or not path.startswith(kept[-1]):
+            kept.append(path)
+
+    patterns = []
+    group = []
+    for path in kept:
+        if group and len(_alternation(group + [path])) > settings.VARNISH_BAN_MAX_LENGTH:
+            patterns.append(_alternation(group))
+            group = []
+        group.append(path)
+    if group:
+        patterns.append(_alternation(group))
+    return patterns
+
+
+def send_ban(server, hostname, pattern):
+    """Ban the urls of ``hostname`` that match ``pattern`` from the Varnish ``server``, retrying
+    with backoff after timeouts and server errors. Return whether the ban succeeded.
+    """
+    parsed_server = urlparse.urlparse(server)
+    url = '{scheme}://{netloc}{pattern}'.format(scheme=parsed_server.scheme, netloc=parsed_server.netloc, pattern=pattern)
+    request = outbound.get_session('varnish').prepare_request(requests.Request('BAN', url, headers=dict(
+        Host=hostname
+    )))
+    # requests quotes the | of the alternations, but Varnish bans by the url as it is sent
+    request.url = url
+
+    error = None
+    for attempt in range(settings.VARNISH_BAN_RETRIES + 1):
+        if attempt:
+            _metrics['retried'] += 1
+            gevent.sleep(settings.VARNISH_BAN_BACKOFF * 2 ** (attempt - 1))
+        try:
+            response = outbound.send('varnish', request)
+        except requests.RequestException as ex:
+            error = ex
+            continue
+        if response.ok:
+            _metrics['sent'] += 1
+            logger.info('Banning {} succeeded'.format(url))
+            return True
+        error = response.text
+        if response.status_code < 500:
+            break
+
+    _metrics['failed'] += 1
+    logger.error('Banning {} failed: {}'.format(url, error))
+    return False
+
+
+def ban_paths(paths_by_hostname):
+    """Ban the urls starting with any of the paths of each hostname in ``paths_by_hostname``
+    from all the Varnish servers. Return the number of bans that failed.
+    """
+    bans = []
+    for hostname, paths in paths_by_hostname.items():
+        patterns = collapse_paths(paths)
+        _metrics['paths'] += len(paths)
+        _metrics['patterns'] += len(patterns)
+        bans.extend((server, hostname, pattern) for pattern in patterns for server in get_varnish_servers())
+    _metrics['bans'] += len(bans)
+
+    pool = Pool(settings.VARNISH_BAN_CONCURRENCY)
+    failed = pool.map(lambda ban: not send_ban(*ban), bans).count(True)
+    logger.debug('Varnish bans: {}'.format(ban_metrics()))
+    return failed
+
+
+class BanCollector(object):
+    """The instances changed by a request, to ban from Varnish once the request is done."""
+
+    def __init__(self):
+        # The postcommit queue of the request, which is replaced when a new request starts
+        # or when the request fails and its postcommit functions are thrown away
+        self.queue = postcommit_queue()
+        self.instances = OrderedDict()
+        self.sent = False
+
+    def add(self, instance):
+        self.instances[(type(instance), instance.pk)] = instance
+
+    def get_paths(self):
+        paths_by_hostname = {}
+        for instance in self.instances.values():
+            paths, hostname = get_bannable_paths(instance)
+            if paths:
+                paths_by_hostname.setdefault(hostname, set()).update(paths)
+        return paths_by_hostname
+
+
+def ban_collected(collector):
+    collector.sent = True
+    if settings.ENABLE_VARNISH:
+        ban_paths(collector.get_paths())
+
+
+def enqueue_ban(instance):
+    """Ban the urls of ``instance`` from Varnish after the current request, together with those
+    of every other instance the request changed.
+    """
+    collector = getattr(_local, 'ban_collector', None)
+    if collector is None or collector.sent or collector.queue is not postcommit_queue():
+        collector = _local.ban_collector = BanCollector()
+        enqueue_postcommit_task(ban_collected, (collector, ), {}, celery=False, once_per_request=True)
+    collector.add(instance)
 
 
 @app.task(max_retries=5, default_retry_delay=60)
 def ban_url(instance):
-    # TODO: Refactor; Pull url generation into postcommit_task handling so we only ban urls once per request
-    timeout = 0.3  # 300ms timeout for bans
     if settings.ENABLE_VARNISH:
-        bannable_urls, hostname = get_bannable_urls(instance)
-
-        for url_to_ban in set(bannable_urls):
-            try:
-                response = requests.request('BAN', url_to_ban, timeout=timeout, headers=dict(
-                    Host=hostname
-                ))
-            except Exception as ex:
-                logger.error('Banning {} failed: {}'.format(
-                    url_to_ban,
-                    ex.message
-                ))
-            else:
-                if not response.ok:
-                    logger.error('Banning {} failed: {}'.format(
-                        url_to_ban,
-                        response.text
-                    ))
-                else:
-                    logger.info('Banning {} succeeded'.format(
-                        url_to_ban
-                    ))
+        paths, hostname = get_bannable_paths(instance)
+        ban_paths({hostname: paths})
@@ -0,0 +1,148 @@
+from __future__ import unicode_literals
+
+import threading
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+import mock
+import pytest
+
+from api.caching import tasks
+from framework.postcommit_tasks.handlers import (
+    postcommit_after_request,
+    postcommit_before_request,
+    postcommit_queue,
+)
+from website import settings
+
+
+class FakeVarnish(ThreadingMixIn, HTTPServer):
+    """A Varnish server that records the bans it gets, and answers them with ``statuses``
+    in turn, then with 200s.
+    """
+    daemon_threads = True
+
+    def __init__(self):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeVarnishHandler)
+        self.bans = []
+        self.statuses = []
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.server_port)
+
+
+class FakeVarnishHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_BAN(self):
+        self.server.bans.append((self.path, self.headers['Host']))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeObject(object):
+
+    def __init__(self, pk, path):
+        self.pk = pk
+        self.absolute_api_v2_url = 'http://api.osf.io{}'.format(path)
+
+
+@pytest.fixture()
+def varnish_servers():
+    servers = [FakeVarnish(), FakeVarnish()]
+    for server in servers:
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+    with mock.patch.object(settings, 'ENABLE_VARNISH', True), \
+            mock.patch.object(settings, 'VARNISH_SERVERS', [server.url for server in servers]), \
+            mock.patch.object(settings, 'VARNISH_BAN_BACKOFF', 0):
+        yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+class TestCollapsePaths:
+
+    def test_single_path(self):
+        assert tasks.collapse_paths(['/v2/nodes/abc12/']) == ['/v2/nodes/abc12/.*']
+
+    def test_drops_paths_under_other_paths(self):
+        paths = ['/v2/nodes/abc12/comments/', '/v2/nodes/abc12/', '/v2/nodes/abc12/']
+        assert tasks.collapse_paths(paths) == ['/v2/nodes/abc12/.*']
+
+    def test_alternation_after_common_prefix(self):
+        paths = ['/v2/nodes/def34/', '/v2/comments/xyz/', '/v2/nodes/abc12/']
+        assert tasks.collapse_paths(paths) == ['/v2/(comments/xyz/|nodes/abc12/|nodes/def34/).*']
+
+    def test_escapes_paths(self):
+        assert tasks.collapse_paths(['/v2/files/a.b/']) == ['/v2/files/a\\.b/.*']
+
+    def test_max_length(self):
+        paths = ['/v2/nodes/{:05d}/'.format(i) for i in range(200)]
+        with mock.patch.object(settings, 'VARNISH_BAN_MAX_LENGTH', 100):
+            patterns = tasks.collapse_paths(paths)
+        assert len(patterns) > 1
+        assert all(len(pattern) <= 100 for pattern in patterns)
+        assert sum(pattern.count('|') + 1 for pattern in patterns) == 200
+
+
+class TestBanPaths:
+
+    def test_bans_from_every_server(self, varnish_servers):
+        paths = ['/v2/nodes/abc12/', '/v2/nodes/def34/']
+        assert tasks.ban_paths({'api.osf.io': paths}) == 0
+        for server in varnish_servers:
+            assert server.bans == [('/v2/nodes/(abc12/|def34/).*', 'api.osf.io')]
+
+    def test_retries_server_errors(self, varnish_servers):
+        varnish_servers[0].statuses = [503, 503]
+        assert tasks.ban_paths({'api.osf.io': ['/v2/nodes/abc12/']}) == 0
+        assert len(varnish_servers[0].bans) == 3
+        assert len(varnish_servers[1].bans) == 1
+
+    def test_gives_up(self, varnish_servers):
+        varnish_servers[0].statuses = [503] * (settings.VARNISH_BAN_RETRIES + 1)
+        varnish_servers[1].statuses = [405]
+        before = tasks.ban_metrics()
+        assert tasks.ban_paths({'api.osf.io': ['/v2/nodes/abc12/']}) == 2
+        assert len(varnish_servers[0].bans) == settings.VARNISH_BAN_RETRIES + 1
+        assert len(varnish_servers[1].bans) == 1
+        after = tasks.ban_metrics()
+        assert after['failed'] - before['failed'] == 2
+        assert after['retried'] - before['retried'] == settings.VARNISH_BAN_RETRIES
+
+
+class TestEnqueueBan:
+
+    def test_one_ban_per_request(self, varnish_servers):
+        postcommit_before_request()
+        for i in range(50):
+            tasks.enqueue_ban(FakeObject(i, '/v2/comments/c{:02d}/'.format(i)))
+            tasks.enqueue_ban(FakeObject(i, '/v2/comments/c{:02d}/'.format(i)))
+        assert len(postcommit_queue()) == 1
+        postcommit_after_request(mock.Mock(status_code=200))
+
+        for server in varnish_servers:
+            assert len(server.bans) == 1
+            assert server.bans[0][0].count('|') == 49
+
+    def test_failed_request_is_not_banned(self, varnish_servers):
+        postcommit_before_request()
+        tasks.enqueue_ban(FakeObject(1, '/v2/nodes/abc12/'))
+        postcommit_after_request(mock.Mock(status_code=500))
+
+        postcommit_before_request()
+        tasks.enqueue_ban(FakeObject(2, '/v2/nodes/def34/'))
+        postcommit_after_request(mock.Mock(status_code=200))
+
+        for server in varnish_servers:
+            assert server.bans == [('/v2/nodes/def34/.*', 'api.osf.io')]
@@ -1,6 +1,12 @@
+import hashlib
+import json
 import os
 import re
+import threading
 import httplib as http
+from collections import OrderedDict
+
+from django.core.cache import cache
 
 from citeproc import CitationStylesStyle, CitationStylesBibliography
 from citeproc import Citation, CitationItem
@@ -11,8 +17,14 @@ from framework.exceptions import HTTPError
 from framework.auth import utils
 from osf.models import PreprintService, CitationStyle
 from website.citations.utils import datetime_to_csl
+from website import settings
 from website.settings import CITATION_STYLES_PATH, BASE_PATH, CUSTOM_CITATIONS
 
+CITATION_CACHE_KEY = 'citation:{}'
+
+_styles = OrderedDict()
+_styles_lock = threading.RLock()
+
 
 def clean_up_common_errors(cit):
     cit = re.sub(r"\.+", '.', cit)
@@ -73,42 +85,107 @@ def process_name(node, user):
     }
 
 
-def render_citation(node, style='apa'):
-    """Given a node, return a citation"""
-    reformat_styles = ['apa', 'chicago-author-date', 'modern-language-association']
-    csl = None
-    if isinstance(node, PreprintService):
-        csl = preprint_csl(node, node.node)
-        data = [csl, ]
-    else:
-        data = [node.csl, ]
-
-    bib_source = CiteProcJSON(data)
-
+def _load_style(style):
     custom = CUSTOM_CITATIONS.get(style, False)
     path = os.path.join(BASE_PATH, 'static', custom) if custom else os.path.join(CITATION_STYLES_PATH, style)
 
     try:
-        bib_style = CitationStylesStyle(path, validate=False)
+        return CitationStylesStyle(path, validate=False)
     except ValueError:
         citation_style = CitationStyle.load(style)
         if citation_style is not None and citation_style.has_parent_style:
             parent_style = citation_style.parent_style
             parent_path = os.path.join(CITATION_STYLES_PATH, parent_style)
-            bib_style = CitationStylesStyle(parent_path, validate=False)
+            return CitationStylesStyle(parent_path, validate=False)
         else:
             raise ValueError('Unable to find a dependent or independent parent style related to {}.csl'.format(style))
 
-    bibliography = CitationStylesBibliography(bib_style, bib_source, formatter.plain)
 
-    citation = Citation([CitationItem(node._id)])
+def get_style(style):
+    """Return the parsed CSL of ``style``, or of its parent if it is a dependent style. The
+    ``settings.CITATION_STYLES_CACHE_SIZE`` most recently used styles are kept parsed.
+    """
+    with _styles_lock:
+        try:
+            bib_style = _styles.pop(style)
+        except KeyError:
+            bib_style = _load_style(style)
+        _styles[style] = bib_style
+        while len(_styles) > settings.CITATION_STYLES_CACHE_SIZE:
+            _styles.popitem(last=False)
+    return bib_style
+
+
+def _citation_data(node):
+    if isinstance(node, PreprintService):
+        return preprint_csl(node, node.node), node.node
+    return node.csl, node
+
+
+def _bibliography(bib_style, data):
+    """Render the bibliography entries of ``data``, a list of CSL items, in order."""
+    # Parsed styles are shared, and citeproc keeps the formatter of a bibliography on its style
+    with _styles_lock:
+        bibliography = CitationStylesBibliography(bib_style, CiteProcJSON(data), formatter.plain)
+        for csl in data:
+            bibliography.register(Citation([CitationItem(csl['id'])]))
+        return [unicode(entry) for entry in bibliography.bibliography()]
+
+
+def get_citation_cache_key(node, style):
+    modified = [getattr(node, 'modified', None)]
+    if isinstance(node, PreprintService):
+        modified.append(node.node.modified)
+    if None in modified:
+        return None
+    raw = json.dumps([type(node).__name__, node._id, style] + [each.isoformat() for each in modified])
+    return CITATION_CACHE_KEY.format(hashlib.sha1(raw).hexdigest())
+
+
+def render_citation(node, style='apa'):
+    """Given a node, return a citation.
+
+    Citations are cached for ``settings.CITATION_CACHE_TIMEOUT`` seconds, until the node changes.
+    """
+    key = get_citation_cache_key(node, style) if settings.CITATION_CACHE_TIMEOUT else None
+    if key:
+        cit = cache.get(key)
+        if cit is not None:
+            return cit
+
+    csl, cit_node = _citation_data(node)
+    bib = _bibliography(get_style(style), [csl])
+    cit = format_citation(cit_node, csl, bib[0] if len(bib) else '', style)
+
+    if key:
+        cache.set(key, cit, settings.CITATION_CACHE_TIMEOUT)
+    return cit
 
-    bibliography.register(citation)
 
-    bib = bibliography.bibliography()
-    cit = unicode(bib[0] if len(bib) else '')
+def render_citations(nodes, style='apa'):
+    """Given nodes, return their citations in one style, in order, rendered as one bibliography.
 
-    title = csl['title'] if csl else node.csl['title']
+    Unlike ``render_citation``, the citations are not cached, and styles that number their entries
+    number them in order.
+    """
+    data = OrderedDict()
+    for node in nodes:
+        if node._id not in data:
+            data[node._id] = _citation_data(node)
+
+    bib = _bibliography(get_style(style), [csl for csl, _ in data.values()])
+    citations = {
+        _id: format_citation(cit_node, csl, cit, style)
+        for (_id, (csl, cit_node)), cit in zip(data.items(), bib)
+    }
+    return [citations[node._id] for node in nodes]
+
+
+def format_citation(node, csl, cit, style):
+    """Clean up ``cit``, the citation citeproc rendered from ``csl``, the CSL of ``node``."""
+    reformat_styles = ['apa', 'chicago-author-date', 'modern-language-association']
+
+    title = csl['title']
     title = title.rstrip('.')
     if cit.count(title) == 1:
         i = cit.index(title)
@@ -125,17 +202,12 @@ def render_citation(node, style='apa'):
         if (style in reformat_styles):
             cit = add_period_to_title(cit)
 
-    if isinstance(node, PreprintService):
-        cit_node = node.node
-    else:
-        cit_node = node
-
     if style == 'apa':
-        cit = apa_reformat(cit_node, cit)
+        cit = apa_reformat(node, cit)
     if style == 'chicago-author-date':
-        cit = chicago_reformat(cit_node, cit)
+        cit = chicago_reformat(node, cit)
     if style == 'modern-language-association':
-        cit = mla_reformat(cit_node, cit)
+        cit = mla_reformat(node, cit)
 
     return cit
 
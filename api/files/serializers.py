@@ -2,11 +2,12 @@ from datetime import datetime
 from collections import OrderedDict
 
 from django.core.urlresolvers import resolve, reverse
+from django.db.models import OuterRef, Subquery
 import furl
 import pytz
 
 from framework.auth.core import Auth
-from osf.models import BaseFileNode, OSFUser, Comment
+from osf.models import BaseFileNode, OSFUser, Comment, FileVersion
 from rest_framework import serializers as ser
 from website import settings
 from website.util import api_v2_url
@@ -143,6 +144,12 @@ class BaseFileSerializer(JSONAPISerializer):
         'last_touched',
         'tags',
     ])
+    field_expressions = {
+        # The size of the latest version, as in get_size
+        'size': Subquery(
+            FileVersion.objects.filter(basefilenode=OuterRef('pk')).order_by('-created').values('size')[:1]
+        ),
+    }
     id = IDField(source='_id', read_only=True)
     type = TypeField()
     guid = ser.SerializerMethodField(read_only=True,
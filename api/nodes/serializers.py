@@ -1,4 +1,5 @@
 from django.db import connection
+from django.db.models import Count
 
 from api.base.exceptions import (Conflict, EndpointNotImplementedError,
                                  InvalidModelValueError,
@@ -24,8 +25,8 @@ from rest_framework import serializers as ser
 from rest_framework import exceptions
 from addons.base.exceptions import InvalidAuthError, InvalidFolderError
 from website.exceptions import NodeStateError
-from osf.models import (Comment, DraftRegistration, Institution,
-                        MetaSchema, AbstractNode, PrivateLink)
+from osf.models import (Comment, Contributor, DraftRegistration, Institution,
+                        MetaSchema, AbstractNode, NodeLog, NodeRelation, PrivateLink)
 from osf.models.external import ExternalAccount
 from osf.models.licenses import NodeLicense
 from osf.models.preprint_service import PreprintService
@@ -149,6 +150,17 @@ def get_license_details(node, validated_data):
         'copyrightHolders': license_holders
     }
 
+def count_by(queryset, field, objs):
+    """Count the rows of ``queryset`` for each of ``objs``, which ``field`` refers to.
+
+    :return dict: Count by object pk, without the objects that have no rows
+    """
+    queryset = queryset.filter(**{'{}__in'.format(field): [obj.pk for obj in objs]})
+    if hasattr(queryset, 'include'):
+        queryset = queryset.include(None)
+    return dict(queryset.order_by().values_list(field).annotate(count=Count('pk', distinct=True)))
+
+
 class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
     # TODO: If we have to redo this implementation in any of the other serializers, subclass ChoiceField and make it
     # handle blank choices properly. Currently DRF ChoiceFields ignore blank options, which is incorrect in this
@@ -411,76 +423,118 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
     def get_logs_count(self, obj):
         return obj.logs.count()
 
+    def get_logs_count_batch(self, objs):
+        return count_by(NodeLog.objects.all(), 'node_id', objs)
+
     def get_node_count(self, obj):
+        return self.get_node_count_batch([obj]).get(obj.id, 0)
+
+    def get_node_count_batch(self, objs):
         auth = get_user_auth(self.context['request'])
         user_id = getattr(auth.user, 'id', None)
         with connection.cursor() as cursor:
             cursor.execute('''
                 WITH RECURSIVE parents AS (
-                  SELECT parent_id, child_id
+                  SELECT child_id AS node_id, parent_id
                   FROM osf_noderelation
-                  WHERE child_id = %s AND is_node_link IS FALSE
+                  WHERE child_id = ANY(%(node_ids)s) AND is_node_link IS FALSE
                 UNION ALL
-                  SELECT osf_noderelation.parent_id, parents.parent_id AS child_id
-                  FROM parents JOIN osf_noderelation ON parents.PARENT_ID = osf_noderelation.child_id
+                  SELECT parents.node_id, osf_noderelation.parent_id
+                  FROM parents JOIN osf_noderelation ON parents.parent_id = osf_noderelation.child_id
                   WHERE osf_noderelation.is_node_link IS FALSE
-                ), has_admin AS (SELECT * FROM osf_contributor WHERE (node_id IN (SELECT parent_id FROM parents) OR node_id = %s) AND user_id = %s AND admin IS TRUE LIMIT 1)
-                SELECT DISTINCT
-                  COUNT(child_id)
+                ), has_admin AS (
+                  SELECT node.id AS node_id
+                  FROM unnest(%(node_ids)s::int[]) AS node(id)
+                  WHERE EXISTS (
+                    SELECT 1 FROM osf_contributor
+                    WHERE user_id = %(user_id)s AND admin IS TRUE
+                    AND (node_id = node.id OR node_id IN (SELECT parent_id FROM parents WHERE parents.node_id = node.id))
+                  )
+                )
+                SELECT
+                  osf_noderelation.parent_id, COUNT(DISTINCT child_id)
                 FROM
                   osf_noderelation
                 JOIN osf_abstractnode ON osf_noderelation.child_id = osf_abstractnode.id
                 JOIN osf_contributor ON osf_abstractnode.id = osf_contributor.node_id
                 LEFT JOIN osf_privatelink_nodes ON osf_abstractnode.id = osf_privatelink_nodes.abstractnode_id
                 LEFT JOIN osf_privatelink ON osf_privatelink_nodes.privatelink_id = osf_privatelink.id
-                WHERE parent_id = %s AND is_node_link IS FALSE
+                WHERE osf_noderelation.parent_id = ANY(%(node_ids)s) AND is_node_link IS FALSE
                 AND osf_abstractnode.is_deleted IS FALSE
                 AND (
                   osf_abstractnode.is_public
-                  OR (TRUE IN (SELECT TRUE FROM has_admin))
-                  OR (osf_contributor.user_id = %s AND osf_contributor.read IS TRUE)
-                  OR (osf_privatelink.key = %s AND osf_privatelink.is_deleted = FALSE)
-                );
-            ''', [obj.id, obj.id, user_id, obj.id, user_id, auth.private_key])
+                  OR osf_noderelation.parent_id IN (SELECT node_id FROM has_admin)
+                  OR (osf_contributor.user_id = %(user_id)s AND osf_contributor.read IS TRUE)
+                  OR (osf_privatelink.key = %(private_key)s AND osf_privatelink.is_deleted = FALSE)
+                )
+                GROUP BY osf_noderelation.parent_id;
+            ''', {'node_ids': [obj.id for obj in objs], 'user_id': user_id, 'private_key': auth.private_key})
 
-            return int(cursor.fetchone()[0])
+            return dict(cursor.fetchall())
 
     def get_contrib_count(self, obj):
         return len(obj.contributors)
 
+    def get_contrib_count_batch(self, objs):
+        return count_by(Contributor.objects.all(), 'node_id', objs)
+
     def get_registration_count(self, obj):
         auth = get_user_auth(self.context['request'])
         registrations = [node for node in obj.registrations_all if node.can_view(auth)]
         return len(registrations)
 
+    def get_registration_count_batch(self, objs):
+        registrations = AbstractNode.objects.filter(id__in=self._viewable_nodes().values('id'))
+        return count_by(registrations, 'registered_from_id', objs)
+
     def get_pointers_count(self, obj):
         return obj.linked_nodes.count()
 
+    def get_pointers_count_batch(self, objs):
+        return count_by(NodeRelation.objects.filter(is_node_link=True), 'parent_id', objs)
+
     def get_node_links_count(self, obj):
-        count = 0
-        auth = get_user_auth(self.context['request'])
-        for pointer in obj.linked_nodes.filter(is_deleted=False).exclude(type='osf.collection').exclude(type='osf.registration'):
-            if pointer.can_view(auth):
-                count += 1
-        return count
+        return self.get_node_links_count_batch([obj]).get(obj.id, 0)
+
+    def get_node_links_count_batch(self, objs):
+        linked_nodes = self._viewable_nodes().filter(is_deleted=False).exclude(type__in=['osf.collection', 'osf.registration'])
+        return count_by(NodeRelation.objects.filter(is_node_link=True, child__in=linked_nodes.values('id')), 'parent_id', objs)
 
     def get_registration_links_count(self, obj):
-        count = 0
+        return self.get_registration_links_count_batch([obj]).get(obj.id, 0)
+
+    def get_registration_links_count_batch(self, objs):
+        linked_registrations = self._viewable_nodes().filter(is_deleted=False, type='osf.registration')
+        return count_by(NodeRelation.objects.filter(is_node_link=True, child__in=linked_registrations.values('id')), 'parent_id', objs)
+
+    def _viewable_nodes(self):
+        """The nodes the request may view, as checked by ``AbstractNode.can_view``."""
         auth = get_user_auth(self.context['request'])
-        for pointer in obj.linked_nodes.filter(is_deleted=False, type='osf.registration').exclude(type='osf.collection'):
-            if pointer.can_view(auth):
-                count += 1
-        return count
+        if auth.private_key and getattr(auth.private_link, 'anonymous', False):
+            return auth.private_link.nodes.all()
+        return AbstractNode.objects.can_view(user=auth.user, private_link=auth.private_key)
 
     def get_linked_by_nodes_count(self, obj):
         return obj._parents.filter(is_node_link=True, parent__is_deleted=False, parent__type='osf.node').count()
 
+    def get_linked_by_nodes_count_batch(self, objs):
+        linked_by = NodeRelation.objects.filter(is_node_link=True, parent__is_deleted=False, parent__type='osf.node')
+        return count_by(linked_by, 'child_id', objs)
+
     def get_linked_by_registrations_count(self, obj):
         return obj._parents.filter(is_node_link=True, parent__type='osf.registration', parent__retraction__isnull=True).count()
 
+    def get_linked_by_registrations_count_batch(self, objs):
+        linked_by = NodeRelation.objects.filter(is_node_link=True, parent__type='osf.registration', parent__retraction__isnull=True)
+        return count_by(linked_by, 'child_id', objs)
+
     def get_forks_count(self, obj):
         return obj.forks.exclude(type='osf.registration').exclude(is_deleted=True).count()
 
+    def get_forks_count_batch(self, objs):
+        forks = AbstractNode.objects.exclude(type='osf.registration').exclude(is_deleted=True)
+        return count_by(forks, 'forked_from_id', objs)
+
     def get_unread_comments_count(self, obj):
         user = get_user_auth(self.context['request']).user
         node_comments = Comment.find_n_unread(user=user, node=obj, page='node')
@@ -490,30 +544,54 @@ class NodeSerializer(TaxonomizableSerializerMixin, JSONAPISerializer):
         }
 
     def create(self, validated_data):
+        return self.bulk_create([validated_data])[0]
+
+    def bulk_create(self, validated_data_list):
+        """Create a node for each item of a bulk request. Nodes created from the same
+        template are created together, with a single `bulk_use_as_template` call.
+        """
         request = self.context['request']
-        user = request.user
         Node = apps.get_model('osf.Node')
+        nodes = [None] * len(validated_data_list)
+        templated = {}  # template guid -> [(index, changes)]
+        related_data = []
+        for index, validated_data in enumerate(validated_data_list):
+            related_data.append(self._pop_related_data(validated_data))
+            if 'template_from' in validated_data:
+                template_from = validated_data.pop('template_from')
+                validated_data.pop('creator')
+                templated.setdefault(template_from, []).append((index, {template_from: validated_data}))
+            else:
+                nodes[index] = Node(**validated_data)
+
+        for template_from, items in templated.items():
+            template_node = Node.load(template_from)
+            if template_node is None:
+                raise exceptions.NotFound
+            if not template_node.has_permission(request.user, 'read', check_parent=False):
+                raise exceptions.PermissionDenied
+            new_nodes = template_node.bulk_use_as_template(auth=get_user_auth(request), changes_list=[changes for _, changes in items])
+            for (index, _), node in zip(items, new_nodes):
+                nodes[index] = node
+
+        return [
+            self._finish_create(node, validated_data, *related)
+            for node, validated_data, related in zip(nodes, validated_data_list, related_data)
+        ]
+
+    def _pop_related_data(self, validated_data):
         tag_instances = []
-        affiliated_institutions = None
-        if 'affiliated_institutions' in validated_data:
-            affiliated_institutions = validated_data.pop('affiliated_institutions')
+        affiliated_institutions = validated_data.pop('affiliated_institutions', None)
         if 'tags' in validated_data:
             tags = validated_data.pop('tags')
             for tag in tags:
                 tag_instance, created = Tag.objects.get_or_create(name=tag, defaults=dict(system=False))
                 tag_instances.append(tag_instance)
-        if 'template_from' in validated_data:
-            template_from = validated_data.pop('template_from')
-            template_node = Node.load(template_from)
-            if template_node is None:
-                raise exceptions.NotFound
-            if not template_node.has_permission(user, 'read', check_parent=False):
-                raise exceptions.PermissionDenied
-            validated_data.pop('creator')
-            changed_data = {template_from: validated_data}
-            node = template_node.use_as_template(auth=get_user_auth(request), changes=changed_data)
-        else:
-            node = Node(**validated_data)
+        return tag_instances, affiliated_institutions
+
+    def _finish_create(self, node, validated_data, tag_instances, affiliated_institutions):
+        request = self.context['request']
+        user = request.user
         try:
             node.save()
         except ValidationError as e:
@@ -1,12 +1,13 @@
 import re
 
 from django.apps import apps
+from django.conf import settings as django_settings
 from django.db.models import Q, OuterRef, Exists, Subquery
 from django.utils import timezone
 from rest_framework import generics, permissions as drf_permissions
 from rest_framework.exceptions import PermissionDenied, ValidationError, NotFound, MethodNotAllowed, NotAuthenticated
 from rest_framework.response import Response
-from rest_framework.status import HTTP_204_NO_CONTENT
+from rest_framework.status import HTTP_202_ACCEPTED, HTTP_204_NO_CONTENT
 
 from addons.osfstorage.models import OsfStorageFolder
 from api.addons.serializers import NodeAddonFolderSerializer
@@ -100,6 +101,7 @@ from api.users.views import UserMixin
 from api.users.serializers import UserSerializer
 from api.wikis.serializers import NodeWikiSerializer
 from framework.auth.oauth_scopes import CoreScopes
+from framework.celery_tasks.handlers import enqueue_task
 from osf.models import AbstractNode
 from osf.models import (Node, PrivateLink, Institution, Comment, DraftRegistration, Registration, )
 from osf.models import OSFUser
@@ -111,6 +113,7 @@ from osf.utils.permissions import ADMIN, PERMISSIONS
 from website import mails
 from website.exceptions import NodeStateError
 from website.project import signals as project_signals
+from website.project.tasks import fork_node
 
 
 class NodeMixin(object):
@@ -193,6 +196,8 @@ class NodeList(JSONAPIBaseView, bulk_views.BulkUpdateJSONAPIView, bulk_views.Bul
     view_name = 'node-list'
 
     ordering = ('-modified', )  # default ordering
+    cursor_ordering = ('-modified', 'id')  # ordering with page[cursor]
+    cache_list_count = True  # totals are cached until nodes or contributors change
 
     # overrides NodesFilterMixin
     def get_default_queryset(self):
@@ -893,6 +898,18 @@ class NodeForksList(JSONAPIBaseView, generics.ListCreateAPIView, NodeMixin, Node
         node_pks = [node.pk for node in all_forks if node.can_view(auth)]
         return AbstractNode.objects.filter(pk__in=node_pks)
 
+    # overrides ListCreateAPIView
+    def create(self, request, *args, **kwargs):
+        threshold = django_settings.FORK_ASYNC_NODE_THRESHOLD
+        node = self.get_node()
+        if threshold is None or AbstractNode.objects.get_descendants(node, active=True).count() <= threshold:
+            return super(NodeForksList, self).create(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        user = get_user_auth(request).user
+        enqueue_task(fork_node.s(node._id, user._id, title=serializer.validated_data.get('title')))
+        return Response(status=HTTP_202_ACCEPTED)
+
     # overrides ListCreateAPIView
     def perform_create(self, serializer):
         user = get_user_auth(self.request).user
@@ -1287,6 +1304,7 @@ class NodeLogList(JSONAPIBaseView, generics.ListAPIView, NodeMixin, ListFilterMi
     log_lookup_url_kwarg = 'node_id'
 
     ordering = ('-date', )
+    cursor_ordering = ('-date', 'id')
 
     permission_classes = (
         drf_permissions.IsAuthenticatedOrReadOnly,
@@ -77,6 +77,7 @@ class PreprintList(JSONAPIBaseView, generics.ListCreateAPIView, PreprintFilterMi
     serializer_class = PreprintSerializer
 
     ordering = ('-created')
+    cursor_ordering = ('-modified', 'id')
     ordering_fields = ('created', 'date_last_transitioned')
     view_category = 'preprints'
     view_name = 'preprint-list'
@@ -94,6 +94,7 @@ class RegistrationList(JSONAPIBaseView, generics.ListAPIView, bulk_views.BulkUpd
     view_name = 'registration-list'
 
     ordering = ('-modified',)
+    cursor_ordering = ('-modified', 'id')
     model_class = Registration
 
     # overrides BulkUpdateJSONAPIView
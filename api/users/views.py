@@ -258,6 +258,7 @@ class UserNodes(JSONAPIBaseView, generics.ListAPIView, UserMixin, NodesFilterMix
     view_name = 'user-nodes'
 
     ordering = ('-modified',)
+    cache_list_count = True  # totals are cached until nodes or contributors change
 
     # overrides NodesFilterMixin
     def get_default_queryset(self):
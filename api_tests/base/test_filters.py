@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 import datetime
+import mock
 import re
 
 import pytz
 from dateutil import parser
+from django.test import override_settings
 from django.utils import timezone
 
 from nose.tools import *  # flake8: noqa
@@ -147,6 +149,19 @@ class TestFilterMixin(ApiTestCase):
             False
         )
 
+    @override_settings(MAX_PYTHON_FILTER_ROWS=2)
+    def test_get_filtered_queryset_stops_at_max_rows(self):
+        params = {
+            'value': True,
+            'op': 'eq',
+            'source_field_name': 'foobar'
+        }
+        default_queryset = [FakeRecord(_id=id, foobar=True) for id in range(3)]
+        with mock.patch.object(filters.logger, 'warning') as mock_warning:
+            filtered = self.view.get_filtered_queryset('bool_field', params, default_queryset)
+        assert_equal([record._id for record in filtered], [0, 1])
+        assert_true(mock_warning.called)
+
     def test_parse_query_params_uses_field_source_attribute(self):
         query_params = {
             'filter[bool_field]': 'false',
@@ -415,56 +430,18 @@ class TestOSFOrderingFilter(ApiTestCase):
         def __str__(self):
             return self.title
 
-    def test_filter_queryset_forward(self):
-        query_to_be_sorted = [
-            self.query(x) for x in 'NewProj Zip Proj Activity'.split()]
-        sorted_query = sorted(
-            query_to_be_sorted,
-            cmp=filters.sort_multiple(['title'])
-        )
-        sorted_output = [str(i) for i in sorted_query]
-        assert_equal(sorted_output, ['Activity', 'NewProj', 'Proj', 'Zip'])
-
-    def test_filter_queryset_forward_duplicate(self):
-        query_to_be_sorted = [
-            self.query(x) for x in 'NewProj Activity Zip Activity'.split()]
-        sorted_query = sorted(
-            query_to_be_sorted,
-            cmp=filters.sort_multiple(['title'])
-        )
-        sorted_output = [str(i) for i in sorted_query]
-        assert_equal(sorted_output, ['Activity', 'Activity', 'NewProj', 'Zip'])
-
-    def test_filter_queryset_reverse(self):
-        query_to_be_sorted = [
-            self.query(x) for x in 'NewProj Zip Proj Activity'.split()]
-        sorted_query = sorted(
-            query_to_be_sorted,
-            cmp=filters.sort_multiple(['-title'])
-        )
-        sorted_output = [str(i) for i in sorted_query]
-        assert_equal(sorted_output, ['Zip', 'Proj', 'NewProj', 'Activity'])
-
-    def test_filter_queryset_reverse_duplicate(self):
-        query_to_be_sorted = [
-            self.query(x) for x in 'NewProj Activity Zip Activity'.split()]
-        sorted_query = sorted(
-            query_to_be_sorted,
-            cmp=filters.sort_multiple(['-title'])
-        )
-        sorted_output = [str(i) for i in sorted_query]
-        assert_equal(sorted_output, ['Zip', 'NewProj', 'Activity', 'Activity'])
+    def test_sort_list(self):
+        objs = [self.query(x) for x in 'NewProj Activity Zip Activity'.split()]
+        assert_equal([str(x) for x in filters.sort_list(objs, ['title'])], ['Activity', 'Activity', 'NewProj', 'Zip'])
+        assert_equal([str(x) for x in filters.sort_list(objs, ['-title'])], ['Zip', 'NewProj', 'Activity', 'Activity'])
 
-    def test_filter_queryset_handles_multiple_fields(self):
+    def test_sort_list_handles_multiple_fields(self):
         objs = [self.query_with_num(title='NewProj', number=10),
                 self.query_with_num(title='Zip', number=20),
                 self.query_with_num(title='Activity', number=30),
                 self.query_with_num(title='Activity', number=40)]
-        actual = [
-            x.number for x in sorted(
-                objs, cmp=filters.sort_multiple(['title', '-number'])
-            )]
-        assert_equal(actual, [40, 30, 10, 20])
+        assert_equal([x.number for x in filters.sort_list(objs, ['title', '-number'])], [40, 30, 10, 20])
+        assert_equal([x.number for x in filters.sort_list(objs, ['-title', 'number'])], [20, 10, 30, 40])
 
 
 class TestQueryPatternRegex(TestCase):
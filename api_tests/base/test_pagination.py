@@ -1,8 +1,14 @@
 # -*- coding: utf-8 -*-
+import mock
+from django.core.cache import cache
+from django.utils import timezone
 from nose.tools import *  # flake8: noqa
 
+from framework.auth import Auth
+from osf.models import AbstractNode
 from osf_tests import factories
 from tests.base import ApiTestCase
+from website import settings as osf_settings
 
 from api.base import settings
 from api.base.pagination import MaxSizePagination
@@ -54,3 +60,139 @@ class TestJSONAPIPagination(ApiTestCase):
         assert_not_in('meta', links)
         assert_in('total', meta)
         assert_in('per_page', meta)
+
+
+class TestCursorPagination(ApiTestCase):
+
+    def setUp(self):
+        super(TestCursorPagination, self).setUp()
+
+        self.url = '/{}nodes/?version=2.1&page[size]=4&page[cursor]='.format(settings.API_BASE)
+        self.user = factories.AuthUserFactory()
+        self.projects = [factories.ProjectFactory(creator=self.user) for _ in range(10)]
+
+    def walk(self, url, direction='next'):
+        ids = []
+        while url:
+            res = self.app.get(url, auth=self.user.auth)
+            assert_equal(res.status_code, 200)
+            ids.append([each['id'] for each in res.json['data']])
+            url = res.json['links'][direction]
+        return ids
+
+    def test_walks_all_nodes(self):
+        pages = self.walk(self.url)
+        assert_equal([len(page) for page in pages], [4, 4, 2])
+        ids = [node_id for page in pages for node_id in page]
+        assert_equal(sorted(ids), sorted(project._id for project in self.projects))
+        # -modified, id
+        modified = {project._id: project.modified for project in self.projects}
+        assert_equal([modified[node_id] for node_id in ids], sorted(modified.values(), reverse=True))
+
+    def test_prev_links(self):
+        res = self.app.get(self.url, auth=self.user.auth)
+        assert_is_none(res.json['links']['prev'])
+        assert_is_none(res.json['links']['first'])
+        assert_not_in('total', res.json['meta'])
+
+        res = self.app.get(res.json['links']['next'], auth=self.user.auth)
+        assert_is_not_none(res.json['links']['first'])
+
+        last_page_url = res.json['links']['next']
+        assert_equal(self.walk(last_page_url, direction='prev'), list(reversed(self.walk(self.url))))
+
+    def test_estimated_total(self):
+        res = self.app.get(self.url + '&page[total]=true', auth=self.user.auth)
+        assert_true(res.json['meta']['total_is_estimate'])
+        assert_is_instance(res.json['meta']['total'], int)
+
+    def test_invalid_cursor(self):
+        res = self.app.get(self.url + 'not-a-cursor', auth=self.user.auth, expect_errors=True)
+        assert_equal(res.status_code, 400)
+
+
+class TestListCounts(ApiTestCase):
+
+    def setUp(self):
+        super(TestListCounts, self).setUp()
+        cache.clear()
+
+        self.url = '/{}nodes/?version=2.1&filter[category]=project'.format(settings.API_BASE)
+        self.user = factories.AuthUserFactory()
+        self.projects = [factories.ProjectFactory(creator=self.user) for _ in range(3)]
+
+    def total(self, url=None):
+        res = self.app.get(url or self.url, auth=self.user.auth)
+        return res.json['meta']['total']
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_total_is_cached_until_a_node_is_saved(self):
+        assert_equal(self.total(), 3)
+        # Not seen by the post_save listeners
+        AbstractNode.objects.filter(id=self.projects[0].id).update(is_deleted=True)
+        assert_equal(self.total(), 3)
+        # Other filters, other total
+        assert_equal(self.total(self.url + '&filter[title]=nothing'), 0)
+
+        self.projects[1].title = 'Changed'
+        self.projects[1].save()
+        assert_equal(self.total(), 2)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_total_is_cached_by_user(self):
+        assert_equal(self.total(), 3)
+        res = self.app.get(self.url, auth=factories.AuthUserFactory().auth)
+        assert_equal(res.json['meta']['total'], 0)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_total_is_cached_until_a_node_is_tagged(self):
+        url = self.url + '&filter[tags]=cached'
+        assert_equal(self.total(url), 0)
+        self.projects[0].add_tag('cached', auth=Auth(self.user))
+        assert_equal(self.total(url), 1)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_total_is_cached_until_a_tree_is_forked(self):
+        url = '/{}users/me/nodes/?version=2.1'.format(settings.API_BASE)
+        assert_equal(self.total(url), 3)
+        self.projects[0].fork_node(Auth(self.user))
+        assert_equal(self.total(url), 4)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_logs_keep_the_cached_total(self):
+        assert_equal(self.total(), 3)
+        AbstractNode.objects.filter(id=self.projects[0].id).update(is_deleted=True)
+        self.projects[1].last_logged = timezone.now()
+        self.projects[1].save()
+        assert_equal(self.total(), 3)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_total_filtered_on_date_modified_is_not_cached(self):
+        url = self.url + '&filter[date_modified][gte]=2000-01-01'
+        assert_equal(self.total(url), 3)
+        AbstractNode.objects.filter(id=self.projects[0].id).update(is_deleted=True)
+        assert_equal(self.total(url), 2)
+
+    @mock.patch.object(osf_settings, 'API_LIST_COUNT_CACHE_TIMEOUT', 30)
+    def test_other_lists_are_not_cached(self):
+        url = '/{}nodes/{}/contributors/'.format(settings.API_BASE, self.projects[0]._id)
+        assert_equal(self.total(url), 1)
+
+        res = self.app.post_json_api(url, {
+            'data': {
+                'type': 'contributors',
+                'attributes': {},
+                'relationships': {'users': {'data': {'type': 'users', 'id': factories.UserFactory()._id}}},
+            }
+        }, auth=self.user.auth)
+        assert_equal(res.status_code, 201)
+        assert_equal(self.total(url), 2)
+
+    def test_estimated_total(self):
+        res = self.app.get(self.url, auth=self.user.auth)
+        assert_not_in('total_is_estimate', res.json['meta'])
+
+        with mock.patch.object(osf_settings, 'API_LIST_COUNT_ESTIMATE_THRESHOLD', -1):
+            res = self.app.get(self.url, auth=self.user.auth)
+        assert_true(res.json['meta']['total_is_estimate'])
+        assert_is_instance(res.json['meta']['total'], int)
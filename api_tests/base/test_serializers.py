@@ -3,7 +3,9 @@ import httplib as http
 import importlib
 import pkgutil
 
+import mock
 import pytest
+from django.http import QueryDict
 from pytz import utc
 from datetime import datetime
 import urllib
@@ -547,6 +549,36 @@ class TestShowIfVersion(ApiTestCase):
         assert_not_in('node_links', data['attributes'])
 
 
+class TestFieldPlan(ApiTestCase):
+
+    def setUp(self):
+        super(TestFieldPlan, self).setUp()
+        self.nodes = [factories.NodeFactory() for _ in range(3)]
+
+    def test_plan_is_built_once_for_many_objects(self):
+        req = make_drf_request_with_version(version='2.0')
+        with mock.patch.object(base_serializers, 'FieldPlan', wraps=base_serializers.FieldPlan) as mock_plan:
+            data = NodeSerializer(self.nodes, many=True, context={'request': req}).data
+        assert_equal(mock_plan.call_count, 1)
+        assert_equal([each['id'] for each in data], [node._id for node in self.nodes])
+        assert_equal([each['attributes']['title'] for each in data], [node.title for node in self.nodes])
+
+    def test_plan_matches_request_version(self):
+        serializer = NodeSerializer(context={'request': make_drf_request_with_version(version='2.0')})
+        assert_in('node_links', serializer.to_representation(self.nodes[0])['data']['relationships'])
+
+        serializer._context = {'request': make_drf_request_with_version(version='2.1')}
+        assert_not_in('node_links', serializer.to_representation(self.nodes[0])['data']['relationships'])
+
+    def test_plan_matches_sparse_fieldset(self):
+        req = make_drf_request_with_version(version='2.0')
+        req._request.GET = QueryDict('fields[nodes]=title,contributors')
+        data = NodeSerializer(self.nodes, many=True, context={'request': req}).data
+        for each in data:
+            assert_equal(set(each['attributes']), {'title'})
+            assert_equal(set(each['relationships']), {'contributors'})
+
+
 class VersionedDateTimeField(DbTestCase):
 
     def setUp(self):
@@ -0,0 +1,82 @@
+import pytest
+from django.core.cache import cache
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle
+
+from api.base import settings
+from api.base import throttling
+
+
+class WindowThrottle(throttling.BaseThrottle, AnonRateThrottle):
+
+    scope = 'window'
+    rate = '3/minute'
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+
+@pytest.fixture()
+def now():
+    return [600.0]
+
+@pytest.fixture()
+def throttle(now):
+    throttle = WindowThrottle()
+    throttle.engine = 'sliding-window'
+    throttle.timer = lambda: now[0]
+    return throttle
+
+def make_request(**headers):
+    return Request(RequestFactory().get('/', **headers))
+
+
+class TestSlidingWindowThrottle:
+
+    def test_refuses_over_rate(self, throttle, now):
+        request = make_request()
+        assert [throttle.allow_request(request, None) for _ in range(4)] == [True, True, True, False]
+        now[0] += 20
+        assert not throttle.allow_request(request, None)
+        assert throttle.wait() == 40
+
+    def test_weighs_previous_window(self, throttle, now):
+        request = make_request()
+        for _ in range(3):
+            throttle.allow_request(request, None)
+
+        # Half of the previous window is still in the sliding window
+        now[0] += 90
+        assert throttle.allow_request(request, None)
+        assert not throttle.allow_request(request, None)
+
+        now[0] += 30
+        assert throttle.allow_request(request, None)
+
+    def test_refused_requests_are_not_counted(self, throttle, now):
+        request = make_request()
+        for _ in range(10):
+            throttle.allow_request(request, None)
+        now[0] += 120
+        assert [throttle.allow_request(request, None) for _ in range(4)] == [True, True, True, False]
+
+    def test_constant_state_per_client(self, throttle, now):
+        request = make_request()
+        for _ in range(50):
+            throttle.allow_request(request, None)
+            now[0] += 1
+        key = throttle.get_cache_key(request, None)
+        assert cache.get('{}:{}'.format(key, int(now[0] // 60))) <= 3
+        assert cache.get(key) is None
+
+    def test_bypass_token(self, throttle):
+        request = make_request(HTTP_X_THROTTLE_TOKEN=settings.BYPASS_THROTTLE_TOKEN)
+        assert all(throttle.allow_request(request, None) for _ in range(10))
+
+    def test_separate_clients(self, throttle):
+        for _ in range(3):
+            throttle.allow_request(make_request(REMOTE_ADDR='10.0.0.1'), None)
+        assert not throttle.allow_request(make_request(REMOTE_ADDR='10.0.0.1'), None)
+        assert throttle.allow_request(make_request(REMOTE_ADDR='10.0.0.2'), None)
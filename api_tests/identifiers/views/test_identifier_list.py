@@ -218,6 +218,15 @@ class TestNodeIdentifierList:
         total = new_res.json['links']['meta']['total']
         assert total == carpid_total
 
+    def test_identifier_filter_by_serialized_category(
+            self, app, node, identifier_node, url_node_identifiers):
+        legacy = IdentifierFactory(referent=node, category='legacy_doi')
+        doi = IdentifierFactory(referent=node, category='doi')
+
+        res = app.get('{}?filter[category]=doi'.format(url_node_identifiers))
+        assert_items_equal([each['id'] for each in res.json['data']], [legacy._id, doi._id])
+        assert {each['attributes']['category'] for each in res.json['data']} == {'doi'}
+
     def test_registration_identifier_not_returned_from_registration_endpoint(
             self, identifier_node, identifier_registration,
             res_node_identifiers, data_node_identifiers
@@ -2927,3 +2927,10 @@ class TestNodeContributorFiltering:
         res = app.get(url, auth=user.auth)
         assert len(res.json['data']) == 1
         assert not res.json['data'][0]['attributes'].get('bibliographic', None)
+
+        # the bibliographic total counts the contributors that were filtered out
+        assert res.json['meta']['total_bibliographic'] == 1
+        url = base_url + '?filter[permission]=read'
+        res = app.get(url, auth=user.auth)
+        assert len(res.json['data']) == 0
+        assert res.json['meta']['total_bibliographic'] == 1
@@ -10,6 +10,7 @@ from framework.auth.core import Auth
 
 from addons.github.models import GithubFolder
 from addons.github.tests.factories import GitHubAccountFactory
+from addons.osfstorage import settings as osfstorage_settings
 from api.base.settings.defaults import API_BASE
 from api.base.utils import waterbutler_api_url_for
 from api_tests import utils as api_utils
@@ -576,6 +577,28 @@ class TestNodeFilesListFiltering(ApiTestCase):
         assert_equal(res.status_code, 400)
         assert_equal(len(res.json['errors']), 1)
 
+    def test_node_files_osfstorage_filter_and_sort_by_size(self):
+        large = api_utils.create_test_file(self.project, self.user, filename='large')
+        small = api_utils.create_test_file(self.project, self.user, filename='small')
+        small.create_version(self.user, {
+            'object': '07d80e',
+            'service': 'cloud',
+            osfstorage_settings.WATERBUTLER_RESOURCE: 'osf',
+        }, {
+            'size': 42,
+            'contentType': 'img/png'
+        }).save()
+
+        url = '/{}nodes/{}/files/osfstorage/'.format(API_BASE, self.project._id)
+        res = self.app.get(url + '?filter[size]=42', auth=self.user.auth)
+        assert_equal([each['id'] for each in res.json['data']], [small._id])
+
+        res = self.app.get(url + '?sort=size', auth=self.user.auth)
+        assert_equal([each['id'] for each in res.json['data']], [small._id, large._id])
+
+        res = self.app.get(url + '?sort=-size', auth=self.user.auth)
+        assert_equal([each['id'] for each in res.json['data']], [large._id, small._id])
+
 
 class TestNodeFilesListPagination(ApiTestCase):
     def setUp(self):
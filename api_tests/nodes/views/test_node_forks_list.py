@@ -1,5 +1,6 @@
 import pytest
 import mock
+from django.test import override_settings
 
 from api.base.settings.defaults import API_BASE
 from framework.auth.core import Auth
@@ -416,6 +417,23 @@ class TestNodeForkCreate:
         assert res.json['data']['attributes']['title'] == 'Fork of ' + \
             private_project.title
 
+    def test_fork_large_tree_in_task(
+            self, app, user, public_project_url,
+            fork_data_with_title, public_project):
+        NodeFactory(parent=public_project, creator=user)
+        with override_settings(FORK_ASYNC_NODE_THRESHOLD=0), \
+                mock.patch('api.nodes.views.enqueue_task') as mock_enqueue_task:
+            res = app.post_json_api(
+                public_project_url,
+                fork_data_with_title,
+                auth=user.auth)
+        assert res.status_code == 202
+        assert not public_project.forks.exists()
+        signature = mock_enqueue_task.call_args[0][0]
+        assert signature.task == 'website.project.tasks.fork_node'
+        assert tuple(signature.args) == (public_project._id, user._id)
+        assert signature.kwargs == {'title': 'My Forked Project'}
+
     def test_send_email_success(
             self, app, user, public_project_url,
             fork_data_with_title, public_project):
@@ -1,9 +1,13 @@
+import mock
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from api.base.settings.defaults import API_BASE, MAX_PAGE_SIZE
 from api_tests.nodes.filters.test_filters import NodesListFilteringMixin, NodesListDateFilteringMixin
 from framework.auth.core import Auth
 from osf.models import AbstractNode, Node, NodeLog
+from osf.utils.forking import template_node_tree
 from osf.utils.sanitize import strip_html
 from osf.utils import permissions
 from osf_tests.factories import (
@@ -1100,6 +1104,36 @@ class TestNodeCreate:
         assert len(new_project.nodes) == len(template_from.nodes)
         assert new_project.nodes[0].title == template_component.title
 
+    def test_bulk_creates_projects_from_template(self, app, user_one, category, url):
+        template_from = ProjectFactory(creator=user_one, is_public=True)
+        template_component = ProjectFactory(
+            creator=user_one, is_public=True, parent=template_from)
+        titles = ['Templated Project {}'.format(i) for i in range(3)]
+        templated_projects_data = {
+            'data': [{
+                'type': 'nodes',
+                'attributes': {
+                    'title': title,
+                    'category': category,
+                    'template_from': template_from._id,
+                }
+            } for title in titles]
+        }
+
+        with mock.patch('osf.models.node.template_node_tree', wraps=template_node_tree) as mock_template:
+            res = app.post_json_api(
+                url, templated_projects_data,
+                auth=user_one.auth, bulk=True)
+        assert res.status_code == 201
+        assert mock_template.call_count == 1
+        assert [each['attributes']['title'] for each in res.json['data']] == titles
+
+        for each in res.json['data']:
+            new_project = AbstractNode.load(each['id'])
+            assert new_project.template_node == template_from
+            assert not new_project.is_public
+            assert new_project.nodes[0].title == template_component.title
+
     def test_creates_project_creates_project_and_sanitizes_html(
             self, app, user_one, category, url):
         title = '<em>Cool</em> <strong>Project</strong>'
@@ -3226,6 +3260,124 @@ class TestNodeListPagination:
         assert res.json['data'][0]['embeds']['contributors']['links']['meta']['per_page'] == 10
 
 
+@pytest.mark.django_db
+class TestNodeListRelatedCounts:
+
+    COUNTED = [
+        'children', 'contributors', 'forks', 'linked_by_nodes', 'linked_by_registrations',
+        'linked_nodes', 'linked_registrations', 'logs', 'registrations',
+    ]
+
+    @pytest.fixture()
+    def url(self):
+        return '/{}nodes/?page[size]=100&related_counts=true'.format(API_BASE)
+
+    def make_project(self, user):
+        project = ProjectFactory(creator=user)
+        NodeFactory(parent=project, creator=user)
+        NodeFactory(parent=project, creator=UserFactory())
+        project.add_contributor(UserFactory(), auth=Auth(user), save=True)
+        project.add_pointer(ProjectFactory(is_public=True), auth=Auth(user), save=True)
+        project.add_pointer(ProjectFactory(is_public=False), auth=Auth(user), save=True)
+        project.add_pointer(RegistrationFactory(creator=user), auth=Auth(user), save=True)
+        project.fork_node(auth=Auth(user))
+        RegistrationFactory(project=project, creator=user)
+        return project
+
+    def counts(self, data):
+        relationships = data['relationships']
+        return {
+            name: relationships[name]['links']['related']['meta']['count']
+            for name in self.COUNTED if name in relationships
+        }
+
+    def query_count(self, app, url, user):
+        with CaptureQueriesContext(connection) as queries:
+            app.get(url, auth=user.auth)
+        return len(queries)
+
+    def test_counts_match_node_detail(self, app, user, url):
+        projects = [self.make_project(user) for _ in range(2)]
+        res = app.get(url, auth=user.auth)
+
+        listed = {data['id']: data for data in res.json['data']}
+        for project in projects:
+            detail = app.get('/{}nodes/{}/?related_counts=true'.format(API_BASE, project._id), auth=user.auth)
+            assert self.counts(listed[project._id]) == self.counts(detail.json['data'])
+        assert self.counts(listed[projects[0]._id])['children'] == 2
+        assert self.counts(listed[projects[0]._id])['linked_nodes'] == 1
+
+    def test_query_count_does_not_grow_with_page_size(self, app, user, url):
+        self.make_project(user)
+        small = self.query_count(app, url, user) - self.query_count(app, url.replace('true', 'false'), user)
+
+        for _ in range(3):
+            self.make_project(user)
+        large = self.query_count(app, url, user) - self.query_count(app, url.replace('true', 'false'), user)
+
+        assert small == large
+
+
+@pytest.mark.django_db
+class TestNodeListEmbeds:
+
+    @pytest.fixture()
+    def url(self):
+        return '/{}nodes/?page[size]=100&embed=contributors&embed=root'.format(API_BASE)
+
+    @pytest.fixture()
+    def project(self, user):
+        return ProjectFactory(creator=user, is_public=True)
+
+    @pytest.fixture()
+    def make_component(self, user, project):
+        other = UserFactory()
+
+        def make():
+            component = NodeFactory(parent=project, creator=user, is_public=True)
+            component.add_contributor(other, auth=Auth(user), visible=False, save=True)
+            return component
+        return make
+
+    def query_count(self, app, url, user):
+        with CaptureQueriesContext(connection) as queries:
+            app.get(url, auth=user.auth)
+        return len(queries)
+
+    def test_embeds_match_detail(self, app, user, project, url, make_component):
+        component = make_component()
+        res = app.get(url, auth=user.auth)
+
+        listed = {data['id']: data['embeds'] for data in res.json['data']}
+        for node in (project, component):
+            contributors = app.get('/{}nodes/{}/contributors/'.format(API_BASE, node._id), auth=user.auth).json
+            embedded = listed[node._id]['contributors']
+            assert [each['id'] for each in embedded['data']] == [each['id'] for each in contributors['data']]
+            assert embedded['meta']['total_bibliographic'] == contributors['meta']['total_bibliographic'] == 1
+            assert listed[node._id]['root']['data']['id'] == project._id
+
+    def test_embedded_errors_are_per_node(self, app, user, project, url, make_component):
+        component = make_component()
+        project.is_deleted = True
+        project.save()
+        res = app.get(url, auth=user.auth)
+
+        listed = {data['id']: data['embeds'] for data in res.json['data']}
+        assert project._id not in listed
+        assert listed[component._id]['root']['errors'][0]['detail'] == 'The requested node is no longer available.'
+        assert len(listed[component._id]['contributors']['data']) == 2
+
+    def test_query_count_does_not_grow_with_page_size(self, app, user, url, make_component):
+        make_component()
+        small = self.query_count(app, url, user) - self.query_count(app, url.split('&embed')[0], user)
+
+        for _ in range(3):
+            make_component()
+        large = self.query_count(app, url, user) - self.query_count(app, url.split('&embed')[0], user)
+
+        assert small == large
+
+
 @pytest.mark.django_db
 class TestNodeListFiltering(NodesListFilteringMixin):
 
@@ -45,6 +45,14 @@ def override_settings():
     website_settings.BCRYPT_LOG_ROUNDS = 1
     # Make sure we don't accidentally send any emails
     website_settings.SENDGRID_API_KEY = None
+    # Searches must see the documents indexed during the test
+    website_settings.SEARCH_RESULTS_CACHE_TIMEOUT = 0
+    website_settings.API_LIST_COUNT_CACHE_TIMEOUT = 0
+    website_settings.CAS_PROFILE_CACHE_TIMEOUT = 0
+    website_settings.WATERBUTLER_METADATA_CACHE_TIMEOUT = 0
+    website_settings.CITATION_CACHE_TIMEOUT = 0
+    # Failures of mocked services must not make later tests fail fast
+    website_settings.OUTBOUND_HTTP_CIRCUIT_BREAKERS = False
 
 
 @pytest.fixture()
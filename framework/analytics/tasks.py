@@ -0,0 +1,17 @@
+import logging
+
+from framework.celery_tasks import app
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+
+@app.task(ignore_results=True)
+def flush_counters(batch_size=None):
+    """Add the page visits and user actions recorded since the last run to their counters."""
+    from osf.models import PageCounter, UserActivityCounter
+    batch_size = batch_size or settings.ANALYTICS_FLUSH_BATCH_SIZE
+    pages = PageCounter.flush(batch_size)
+    actions = UserActivityCounter.flush(batch_size)
+    logger.info('Flushed {} page visits and {} user actions'.format(pages, actions))
+    return pages, actions
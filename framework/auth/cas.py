@@ -1,19 +1,29 @@
 # -*- coding: utf-8 -*-
 
 import furl
+import hashlib
 import httplib as http
 import json
+import logging
 import urllib
 
+from django.core.cache import cache
 from lxml import etree
-import requests
 
+from framework import outbound
 from framework.auth import authenticate, external_first_login_authenticate
 from framework.auth.core import get_user, generate_verification_key
 from framework.flask import redirect
 from framework.exceptions import HTTPError
 from website import settings
 
+logger = logging.getLogger(__name__)
+
+PROFILE_CACHE_KEY = 'cas:profile:{}:{}'
+PROFILE_GENERATION_KEY = 'cas:profile-generation'
+
+_profile_cache_metrics = {'hits': 0, 'negative_hits': 0, 'misses': 0}
+
 
 class CasError(HTTPError):
     """General CAS-related error."""
@@ -114,7 +124,7 @@ class CasClient(object):
         url.args['ticket'] = ticket
         url.args['service'] = service_url
 
-        resp = requests.get(url.url)
+        resp = outbound.get('cas', url.url)
         if resp.status_code == 200:
             return self._parse_service_validation(resp.content)
         else:
@@ -122,18 +132,53 @@ class CasClient(object):
 
     def profile(self, access_token):
         """
-        Send request to get profile information, given an access token.
+        Send request to get profile information, given an access token. The profile of a token is
+        cached for `settings.CAS_PROFILE_CACHE_TIMEOUT` seconds, and the rejection of an invalid
+        token for `settings.CAS_PROFILE_NEGATIVE_CACHE_TIMEOUT` seconds.
 
         :param str access_token: CAS access_token.
         :rtype: CasResponse
         :raises: CasError if an unexpected response is returned.
         """
 
+        if not settings.CAS_PROFILE_CACHE_TIMEOUT:
+            return self._get_profile(access_token)
+
+        key = get_profile_cache_key(access_token)
+        cached = cache.get(key)
+        if cached is not None:
+            if 'error' in cached:
+                _count_profile_lookup('negative_hits')
+                raise CasHTTPError(**cached['error'])
+            _count_profile_lookup('hits')
+            resp = CasResponse(authenticated=True, user=cached['user'], attributes=dict(cached['attributes']))
+            resp.attributes['accessToken'] = access_token
+            return resp
+
+        _count_profile_lookup('misses')
+        try:
+            resp = self._get_profile(access_token)
+        except CasHTTPError as err:
+            # Don't remember that CAS was down, only that the token was rejected
+            if 400 <= err.code < 500 and settings.CAS_PROFILE_NEGATIVE_CACHE_TIMEOUT:
+                cache.set(key, {'error': {
+                    'code': err.code,
+                    'message': err.message,
+                    'headers': dict(err.headers),
+                    'content': err.content,
+                }}, settings.CAS_PROFILE_NEGATIVE_CACHE_TIMEOUT)
+            raise
+        # The token itself is not cached, only its hash
+        attributes = {name: value for name, value in resp.attributes.items() if name != 'accessToken'}
+        cache.set(key, {'user': resp.user, 'attributes': attributes}, settings.CAS_PROFILE_CACHE_TIMEOUT)
+        return resp
+
+    def _get_profile(self, access_token):
         url = self.get_profile_url()
         headers = {
             'Authorization': 'Bearer {}'.format(access_token),
         }
-        resp = requests.get(url, headers=headers)
+        resp = outbound.get('cas', url, headers=headers)
         if resp.status_code == 200:
             return self._parse_profile(resp.content, access_token)
         else:
@@ -180,10 +225,13 @@ class CasClient(object):
 
     def revoke_tokens(self, payload):
         """Revoke a tokens based on payload"""
+        forget_profiles(payload.get('token'))
         url = self.get_auth_token_revocation_url()
 
-        resp = requests.post(url, data=payload)
+        resp = outbound.post('cas', url, data=payload)
         if resp.status_code == 204:
+            # Again, in case a request cached the profile while CAS was revoking the tokens
+            forget_profiles(payload.get('token'))
             return True
         else:
             self._handle_error(resp)
@@ -212,6 +260,43 @@ def get_client():
     return CasClient(settings.CAS_SERVER_URL)
 
 
+def get_profile_cache_key(access_token):
+    if isinstance(access_token, unicode):
+        access_token = access_token.encode('utf-8')
+    generation = cache.get(PROFILE_GENERATION_KEY, 0)
+    return PROFILE_CACHE_KEY.format(generation, hashlib.sha256(access_token).hexdigest())
+
+
+def forget_profiles(access_token=None):
+    """
+    Forget the cached profile of `access_token`, or of every token, e.g. when the tokens of an
+    application are revoked. Only the cache of the current process is cleared unless the cache
+    is shared, other processes forget within `settings.CAS_PROFILE_CACHE_TIMEOUT` seconds.
+    """
+    if access_token:
+        cache.delete(get_profile_cache_key(access_token))
+        return
+    try:
+        cache.incr(PROFILE_GENERATION_KEY)
+    except ValueError:
+        cache.set(PROFILE_GENERATION_KEY, 1, None)
+
+
+def profile_cache_metrics():
+    """Hits, hits of rejected tokens and misses of the profile cache in this process, and its hit rate."""
+    metrics = dict(_profile_cache_metrics)
+    lookups = sum(metrics.values())
+    metrics['hit_rate'] = float(metrics['hits'] + metrics['negative_hits']) / lookups if lookups else 0.0
+    return metrics
+
+
+def _count_profile_lookup(outcome):
+    _profile_cache_metrics[outcome] += 1
+    interval = settings.CAS_PROFILE_CACHE_METRICS_INTERVAL
+    if interval and sum(_profile_cache_metrics.values()) % interval == 0:
+        logger.info('CAS profile cache: {}'.format(profile_cache_metrics()))
+
+
 def get_login_url(*args, **kwargs):
     """
     Convenience function for getting a login URL for a service.
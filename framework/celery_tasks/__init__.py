@@ -34,3 +34,22 @@ def error_handler(task_id, task_name):
     logger.error('#####FAILURE LOG BEGIN#####\n'
                 'Task {0} raised exception: {0}\n\{0}\n'
                 '#####FAILURE LOG STOP#####'.format(task_name, excep, result.traceback))
+
+
+@app.task
+def run_batch(task_name, calls):
+    """Run many calls of the task ``task_name`` in a single worker task. Published by
+    ``framework.celery_tasks.handlers.merge_signatures`` in place of one message per call.
+    A failed call is republished on its own, so it is retried without rerunning the rest.
+
+    :param str task_name: Name of a registered task
+    :param list calls: ``[args, kwargs]`` of every call
+    """
+    logger = get_task_logger(__name__)
+    task = app.tasks[task_name]
+    for args, kwargs in calls:
+        try:
+            task(*args, **kwargs)
+        except Exception as e:
+            logger.exception('Batched call of {} failed: {}'.format(task_name, e))
+            task.apply_async(args, kwargs)
@@ -2,11 +2,13 @@
 import logging
 import threading
 import functools
+from collections import OrderedDict
 
-from celery import group
 from flask import _app_ctx_stack as context_stack
 
 from api.base.api_globals import api_globals
+from framework.celery_tasks import app, run_batch
+from framework.celery_tasks.routers import match_by_module
 from website import settings
 
 
@@ -20,26 +22,54 @@ def queue():
     return _local.queue
 
 
+def queued_keys():
+    if not hasattr(_local, 'queued_keys'):
+        _local.queued_keys = set()
+    return _local.queued_keys
+
+
+def metrics():
+    """Counts of the tasks of the current request: ``queued`` by ``enqueue_task``,
+    ``deduplicated`` as copies of a queued task, ``merged`` into a batch and ``dispatched``.
+    """
+    if not hasattr(_local, 'metrics'):
+        _local.metrics = empty_metrics()
+    return _local.metrics
+
+
+def empty_metrics():
+    return {'queued': 0, 'deduplicated': 0, 'merged': 0, 'dispatched': 0}
+
+
 def celery_before_request():
     _local.queue = []
+    _local.queued_keys = set()
+    _local.metrics = empty_metrics()
 
 
 def celery_after_request(response, base_status_code_error=500):
     if response.status_code >= base_status_code_error:
         _local.queue = []
+        _local.queued_keys = set()
     return response
 
 
 def celery_teardown_request(error=None):
     if error is not None:
         _local.queue = []
+        _local.queued_keys = set()
         return
     if queue():
+        # Callers may have changed the kwargs of a queued task since it was queued
+        signatures = unique_signatures(queue())
         if settings.USE_CELERY:
-            group(queue()).apply_async()
+            signatures = merge_signatures(signatures, metrics())
+            publish(signatures)
         else:
-            for task in queue():
+            for task in signatures:
                 task()
+        metrics()['dispatched'] += len(signatures)
+        logger.debug('Celery tasks of request: {}'.format(metrics()))
 
 
 def get_task_from_queue(name, predicate):
@@ -51,6 +81,77 @@ def get_task_from_queue(name, predicate):
     return False
 
 
+def freeze(value):
+    """Return a hashable equivalent of the JSON-like ``value``."""
+    if isinstance(value, dict):
+        return frozenset((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def signature_key(signature):
+    """A hashable key that is equal for signatures that are equal."""
+    return (
+        signature.task,
+        freeze(signature.args),
+        freeze(signature.kwargs),
+        freeze(signature.options),
+        signature.immutable,
+    )
+
+
+def unique_signatures(signatures):
+    """Return ``signatures`` without repeats, in order."""
+    unique = OrderedDict()
+    for signature in signatures:
+        unique.setdefault(signature_key(signature), signature)
+    return list(unique.values())
+
+
+def merge_signatures(signatures, metrics=None):
+    """Replace the calls of each task in ``settings.BATCHED_CELERY_TASKS`` that take the same
+    arguments, by name, by one ``run_batch`` task so that they are published as a single message.
+    Signatures with options, e.g. a countdown, are left alone.
+
+    :param list signatures: Celery signatures
+    :param dict metrics: If given, ``merged`` is increased by the number of signatures merged
+    :return list: The signatures to publish, in order of their first call
+    """
+    merged = OrderedDict()
+    for signature in signatures:
+        if signature.task in settings.BATCHED_CELERY_TASKS and not signature.options:
+            shape = (signature.task, len(signature.args), tuple(sorted(signature.kwargs)))
+        else:
+            shape = signature_key(signature)
+        merged.setdefault(shape, []).append(signature)
+
+    result = []
+    for batch in merged.values():
+        if len(batch) == 1:
+            result.append(batch[0])
+            continue
+        task_name = batch[0].task
+        calls = [[list(signature.args), dict(signature.kwargs)] for signature in batch]
+        result.append(run_batch.si(task_name, calls).set(queue=match_by_module(task_name)))
+        if metrics is not None:
+            metrics['merged'] += len(batch)
+    return result
+
+
+def publish(signatures):
+    """Publish ``signatures`` to the broker over a single connection from the pool."""
+    with app.producer_or_acquire() as producer:
+        for signature in signatures:
+            signature.apply_async(producer=producer)
+
+
 def enqueue_task(signature):
     """If working in a request context, push task signature to thread-local
     queue to run after request is complete; else run signature immediately.
@@ -62,8 +163,13 @@ def enqueue_task(signature):
     ):  # Not in a request context
         signature()
     else:
-        if signature not in queue():
+        key = signature_key(signature)
+        if key in queued_keys():
+            metrics()['deduplicated'] += 1
+        else:
+            queued_keys().add(key)
             queue().append(signature)
+            metrics()['queued'] += 1
 
 
 def queued_task(task):
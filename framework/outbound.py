@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""HTTP client for the requests the OSF makes to other services: CAS, WaterButler, SHARE, Akismet,
+Varnish and the ember apps.
+
+Each service, configured in ``settings.OUTBOUND_HTTP``, has its own session, which keeps a pool of
+connections alive, times out requests, and retries idempotent requests on connection errors and
+502/503/504s with exponential backoff. After ``failure_threshold`` failures in a row (connection
+errors, timeouts or 502/503/504s, which mean the service itself is unavailable) from one host of the
+service, requests to that host fail fast with ``CircuitOpenError`` for ``reset_timeout`` seconds,
+after which requests are let through again until one fails. Other 5xx responses may be relayed from
+further upstream, e.g. from the storage providers of WaterButler, and don't open the circuit.
+Services such as Varnish have several hosts, so circuits and metrics are kept for each host.
+
+    resp = outbound.get('waterbutler', url, headers=headers)
+"""
+import copy
+import logging
+import threading
+import time
+import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from website import settings
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (502, 503, 504)
+# Upper bounds, in seconds, of the latency histogram buckets. The last bucket is unbounded
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ERRORS = ('timeout', 'connection', 'server_error', 'client_error', 'circuit_open')
+
+_lock = threading.Lock()
+_sessions = {}
+_breakers = {}  # (service, host) -> CircuitBreaker
+_metrics = {}  # service -> host -> metrics
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to a service that keeps failing."""
+    pass
+
+
+class CircuitBreaker(object):
+
+    def __init__(self, service, host):
+        self.service = service
+        self.host = host
+        self.failures = 0
+        self.opened_at = None
+
+    def check(self, config):
+        if self.opened_at is not None and time.time() - self.opened_at < config['reset_timeout']:
+            raise CircuitOpenError('Requests to {} at {} are failing, not sending any for {}s'.format(
+                self.service, self.host, config['reset_timeout']
+            ))
+
+    def record(self, config, failed):
+        if not failed:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if config['failure_threshold'] and self.failures >= config['failure_threshold']:
+            if self.opened_at is None:
+                logger.warning('{} failures in a row from {} at {}, failing fast for {}s'.format(
+                    self.failures, self.service, self.host, config['reset_timeout']
+                ))
+            self.opened_at = time.time()
+
+
+def get_config(service):
+    config = dict(settings.OUTBOUND_HTTP_DEFAULTS)
+    config.update(settings.OUTBOUND_HTTP.get(service, {}))
+    return config
+
+
+def get_session(service):
+    """The session of ``service``, with its pool of kept-alive connections and its retries."""
+    with _lock:
+        if service not in _sessions:
+            config = get_config(service)
+            # Requests that time out reading the response are not retried, they may have been acted upon
+            retries = Retry(
+                total=config['retries'],
+                read=False,
+                backoff_factor=config['backoff'],
+                status_forcelist=RETRY_STATUSES,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(pool_maxsize=config['pool_size'], max_retries=retries)
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _sessions[service] = session
+    return _sessions[service]
+
+
+def get_breaker(service, host):
+    """The circuit breaker of ``host`` of ``service``, which also starts its metrics."""
+    key = (service, host)
+    with _lock:
+        if key not in _breakers:
+            _breakers[key] = CircuitBreaker(service, host)
+            _metrics.setdefault(service, {})[host] = {
+                'requests': 0,
+                'latency': [0] * (len(LATENCY_BUCKETS) + 1),
+                'errors': dict.fromkeys(ERRORS, 0),
+            }
+    return _breakers[key]
+
+
+def metrics():
+    """The number of requests to each host of each service, their latencies as a histogram of
+    counts per ``LATENCY_BUCKETS``, and their errors by kind, since the process started.
+    """
+    with _lock:
+        return copy.deepcopy(_metrics)
+
+
+def _observe(service, host, started, error=None):
+    service_metrics = _metrics[service][host]
+    elapsed = time.time() - started
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if elapsed <= bound), len(LATENCY_BUCKETS))
+    service_metrics['requests'] += 1
+    service_metrics['latency'][bucket] += 1
+    if error:
+        service_metrics['errors'][error] += 1
+    interval = settings.OUTBOUND_HTTP_METRICS_INTERVAL
+    if interval and service_metrics['requests'] % interval == 0:
+        logger.info('Requests to {} at {}: {}'.format(service, host, service_metrics))
+
+
+def _call(service, url, send, **kwargs):
+    host = urlparse.urlparse(url).netloc
+    config = get_config(service)
+    breaker = get_breaker(service, host)
+    if settings.OUTBOUND_HTTP_CIRCUIT_BREAKERS:
+        try:
+            breaker.check(config)
+        except CircuitOpenError:
+            _metrics[service][host]['errors']['circuit_open'] += 1
+            raise
+
+    kwargs.setdefault('timeout', config['timeout'])
+    started = time.time()
+    try:
+        response = send(**kwargs)
+    except requests.RequestException as ex:
+        _observe(service, host, started, 'timeout' if isinstance(ex, requests.Timeout) else 'connection')
+        breaker.record(config, failed=True)
+        raise
+
+    error = None
+    if response.status_code >= 500:
+        error = 'server_error'
+    elif response.status_code >= 400:
+        error = 'client_error'
+    _observe(service, host, started, error)
+    breaker.record(config, failed=response.status_code in RETRY_STATUSES)
+    return response
+
+
+def request(service, method, url, **kwargs):
+    """Send a request to ``service``, with the same arguments as ``requests.request``.
+    ``timeout`` defaults to the one of the service.
+    """
+    session = get_session(service)
+    return _call(service, url, lambda **kw: session.request(method, url, **kw), **kwargs)
+
+
+def send(service, prepared_request, **kwargs):
+    """Send a ``requests.PreparedRequest`` to ``service``, see ``requests.Session.send``."""
+    session = get_session(service)
+    return _call(service, prepared_request.url, lambda **kw: session.send(prepared_request, **kw), **kwargs)
+
+
+def get(service, url, **kwargs):
+    return request(service, 'GET', url, **kwargs)
+
+
+def post(service, url, **kwargs):
+    return request(service, 'POST', url, **kwargs)
+
@@ -1,20 +1,23 @@
 # -*- coding: utf-8 -*-
 import functools
-import hashlib
+import itertools
 import logging
 import threading
+import weakref
 
-import binascii
 from collections import OrderedDict
-import os
 
+import gevent
 from celery.canvas import Signature
 from celery.local import PromiseProxy
 from gevent.pool import Pool
 
+from framework.celery_tasks.handlers import freeze, merge_signatures, publish
 from website import settings
 
 _local = threading.local()
+_pools = weakref.WeakKeyDictionary()
+_counter = itertools.count()
 logger = logging.getLogger(__name__)
 
 def postcommit_queue():
@@ -27,9 +30,27 @@ def postcommit_celery_queue():
         _local.postcommit_celery_queue = OrderedDict()
     return _local.postcommit_celery_queue
 
+def postcommit_metrics():
+    """Counts of the postcommit tasks of the current request: ``queued``, ``deduplicated``
+    as copies of a queued task, ``merged`` into a batch and ``dispatched``.
+    """
+    if not hasattr(_local, 'postcommit_metrics'):
+        _local.postcommit_metrics = {'queued': 0, 'deduplicated': 0, 'merged': 0, 'dispatched': 0}
+    return _local.postcommit_metrics
+
+def postcommit_pool():
+    """The pool of greenlets that run postcommit functions, shared by every request
+    served by the current event loop.
+    """
+    hub = gevent.get_hub()
+    if hub not in _pools:
+        _pools[hub] = Pool(settings.POSTCOMMIT_POOL_SIZE)
+    return _pools[hub]
+
 def postcommit_before_request():
     _local.postcommit_queue = OrderedDict()
     _local.postcommit_celery_queue = OrderedDict()
+    _local.postcommit_metrics = {'queued': 0, 'deduplicated': 0, 'merged': 0, 'dispatched': 0}
 
 def postcommit_after_request(response, base_status_error_code=500):
     if response.status_code >= base_status_error_code:
@@ -37,21 +58,29 @@ def postcommit_after_request(response, base_status_error_code=500):
         _local.postcommit_celery_queue = OrderedDict()
         return response
     try:
+        metrics = postcommit_metrics()
         if postcommit_queue():
-            number_of_threads = 30  # one db connection per greenlet, let's share
-            pool = Pool(number_of_threads)
-            for func in postcommit_queue().values():
-                pool.spawn(func)
-            pool.join(timeout=5.0, raise_error=True)  # 5 second timeout and reraise exceptions
+            pool = postcommit_pool()
+            greenlets = [pool.spawn(func) for func in postcommit_queue().values()]
+            # Only wait for this request's functions; 5 second timeout and reraise exceptions
+            gevent.joinall(greenlets, timeout=5.0, raise_error=True)
+            metrics['dispatched'] += len(greenlets)
 
         if postcommit_celery_queue():
             if settings.USE_CELERY:
-                for task_dict in postcommit_celery_queue().values():
-                    task = Signature.from_dict(task_dict)
-                    task.apply_async()
+                signatures = merge_signatures(
+                    [Signature.from_dict(task_dict) for task_dict in postcommit_celery_queue().values()],
+                    metrics
+                )
+                publish(signatures)
+                metrics['dispatched'] += len(signatures)
             else:
                 for task in postcommit_celery_queue().values():
                     task()
+                metrics['dispatched'] += len(postcommit_celery_queue())
+
+        if metrics['queued']:
+            logger.debug('Postcommit tasks of request: {}'.format(metrics))
 
     except AttributeError as ex:
         if not settings.DEBUG_MODE:
@@ -71,20 +100,22 @@ def enqueue_postcommit_task(fn, args, kwargs, celery=False, once_per_request=Tru
     '''
     Any task queued with this function where celery=True will be run asynchronously.
     '''
-    # make a hash of the pertinent data
-    raw = [fn.__name__, fn.__module__, args, kwargs]
-    m = hashlib.md5()
-    m.update('-'.join([x.__repr__() for x in raw]))
-    key = m.hexdigest()
+    key = (fn.__module__, fn.__name__, freeze(args), freeze(kwargs))
 
     if not once_per_request:
-        # we want to run it once for every occurrence, add a random string
-        key = '{}:{}'.format(key, binascii.hexlify(os.urandom(8)))
+        # we want to run it once for every occurrence, make the key unique
+        key += (next(_counter), )
 
     if celery and isinstance(fn, PromiseProxy):
-        postcommit_celery_queue().update({key: fn.si(*args, **kwargs)})
+        queue, task = postcommit_celery_queue(), fn.si(*args, **kwargs)
+    else:
+        queue, task = postcommit_queue(), functools.partial(fn, *args, **kwargs)
+
+    if key in queue:
+        postcommit_metrics()['deduplicated'] += 1
     else:
-        postcommit_queue().update({key: functools.partial(fn, *args, **kwargs)})
+        postcommit_metrics()['queued'] += 1
+    queue[key] = task
 
 handlers = {
     'before_request': postcommit_before_request,
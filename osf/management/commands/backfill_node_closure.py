@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+# The closure table is populated by migration 0118 and kept in sync by the NodeRelation
+# signal handlers. This command rebuilds it from scratch, e.g. after NodeRelations were
+# written with bulk operations or raw SQL that bypassed the signals.
+
+from __future__ import unicode_literals
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from osf.models import NodeClosure
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """
+    Rebuild NodeClosure from the primary (non-link) rows of NodeRelation.
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Run rebuild and roll back changes to db',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+        if not dry_run:
+            script_utils.add_file_logger(logger, __file__)
+        with transaction.atomic():
+            before = NodeClosure.objects.count()
+            after = NodeClosure.objects.rebuild()
+            logger.info('Rebuilt node closure table: {} rows before, {} rows after.'.format(before, after))
+            if dry_run:
+                raise RuntimeError('Dry run, transaction rolled back.')
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# Wiki versions are rendered when they are saved, and versions saved before that are rendered
+# the first time they are shown. This command renders them ahead of time, e.g. before reindexing
+# the wikis for search, or renders every version again after WIKI_WHITELIST changes.
+
+from __future__ import unicode_literals
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from addons.wiki.models import WikiVersion
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_wiki_rendered(batch_size, force=False):
+    versions = WikiVersion.objects.filter(wiki_page__node__isnull=False)
+    if not force:
+        versions = versions.filter(rendered_html__isnull=True)
+    total = versions.count()
+    logger.info('Rendering {} wiki versions.'.format(total))
+
+    done = 0
+    last_id = 0
+    while True:
+        batch = list(
+            versions.filter(id__gt=last_id).order_by('id').select_related('wiki_page__node')[:batch_size]
+        )
+        if not batch:
+            break
+        with transaction.atomic():
+            for version in batch:
+                version.render(save=True)
+        done += len(batch)
+        last_id = batch[-1].id
+        logger.info('Rendered {}/{} wiki versions.'.format(done, total))
+    return done
+
+
+class Command(BaseCommand):
+    """
+    Backfill WikiVersion.rendered_html and WikiVersion.rendered_text.
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            dest='batch_size',
+            help='Number of versions rendered per transaction',
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            dest='force',
+            help='Render the versions that were already rendered again',
+        )
+        parser.add_argument(
+            '--dry',
+            action='store_true',
+            dest='dry_run',
+            help='Run backfill and roll back changes to db',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+        batch_size = options.get('batch_size')
+        force = options.get('force', False)
+        if not dry_run:
+            script_utils.add_file_logger(logger, __file__)
+            # Each batch is committed on its own
+            backfill_wiki_rendered(batch_size, force=force)
+            return
+        with transaction.atomic():
+            backfill_wiki_rendered(batch_size, force=force)
+            raise RuntimeError('Dry run, transaction rolled back.')
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+
+from osf.models import AbstractNode, NodeRelation
+
+logger = logging.getLogger(__name__)
+
+# The recursive CTEs that AbstractNode.get_root and AbstractNodeQuerySet.get_children used
+# before the closure table, kept here so the two can be compared on production-sized data.
+RECURSIVE_ROOT_SQL = """
+    WITH RECURSIVE ascendants AS (
+      SELECT parent_id, child_id, 1 AS LEVEL, ARRAY[child_id] as cids
+      FROM "{noderelation}"
+      WHERE is_node_link IS FALSE and child_id = %(node)s
+      UNION ALL
+      SELECT S.parent_id, D.child_id, D.level + 1, D.cids || S.child_id
+      FROM ascendants AS D
+        JOIN "{noderelation}" AS S ON D.parent_id = S.child_id
+      WHERE S.is_node_link IS FALSE AND %(node)s = ANY(cids)
+    ) SELECT parent_id FROM ascendants WHERE child_id = %(node)s ORDER BY level DESC LIMIT 1;
+"""
+
+RECURSIVE_CHILDREN_SQL = """
+    WITH RECURSIVE descendants AS (
+      SELECT parent_id, child_id, 1 AS LEVEL, ARRAY[parent_id] as pids
+      FROM "{noderelation}"
+      WHERE is_node_link IS FALSE AND parent_id = %(node)s
+      UNION ALL
+      SELECT d.parent_id, s.child_id, d.level + 1, d.pids || s.parent_id
+      FROM descendants AS d
+        JOIN "{noderelation}" AS s ON d.child_id = s.parent_id
+      WHERE s.is_node_link IS FALSE AND %(node)s = ANY(pids)
+    ) SELECT array_agg(DISTINCT child_id) FROM descendants WHERE parent_id = %(node)s;
+"""
+
+
+def _run_recursive(sql, node):
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(noderelation=NodeRelation._meta.db_table), {'node': node.pk})
+        return cursor.fetchone()
+
+
+def _walk_parents(node):
+    parents = []
+    parent = node.parent_node
+    while parent:
+        parents.append(parent)
+        parent = parent.parent_node
+    return parents
+
+
+def _time(func, nodes):
+    start = time.time()
+    for node in nodes:
+        func(node)
+    return time.time() - start
+
+
+class Command(BaseCommand):
+    """Compare the recursive CTE tree lookups against the NodeClosure table.
+
+    Samples the nodes with the most primary descendants, since that is where the
+    recursive queries hurt the most.
+
+        python manage.py benchmark_node_closure --sample 50
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=25,
+            dest='sample',
+            help='Number of nodes to benchmark'
+        )
+
+    def handle(self, *args, **options):
+        sample = options.get('sample')
+        roots = list(
+            AbstractNode.objects.get_roots()
+            .annotate(closure_count=Count('descendant_closures'))
+            .order_by('-closure_count')[:sample]
+        )
+        leaves = [AbstractNode.objects.get_descendants(root).order_by('-depth').first() or root for root in roots]
+
+        results = [
+            ('descendants (cte)', _time(lambda node: _run_recursive(RECURSIVE_CHILDREN_SQL, node), roots)),
+            ('descendants (closure)', _time(lambda node: list(AbstractNode.objects.get_descendants(node).values_list('id', flat=True)), roots)),
+            ('root (cte)', _time(lambda node: _run_recursive(RECURSIVE_ROOT_SQL, node), leaves)),
+            ('root (closure)', _time(lambda node: AbstractNode.objects.get_root_id(node), leaves)),
+            ('ancestors (parent_node)', _time(_walk_parents, leaves)),
+            ('ancestors (closure)', _time(lambda node: list(AbstractNode.objects.get_ancestors(node)), leaves)),
+        ]
+        for name, elapsed in results:
+            logger.info('{:<25} {:>8.2f}ms/node over {} nodes'.format(name, elapsed * 1000 / max(len(roots), 1), len(roots)))
@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+
+from api.files.serializers import FileSerializer
+from api.nodes.serializers import NodeSerializer
+from osf.models import BaseFileNode, Node
+
+logger = logging.getLogger(__name__)
+
+
+def _make_request(version):
+    request = Request(RequestFactory().get('/v2/'))
+    request.parser_context['kwargs'] = {'version': 'v2'}
+    request.version = version
+    return request
+
+
+def _serialize(serializer_class, objects, version, rounds, replan):
+    """Serialize ``objects`` as a page, ``rounds`` times, and return the seconds per page.
+
+    With ``replan`` the field plan is thrown away before each object, as if it was worked
+    out per object as ``JSONAPISerializer.to_representation`` used to.
+    """
+    serializer = serializer_class(context={'request': _make_request(version), 'embed': {}})
+    start = time.time()
+    for _ in range(rounds):
+        for obj in objects:
+            if replan:
+                serializer._field_plans = {}
+            serializer.to_representation(obj)
+    return (time.time() - start) / rounds
+
+
+class Command(BaseCommand):
+    """Time the serialization of pages of nodes and files with and without the cached field plan
+    of ``JSONAPISerializer``. The objects are loaded, and serialized once, first so that the
+    timings are mostly of the serializers rather than of the database.
+
+        python manage.py benchmark_serializers --page-size 100 --rounds 10
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=100,
+            dest='page_size',
+            help='Number of objects per page'
+        )
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=10,
+            dest='rounds',
+            help='Number of times to serialize each page'
+        )
+        parser.add_argument(
+            '--api-version',
+            default='2.8',
+            dest='api_version',
+            help='API version of the requests'
+        )
+
+    def handle(self, *args, **options):
+        page_size = options.get('page_size')
+        rounds = options.get('rounds')
+        version = options.get('api_version')
+        pages = [
+            (NodeSerializer, list(Node.objects.filter(is_deleted=False, is_public=True).order_by('-id')[:page_size])),
+            (FileSerializer, list(BaseFileNode.objects.filter(deleted_on__isnull=True, type='osf.osfstoragefile').order_by('-id')[:page_size])),
+        ]
+        for serializer_class, objects in pages:
+            _serialize(serializer_class, objects, version, 1, False)
+            for replan in (True, False):
+                elapsed = _serialize(serializer_class, objects, version, rounds, replan)
+                logger.info('{:<16} {:<10} {:>8.2f}ms/page of {}'.format(
+                    serializer_class.__name__,
+                    'per object' if replan else 'cached',
+                    elapsed * 1000,
+                    len(objects)
+                ))
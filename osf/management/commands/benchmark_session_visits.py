@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import json
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from osf.models import Session, SessionVisits
+from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONEncoder
+
+logger = logging.getLogger(__name__)
+
+
+def _pages(count):
+    return ['download:abc{:02d}:{:024x}'.format(i % 100, i) for i in range(count)]
+
+
+def _time_lists(pages, rounds):
+    """Load and save a session that keeps its visited pages in its data, as
+    ``PageCounter.update_counter`` used to. Return the seconds per round and the size of the data.
+    """
+    date_string = timezone.now().strftime('%Y/%m/%d')
+    data = {'visited': pages, 'visited_by_date': {'date': date_string, 'pages': pages}}
+    session = Session.objects.create(data=data)
+    start = time.time()
+    for _ in range(rounds):
+        session = Session.objects.get(pk=session.pk)
+        session.save()
+    return (time.time() - start) / rounds, len(json.dumps(data, cls=DateTimeAwareJSONEncoder))
+
+
+def _time_filters(pages, rounds):
+    """Load and save the ``SessionVisits`` of a session with ``pages`` visited.
+    Return the seconds per round and the size of the filters.
+    """
+    date = timezone.now().date()
+    session = Session.objects.create()
+    visits = SessionVisits.get_for_session(session, date)
+    for page in pages:
+        visits.pages.add(page)
+        visits.pages_on_date.add(page)
+    visits.save_if_changed()
+    start = time.time()
+    for _ in range(rounds):
+        visits = SessionVisits.get_for_session(session, date)
+        visits.pages_on_date.add(pages[0])
+        visits.save()
+    return (time.time() - start) / rounds, len(visits.pages.to_bytes()) + len(visits.pages_on_date.to_bytes())
+
+
+class Command(BaseCommand):
+    """Compare the size and the load and save time of the visited pages of a session kept in its
+    data against the ``SessionVisits`` Bloom filters, for growing numbers of pages. Nothing is kept.
+
+        python manage.py benchmark_session_visits --rounds 100
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--rounds',
+            type=int,
+            default=50,
+            dest='rounds',
+            help='Number of loads and saves per size'
+        )
+
+    def handle(self, *args, **options):
+        rounds = options.get('rounds')
+        with transaction.atomic():
+            for count in (10, 100, 1000, 10000):
+                pages = _pages(count)
+                for name, func in (('session data', _time_lists), ('bloom filters', _time_filters)):
+                    elapsed, size = func(pages, rounds)
+                    logger.info('{:>6} pages {:<14} {:>9} bytes {:>8.2f}ms/load and save'.format(
+                        count, name, size, elapsed * 1000
+                    ))
+            transaction.set_rollback(True)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import logging
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.throttling import AnonRateThrottle
+
+from api.base.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+ENGINES = ('history', 'sliding-window')
+
+
+class BenchmarkThrottle(BaseThrottle, AnonRateThrottle):
+
+    scope = 'benchmark'
+
+
+def _hammer(engine, rate, threads, seconds):
+    """Send requests from one client through a throttle of ``engine`` from ``threads`` threads
+    for ``seconds``, and return the number of requests checked and allowed.
+    """
+    counts = {'checked': 0, 'allowed': 0}
+    lock = threading.Lock()
+    deadline = time.time() + seconds
+    # A new client for each run, see BaseThrottle.get_ident
+    client = 'benchmark-{}-{}'.format(engine, deadline)
+
+    def run():
+        request = Request(RequestFactory().get('/', HTTP_X_THROTTLE_TOKEN=client))
+        checked = allowed = 0
+        while time.time() < deadline:
+            throttle = BenchmarkThrottle()
+            throttle.engine = engine
+            checked += 1
+            allowed += bool(throttle.allow_request(request, None))
+        with lock:
+            counts['checked'] += checked
+            counts['allowed'] += allowed
+
+    BenchmarkThrottle.rate = rate
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return counts['checked'], counts['allowed']
+
+
+class Command(BaseCommand):
+    """Compare the throughput of the throttle engines, and how many requests each lets through,
+    under concurrent requests from a single client. Run it against the cache of the deployment
+    to see the effect of lost updates on the request history.
+
+        python manage.py benchmark_throttles --threads 16 --seconds 5 --rate 1000/hour
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=8,
+            dest='threads',
+            help='Number of concurrent clients'
+        )
+        parser.add_argument(
+            '--seconds',
+            type=float,
+            default=5,
+            dest='seconds',
+            help='How long to run each engine for'
+        )
+        parser.add_argument(
+            '--rate',
+            default='1000/hour',
+            dest='rate',
+            help='Throttle rate'
+        )
+
+    def handle(self, *args, **options):
+        threads = options.get('threads')
+        seconds = options.get('seconds')
+        rate = options.get('rate')
+        for engine in ENGINES:
+            checked, allowed = _hammer(engine, rate, threads, seconds)
+            logger.info('{:<16} {:>10.0f} checks/s, {} of {} allowed at {}'.format(
+                engine, checked / seconds, allowed, checked, rate
+            ))
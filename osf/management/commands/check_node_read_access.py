@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+import logging
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from osf.models import NodeReadAccess
+from scripts import utils as script_utils
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    """Compare NodeReadAccess against contributors, the node tree and private links.
+
+    Examples:
+
+        python manage.py check_node_read_access
+        python manage.py check_node_read_access --fix
+    """
+    def add_arguments(self, parser):
+        super(Command, self).add_arguments(parser)
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            dest='fix',
+            help='Rebuild the table if any inconsistencies are found',
+        )
+
+    def handle(self, *args, **options):
+        fix = options.get('fix', False)
+        if fix:
+            script_utils.add_file_logger(logger, __file__)
+        with transaction.atomic():
+            problems = NodeReadAccess.objects.diff()
+            for problem, node_id, user_id, private_link_key, is_contributor in problems[:100]:
+                logger.warn('{} row: node={} user={} private_link_key={} is_contributor={}'.format(
+                    problem, node_id, user_id, private_link_key, is_contributor
+                ))
+            logger.info('Found {} inconsistent NodeReadAccess rows.'.format(len(problems)))
+            if problems and fix:
+                NodeReadAccess.objects.rebuild()
+                logger.info('Rebuilt NodeReadAccess.')
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-10 14:05
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0117_nodeclosure'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            INSERT INTO "osf_nodeclosure" (ancestor_id, descendant_id, depth)
+            WITH RECURSIVE closure AS (
+                SELECT parent_id AS ancestor_id, child_id AS descendant_id, 1 AS depth, ARRAY[parent_id, child_id] AS path
+                FROM "osf_noderelation"
+                WHERE is_node_link IS FALSE
+              UNION ALL
+                SELECT C.ancestor_id, R.child_id, C.depth + 1, C.path || R.child_id
+                FROM closure AS C
+                    JOIN "osf_noderelation" AS R ON R.parent_id = C.descendant_id
+                WHERE R.is_node_link IS FALSE
+                    AND NOT R.child_id = ANY(C.path)
+            ) SELECT ancestor_id, descendant_id, MIN(depth)
+              FROM closure
+              GROUP BY ancestor_id, descendant_id;
+            """,
+            """
+            DELETE FROM "osf_nodeclosure";
+            """
+        ),
+    ]
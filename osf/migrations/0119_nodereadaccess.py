@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-12 15:21
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0118_populate_node_closure'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NodeReadAccess',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('private_link_key', models.CharField(blank=True, db_index=True, max_length=512, null=True)),
+                ('is_contributor', models.BooleanField(default=False)),
+                ('node', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='read_access', to='osf.AbstractNode')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='node_read_access', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='nodereadaccess',
+            unique_together=set([('private_link_key', 'node'), ('user', 'node')]),
+        ),
+    ]
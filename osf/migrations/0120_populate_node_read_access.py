@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-12 15:24
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0119_nodereadaccess'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            INSERT INTO "osf_nodereadaccess" (node_id, user_id, private_link_key, is_contributor)
+            SELECT node_id, user_id, NULL, bool_or(is_contributor)
+            FROM (
+                SELECT node_id, user_id, TRUE AS is_contributor
+                FROM "osf_contributor"
+                WHERE read IS TRUE
+              UNION ALL
+                SELECT CL.descendant_id AS node_id, C.user_id, FALSE AS is_contributor
+                FROM "osf_nodeclosure" AS CL
+                    JOIN "osf_contributor" AS C ON C.node_id = CL.ancestor_id
+                WHERE C.admin IS TRUE
+            ) AS access
+            GROUP BY node_id, user_id;
+
+            INSERT INTO "osf_nodereadaccess" (node_id, user_id, private_link_key, is_contributor)
+            SELECT N.abstractnode_id, NULL, P.key, FALSE
+            FROM "osf_privatelink" AS P
+                JOIN "osf_privatelink_nodes" AS N ON N.privatelink_id = P.id
+            WHERE P.is_deleted IS FALSE;
+            """,
+            """
+            DELETE FROM "osf_nodereadaccess";
+            """
+        ),
+    ]
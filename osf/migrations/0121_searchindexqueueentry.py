@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-16 14:02
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0120_populate_node_read_access'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchIndexQueueEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('category', models.CharField(choices=[('node', 'Node'), ('file', 'File'), ('user', 'User')], max_length=4)),
+                ('doc_id', models.CharField(max_length=255)),
+                ('created', models.DateTimeField(db_index=True)),
+                ('modified', models.DateTimeField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='searchindexqueueentry',
+            unique_together=set([('category', 'doc_id')]),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-20 10:11
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0121_searchindexqueueentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PageCounterDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('unique', models.PositiveIntegerField(default=0)),
+                ('counter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='osf.PageCounter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PageCounterIncrement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page', models.CharField(db_index=True, max_length=300)),
+                ('date', models.DateField()),
+                ('total', models.PositiveSmallIntegerField(default=0)),
+                ('unique', models.PositiveSmallIntegerField(default=0)),
+                ('unique_on_date', models.PositiveSmallIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserActivityDay',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('counter', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='osf.UserActivityCounter')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='UserActivityIncrement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.CharField(db_index=True, max_length=5)),
+                ('action', models.CharField(max_length=255)),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='pagecounterday',
+            unique_together=set([('counter', 'date')]),
+        ),
+        migrations.AlterUniqueTogether(
+            name='useractivityday',
+            unique_together=set([('counter', 'action', 'date')]),
+        ),
+    ]
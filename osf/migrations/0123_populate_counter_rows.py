@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-20 10:14
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0122_counter_rows'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            """
+            INSERT INTO "osf_pagecounterday" (counter_id, date, total, "unique")
+            SELECT P.id, to_date(D.key, 'YYYY/MM/DD'), COALESCE((D.value->>'total')::integer, 0), COALESCE((D.value->>'unique')::integer, 0)
+            FROM "osf_pagecounter" AS P, jsonb_each(P.date) AS D;
+            """,
+            """
+            UPDATE "osf_pagecounter" AS P SET date = D.date
+            FROM (
+                SELECT counter_id, jsonb_object_agg(to_char(date, 'YYYY/MM/DD'), jsonb_build_object('total', total, 'unique', "unique")) AS date
+                FROM "osf_pagecounterday"
+                GROUP BY counter_id
+            ) AS D
+            WHERE D.counter_id = P.id;
+            DELETE FROM "osf_pagecounterday";
+            """
+        ),
+        migrations.RunSQL(
+            """
+            INSERT INTO "osf_useractivityday" (counter_id, action, date, total)
+            SELECT U.id, A.key, to_date(D.key, 'YYYY/MM/DD'), D.value::integer
+            FROM "osf_useractivitycounter" AS U, jsonb_each(U.action) AS A, jsonb_each_text(A.value->'date') AS D;
+            """,
+            """
+            UPDATE "osf_useractivitycounter" AS U SET action = A.action
+            FROM (
+                SELECT counter_id, jsonb_object_agg(action, jsonb_build_object('total', total, 'date', date)) AS action
+                FROM (
+                    SELECT counter_id, action, sum(total) AS total, jsonb_object_agg(to_char(date, 'YYYY/MM/DD'), total) AS date
+                    FROM "osf_useractivityday"
+                    GROUP BY counter_id, action
+                ) AS BY_ACTION
+                GROUP BY counter_id
+            ) AS A
+            WHERE A.counter_id = U.id;
+            UPDATE "osf_useractivitycounter" AS U SET date = D.date
+            FROM (
+                SELECT counter_id, jsonb_object_agg(day, jsonb_build_object('total', total)) AS date
+                FROM (
+                    SELECT counter_id, to_char(date, 'YYYY/MM/DD') AS day, sum(total) AS total
+                    FROM "osf_useractivityday"
+                    GROUP BY counter_id, day
+                ) AS BY_DATE
+                GROUP BY counter_id
+            ) AS D
+            WHERE D.counter_id = U.id;
+            DELETE FROM "osf_useractivityday";
+            """
+        ),
+    ]
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-20 10:16
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0123_populate_counter_rows'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='pagecounter',
+            name='date',
+        ),
+        migrations.RemoveField(
+            model_name='useractivitycounter',
+            name='action',
+        ),
+        migrations.RemoveField(
+            model_name='useractivitycounter',
+            name='date',
+        ),
+    ]
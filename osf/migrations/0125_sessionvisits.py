@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-23 09:40
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0124_remove_counter_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionVisits',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('visited', models.BinaryField()),
+                ('visited_on_date', models.BinaryField()),
+                ('session', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='visits', to='osf.Session')),
+            ],
+        ),
+    ]
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 1.11.13 on 2018-07-23 09:42
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('osf', '0125_sessionvisits'),
+    ]
+
+    # The visited pages are in SessionVisits now, which starts empty: a session's next
+    # visit of each page counts as unique once more
+    operations = [
+        migrations.RunSQL(
+            """
+            UPDATE "osf_session" SET data = data - 'visited' - 'visited_by_date'
+            WHERE data ? 'visited' OR data ? 'visited_by_date';
+            """,
+            migrations.RunSQL.noop
+        ),
+    ]
@@ -31,8 +31,13 @@ from osf.models.files import (  # noqa
     File, Folder,  # noqa
     FileVersion, TrashedFile, TrashedFileNode, TrashedFolder, FileVersionUserMetadata,  # noqa
 )  # noqa
-from osf.models.node_relation import NodeRelation  # noqa
-from osf.models.analytics import UserActivityCounter, PageCounter  # noqa
+from osf.models.node_relation import NodeRelation, NodeClosure  # noqa
+from osf.models.node_read_access import NodeReadAccess  # noqa
+from osf.models.search_index_queue import SearchIndexQueueEntry  # noqa
+from osf.models.analytics import (  # noqa
+    UserActivityCounter, UserActivityDay, UserActivityIncrement,
+    PageCounter, PageCounterDay, PageCounterIncrement, SessionVisits,
+)  # noqa
 from osf.models.admin_profile import AdminProfile  # noqa
 from osf.models.admin_log_entry import AdminLogEntry  # noqa
 from osf.models.maintenance_state import MaintenanceState  # noqa
@@ -1,68 +1,154 @@
 import logging
 
 from dateutil import parser
-from django.db import models, transaction
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import Sum
 from django.utils import timezone
+from django.utils.functional import cached_property
 
 from framework.sessions import session
 from osf.models.base import BaseModel
-from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
+from osf.utils.bloom import BloomFilter
+from website import settings
 
 logger = logging.getLogger(__name__)
 
 
+def flush_increments(sql, batch_size, **tables):
+    """Run the flush ``sql`` of a counter with its tables until it flushes fewer than ``batch_size``
+    increments, and return the number of increments flushed.
+    """
+    flushed = 0
+    with connection.cursor() as cursor:
+        while True:
+            cursor.execute(sql.format(**tables), {'batch_size': batch_size})
+            count = cursor.fetchone()[0]
+            flushed += count
+            if count < batch_size:
+                return flushed
+
+
 class UserActivityCounter(BaseModel):
+    """The number of actions of a user, in total and per action and day in ``days``.
+
+    Actions are recorded as ``UserActivityIncrement``s and added to the counters by ``flush``.
+    """
     primary_identifier_name = '_id'
 
     _id = models.CharField(max_length=5, null=False, blank=False, db_index=True,
                            unique=True)  # 5 in prod
-    action = DateTimeAwareJSONField(default=dict)
-    date = DateTimeAwareJSONField(default=dict)
     total = models.PositiveIntegerField(default=0)
 
+    FLUSH_SQL = """
+        WITH flushed AS (
+            DELETE FROM "{increment}"
+            WHERE id IN (
+                SELECT id FROM "{increment}" ORDER BY id LIMIT %(batch_size)s FOR UPDATE SKIP LOCKED
+            )
+            RETURNING user_id, action, date
+        ), counters AS (
+            INSERT INTO "{counter}" (_id, total, created, modified)
+            SELECT user_id, count(*), now(), now()
+            FROM flushed
+            GROUP BY user_id
+            ON CONFLICT (_id) DO UPDATE SET total = "{counter}".total + EXCLUDED.total, modified = EXCLUDED.modified
+            RETURNING id, _id
+        ), days AS (
+            INSERT INTO "{day}" (counter_id, action, date, total)
+            SELECT counters.id, flushed.action, flushed.date, count(*)
+            FROM flushed JOIN counters ON counters._id = flushed.user_id
+            GROUP BY counters.id, flushed.action, flushed.date
+            ON CONFLICT (counter_id, action, date) DO UPDATE SET total = "{day}".total + EXCLUDED.total
+        )
+        SELECT count(*) FROM flushed;
+    """
+
     @classmethod
     def get_total_activity_count(cls, user_id):
+        pending = UserActivityIncrement.objects.filter(user_id=user_id).count()
         try:
-            return cls.objects.get(_id=user_id).total
+            return cls.objects.get(_id=user_id).total + pending
         except cls.DoesNotExist:
-            return 0
+            return pending
 
     @classmethod
     def increment(cls, user_id, action, date_string):
-        date = parser.parse(date_string).strftime('%Y/%m/%d')
-        with transaction.atomic():
-            # select_for_update locks the row but only inside a transaction
-            uac, created = cls.objects.select_for_update().get_or_create(_id=user_id)
-            if uac.total > 0:
-                uac.total += 1
-            else:
-                uac.total = 1
-            if action in uac.action:
-                uac.action[action]['total'] += 1
-                if date in uac.action[action]['date']:
-                    uac.action[action]['date'][date] += 1
-                else:
-                    uac.action[action]['date'][date] = 1
-            else:
-                uac.action[action] = dict(total=1, date={date: 1})
-            if date in uac.date:
-                uac.date[date]['total'] += 1
-            else:
-                uac.date[date] = dict(total=1)
-            uac.save()
+        date = parser.parse(date_string).date()
+        UserActivityIncrement.objects.create(user_id=user_id, action=action, date=date)
         return True
 
+    @classmethod
+    def flush(cls, batch_size):
+        """Add the recorded actions to the counters, ``batch_size`` at a time, with one
+        ``total = total + n`` update per user and per user, action and day.
+        """
+        return flush_increments(
+            cls.FLUSH_SQL, batch_size,
+            counter=cls._meta.db_table,
+            day=UserActivityDay._meta.db_table,
+            increment=UserActivityIncrement._meta.db_table
+        )
+
+
+class UserActivityDay(models.Model):
+    counter = models.ForeignKey(UserActivityCounter, related_name='days', on_delete=models.CASCADE)
+    action = models.CharField(max_length=255)
+    date = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('counter', 'action', 'date')
+
+
+class UserActivityIncrement(models.Model):
+    """An action of a user that is not yet counted in their ``UserActivityCounter``."""
+    user_id = models.CharField(max_length=5, db_index=True)
+    action = models.CharField(max_length=255)
+    date = models.DateField()
+
 
 class PageCounter(BaseModel):
+    """The number of visits and of unique visitors of a page, in total and per day in ``days``.
+
+    Visits are recorded as ``PageCounterIncrement``s and added to the counters by ``flush``.
+    """
     primary_identifier_name = '_id'
 
     _id = models.CharField(max_length=300, null=False, blank=False, db_index=True,
                            unique=True)  # 272 in prod
-    date = DateTimeAwareJSONField(default=dict)
 
     total = models.PositiveIntegerField(default=0)
     unique = models.PositiveIntegerField(default=0)
 
+    FLUSH_SQL = """
+        WITH flushed AS (
+            DELETE FROM "{increment}"
+            WHERE id IN (
+                SELECT id FROM "{increment}" ORDER BY id LIMIT %(batch_size)s FOR UPDATE SKIP LOCKED
+            )
+            RETURNING page, date, total, "unique", unique_on_date
+        ), counters AS (
+            INSERT INTO "{counter}" (_id, total, "unique", created, modified)
+            SELECT page, sum(total), sum("unique"), now(), now()
+            FROM flushed
+            GROUP BY page
+            ON CONFLICT (_id) DO UPDATE SET
+                total = "{counter}".total + EXCLUDED.total,
+                "unique" = "{counter}"."unique" + EXCLUDED."unique",
+                modified = EXCLUDED.modified
+            RETURNING id, _id
+        ), days AS (
+            INSERT INTO "{day}" (counter_id, date, total, "unique")
+            SELECT counters.id, flushed.date, count(*), sum(flushed.unique_on_date)
+            FROM flushed JOIN counters ON counters._id = flushed.page
+            GROUP BY counters.id, flushed.date
+            ON CONFLICT (counter_id, date) DO UPDATE SET
+                total = "{day}".total + EXCLUDED.total,
+                "unique" = "{day}"."unique" + EXCLUDED."unique"
+        )
+        SELECT count(*) FROM flushed;
+    """
+
     @staticmethod
     def clean_page(page):
         return page.replace(
@@ -75,70 +161,129 @@ class PageCounter(BaseModel):
     def update_counter(cls, page, node_info):
         cleaned_page = cls.clean_page(page)
         date = timezone.now()
-        date_string = date.strftime('%Y/%m/%d')
-        visited_by_date = session.data.get('visited_by_date', {'date': date_string, 'pages': []})
-
-        with transaction.atomic():
-            model_instance, created = cls.objects.select_for_update().get_or_create(_id=cleaned_page)
-
-            # if they visited something today
-            if date_string == visited_by_date['date']:
-                # if they haven't visited this page today
-                if cleaned_page not in visited_by_date['pages']:
-                    # if the model_instance has today in it
-                    if date_string in model_instance.date.keys():
-                        # increment the number of unique visitors for today
-                        model_instance.date[date_string]['unique'] += 1
-                    else:
-                        # set the number of unique visitors for today to 1
-                        model_instance.date[date_string] = dict(unique=1)
-            # if they haven't visited something today
-            else:
-                # set their visited by date to blank
-                visited_by_date['date'] = date_string
-                visited_by_date['pages'] = []
-                # if the model_instance has today in it
-                if date_string in model_instance.date.keys():
-                    # increment the number of unique visitors for today
-                    model_instance.date[date_string]['unique'] += 1
-                else:
-                    # set the number of unique visitors to 1
-                    model_instance.date[date_string] = dict(unique=1)
-
-            # update their sessions
-            visited_by_date['pages'].append(cleaned_page)
-            session.data['visited_by_date'] = visited_by_date
-
-            if date_string in model_instance.date.keys():
-                if 'total' not in model_instance.date[date_string].keys():
-                    model_instance.date[date_string].update(total=0)
-                model_instance.date[date_string]['total'] += 1
-            else:
-                model_instance.date[date_string] = dict(total=1)
-
-            # if a download counter is being updated, only perform the update
-            # if the user who is downloading isn't a contributor to the project
-            page_type = cleaned_page.split(':')[0]
-            if page_type in ('download', 'view') and node_info:
-                if node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists():
-                    model_instance.save()
-                    return
-
-            visited = session.data.get('visited', [])
-            if page not in visited:
-                model_instance.unique += 1
-                visited.append(page)
-                session.data['visited'] = visited
-
-            session.save()
-            model_instance.total += 1
-
-            model_instance.save()
+        visits = SessionVisits.get_for_session(session._get_current_object(), date.date())
+
+        increment = PageCounterIncrement(page=cleaned_page, date=date.date())
+        # if they haven't visited this page today, they are a unique visitor for today
+        increment.unique_on_date = int(visits.pages_on_date.add(cleaned_page))
+
+        # if a download counter is being updated, only count it in the totals
+        # if the user who is downloading isn't a contributor to the project
+        page_type = cleaned_page.split(':')[0]
+        if page_type in ('download', 'view') and node_info:
+            if node_info['contributors'].filter(guids___id__isnull=False, guids___id=session.data.get('auth_user_id')).exists():
+                visits.save_if_changed()
+                increment.save()
+                return
+
+        increment.unique = int(visits.pages.add(page))
+        visits.save_if_changed()
+        increment.total = 1
+        increment.save()
+
+    @classmethod
+    def flush(cls, batch_size):
+        """Add the recorded visits to the counters, ``batch_size`` at a time, with one
+        ``total = total + n`` update per page and per page and day.
+        """
+        return flush_increments(
+            cls.FLUSH_SQL, batch_size,
+            counter=cls._meta.db_table,
+            day=PageCounterDay._meta.db_table,
+            increment=PageCounterIncrement._meta.db_table
+        )
 
     @classmethod
     def get_basic_counters(cls, page):
+        cleaned_page = cls.clean_page(page)
+        # Visits that are not flushed yet
+        pending = PageCounterIncrement.objects.filter(page=cleaned_page).aggregate(
+            pending_unique=Sum('unique'),
+            pending_total=Sum('total')
+        )
+        pending_unique, pending_total = pending['pending_unique'], pending['pending_total']
         try:
-            counter = cls.objects.get(_id=cls.clean_page(page))
-            return (counter.unique, counter.total)
+            counter = cls.objects.get(_id=cleaned_page)
         except cls.DoesNotExist:
-            return (None, None)
+            return (pending_unique, pending_total)
+        return (counter.unique + (pending_unique or 0), counter.total + (pending_total or 0))
+
+
+class PageCounterDay(models.Model):
+    counter = models.ForeignKey(PageCounter, related_name='days', on_delete=models.CASCADE)
+    date = models.DateField()
+    total = models.PositiveIntegerField(default=0)
+    unique = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('counter', 'date')
+
+
+class PageCounterIncrement(models.Model):
+    """A visit of a page that is not yet counted in its ``PageCounter``. ``total`` and ``unique``
+    are 1 if the visit counts towards the totals of the page, ``unique_on_date`` if it is the
+    visitor's first of the day.
+    """
+    page = models.CharField(max_length=300, db_index=True)
+    date = models.DateField()
+    total = models.PositiveSmallIntegerField(default=0)
+    unique = models.PositiveSmallIntegerField(default=0)
+    unique_on_date = models.PositiveSmallIntegerField(default=0)
+
+
+class SessionVisits(models.Model):
+    """The pages visited in a session, kept out of the session's data in Bloom filters of
+    ``settings.SESSION_VISITS_BLOOM_BITS`` bits: ``visited`` of the pages visited since the session
+    started and ``visited_on_date`` of those visited on ``date``.
+
+    A full filter may take a first visit for a repeated one, so long sessions undercount unique visitors
+    slightly rather than growing without bound.
+    """
+    session = models.OneToOneField('Session', related_name='visits', on_delete=models.CASCADE)
+    date = models.DateField()
+    visited = models.BinaryField()
+    visited_on_date = models.BinaryField()
+
+    @classmethod
+    def get_for_session(cls, user_session, date):
+        """The visits of ``user_session`` as of ``date``. Sessions that are not stored, such as those
+        of anonymous visitors without a cookie, start with no visits and aren't saved.
+        """
+        visits = None
+        if user_session.pk is not None:
+            visits = cls.objects.filter(session=user_session).first()
+        if visits is None:
+            visits = cls(session=user_session, date=date)
+        elif visits.date != date:
+            visits.date = date
+            visits.visited_on_date = None
+        return visits
+
+    def _make_filter(self, bits):
+        if bits is not None:
+            bits = bytearray(bits)
+        return BloomFilter(settings.SESSION_VISITS_BLOOM_BITS, settings.SESSION_VISITS_BLOOM_HASHES, bits)
+
+    @cached_property
+    def pages(self):
+        return self._make_filter(self.visited)
+
+    @cached_property
+    def pages_on_date(self):
+        return self._make_filter(self.visited_on_date)
+
+    def save_if_changed(self):
+        """Save the filters if a page was added to them, unless the session isn't stored."""
+        if self.session_id is None:
+            return
+        visited, visited_on_date = self.pages.to_bytes(), self.pages_on_date.to_bytes()
+        stored = [bytes(bits) if bits is not None else None for bits in (self.visited, self.visited_on_date)]
+        if self.pk is None or stored != [visited, visited_on_date]:
+            self.visited = visited
+            self.visited_on_date = visited_on_date
+            try:
+                with transaction.atomic():
+                    self.save()
+            except IntegrityError:
+                # Another request of the session stored its first visits first
+                logger.info('Lost the visits of a request of session {}'.format(self.session_id))
@@ -1,11 +1,13 @@
 from __future__ import unicode_literals
 
+import hashlib
+import json
 import logging
 import os
 
-import requests
 from dateutil.parser import parse as parse_date
 from django.apps import apps
+from django.core.cache import cache
 from django.db import models
 from django.db.models import Manager
 from django.core.exceptions import ObjectDoesNotExist
@@ -14,6 +16,7 @@ from typedmodels.models import TypedModel, TypedModelManager
 from include import IncludeManager
 
 from framework.analytics import get_basic_counters
+from framework import outbound
 from framework import sentry
 from osf.models.base import BaseModel, OptionalGuidMixin, ObjectIDMixin
 from osf.models.comment import CommentableMixin
@@ -23,6 +26,7 @@ from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from api.base.utils import waterbutler_api_url_for
 from website.files import utils
+from website import settings
 from website.files.exceptions import VersionNotFoundError
 from website.util import api_v2_url
 
@@ -37,6 +41,26 @@ __all__ = (
 PROVIDER_MAP = {}
 logger = logging.getLogger(__name__)
 
+METADATA_CACHE_KEY = 'waterbutler:metadata:{}:{}'
+METADATA_GENERATION_KEY = 'waterbutler:metadata-generation:{}'
+
+
+def get_metadata_cache_key(node, provider, path, revision):
+    generation = cache.get(METADATA_GENERATION_KEY.format(node._id), 0)
+    raw = json.dumps([node._id, provider, path, revision])
+    return METADATA_CACHE_KEY.format(generation, hashlib.sha1(raw).hexdigest())
+
+
+def forget_waterbutler_metadata(node):
+    """Forget the cached WaterButler metadata of every file of ``node``, e.g. when WaterButler
+    reports that its files changed.
+    """
+    key = METADATA_GENERATION_KEY.format(node._id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
 
 class BaseFileNodeManager(TypedModelManager, IncludeManager):
 
@@ -291,7 +315,8 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
         and creates versions and updates self when required.
         If revisions is None the created version is NOT and should NOT be saved
         as there is no identifing information to tell if it needs to be updated or not.
-        Hits Waterbutler's metadata endpoint and saves the returned data.
+        Hits Waterbutler's metadata endpoint and saves the returned data. The metadata is cached
+        for `settings.WATERBUTLER_METADATA_CACHE_TIMEOUT` seconds, until the files of the node change.
         If a file cannot be rendered IE figshare private files a tuple of the FileVersion and
         renderable HTML will be returned.
             >>>isinstance(file_node.touch(), tuple) # This file cannot be rendered
@@ -299,7 +324,8 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
         :returns: None if the file is not found otherwise FileVersion or (version, Error HTML)
         """
         # Resvolve primary key on first touch
-        self.save()
+        if not self.pk:
+            self.save()
         # For backwards compatibility
         revision = revision or kwargs.get(self.version_identifier)
 
@@ -308,18 +334,32 @@ class BaseFileNode(TypedModel, CommentableMixin, OptionalGuidMixin, Taggable, Ob
         if version is not None:
             return version
 
+        key = get_metadata_cache_key(self.node, self.provider, self.path, revision)
+        data = cache.get(key) if settings.WATERBUTLER_METADATA_CACHE_TIMEOUT else None
+        if data is not None:
+            # The file was already updated with this metadata, only save it if that was lost
+            current = (self.name, self.materialized_path, len(self.history))
+            version = self.update(revision, data, save=False)
+            if (self.name, self.materialized_path, len(self.history)) != current:
+                self.save()
+            return version
+
         headers = {}
         if auth_header:
             headers['Authorization'] = auth_header
 
-        resp = requests.get(
+        resp = outbound.get(
+            'waterbutler',
             self.generate_waterbutler_url(revision=revision, meta=True, _internal=True, **kwargs),
             headers=headers,
         )
         if resp.status_code != 200:
             logger.warning('Unable to find {} got status code {}'.format(self, resp.status_code))
             return None
-        return self.update(revision, resp.json()['data']['attributes'])
+        data = resp.json()['data']['attributes']
+        if settings.WATERBUTLER_METADATA_CACHE_TIMEOUT:
+            cache.set(key, data, settings.WATERBUTLER_METADATA_CACHE_TIMEOUT)
+        return self.update(revision, data)
         # TODO Switch back to head requests
         # return self.update(revision, json.loads(resp.headers['x-waterbutler-metadata']))
 
@@ -1,4 +1,3 @@
-import functools
 import itertools
 import logging
 import re
@@ -16,14 +15,13 @@ from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
 from django.core.urlresolvers import reverse
 from django.db import models, transaction, connection
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.db.models.expressions import F
 from django.db.models.aggregates import Max
 from django.dispatch import receiver
 from django.utils import timezone
 from django.utils.functional import cached_property
 from keen import scoped_keys
-from psycopg2._psycopg import AsIs
 from typedmodels.models import TypedModel, TypedModelManager
 from include import IncludeManager
 
@@ -39,7 +37,8 @@ from osf.models.identifiers import Identifier, IdentifierMixin
 from osf.models.licenses import NodeLicenseRecord
 from osf.models.mixins import (AddonModelMixin, CommentableMixin, Loggable,
                                NodeLinkMixin, Taggable, TaxonomizableMixin)
-from osf.models.node_relation import NodeRelation
+from osf.models.node_read_access import NodeReadAccess
+from osf.models.node_relation import NodeClosure, NodeRelation
 from osf.models.nodelog import NodeLog
 from osf.models.sanctions import RegistrationApproval
 from osf.models.private_link import PrivateLink
@@ -49,12 +48,15 @@ from osf.models.user import OSFUser
 from osf.models.validators import validate_doi, validate_title
 from framework.auth.core import Auth, get_user
 from addons.wiki import utils as wiki_utils
+from api.caching.counts import invalidate_list_counts
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField
 from osf.utils.requests import DummyRequest, get_request_and_user_id
 from osf.utils import sanitize
+from osf.utils.forking import fork_node_tree, template_node_tree
+from osf.utils.permission_resolver import get_permission_resolver, invalidate_node_trees, invalidate_permissions
 from osf.utils.workflows import DefaultStates
-from website import language, settings
+from website import settings
 from website.citations.utils import datetime_to_csl
 from website.exceptions import (InvalidTagError, NodeStateError,
                                 TagNotFoundError, UserNotAffiliatedError)
@@ -66,7 +68,7 @@ from website.project.model import NodeUpdateError
 from website.identifiers.tasks import update_doi_metadata_on_change
 from website.identifiers.clients import DataCiteClient
 from osf.utils.requests import get_headers_from_request
-from osf.utils.permissions import (ADMIN, CREATOR_PERMISSIONS,
+from osf.utils.permissions import (ADMIN,
                                       DEFAULT_CONTRIBUTOR_PERMISSIONS, READ,
                                       WRITE, expand_permissions,
                                       reduce_permissions)
@@ -83,52 +85,33 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
         return self.filter(id__in=self.exclude(type='osf.collection').exclude(type='osf.quickfilesnode').values_list('root_id', flat=True))
 
     def get_children(self, root, active=False):
-        # If `root` is a root node, we can use the 'descendants' related name
-        # rather than doing a recursive query
-        if root.id == root.root_id:
-            query = root.descendants.exclude(id=root.id)
-            if active:
-                query = query.filter(is_deleted=False)
-            return query
-        else:
-            sql = """
-                WITH RECURSIVE descendants AS (
-                SELECT
-                    parent_id,
-                    child_id,
-                    1 AS LEVEL,
-                    ARRAY[parent_id] as pids
-                FROM %s
-                %s
-                WHERE is_node_link IS FALSE AND parent_id = %s %s
-                UNION ALL
-                SELECT
-                    d.parent_id,
-                    s.child_id,
-                    d.level + 1,
-                    d.pids || s.parent_id
-                FROM descendants AS d
-                    JOIN %s AS s
-                    ON d.child_id = s.parent_id
-                WHERE s.is_node_link IS FALSE AND %s = ANY(pids)
-                ) SELECT array_agg(DISTINCT child_id)
-                FROM descendants
-                WHERE parent_id = %s;
-            """
-            with connection.cursor() as cursor:
-                node_relation_table = AsIs(NodeRelation._meta.db_table)
-                cursor.execute(sql, [
-                    node_relation_table,
-                    AsIs('LEFT JOIN osf_abstractnode ON {}.child_id = osf_abstractnode.id'.format(node_relation_table) if active else ''),
-                    root.pk,
-                    AsIs('AND osf_abstractnode.is_deleted IS FALSE' if active else ''),
-                    node_relation_table,
-                    root.pk,
-                    root.pk])
-                row = cursor.fetchone()[0]
-                if not row:
-                    return AbstractNode.objects.none()
-                return AbstractNode.objects.filter(id__in=row)
+        return AbstractNode.objects.get_descendants(root, active=active)
+
+    def get_ancestors(self, node):
+        """Return the primary ancestors of `node`, nearest first, annotated with `depth`."""
+        return self.filter(
+            descendant_closures__descendant_id=node.pk
+        ).annotate(depth=F('descendant_closures__depth')).order_by('depth')
+
+    def get_descendants(self, node, active=False, max_depth=None):
+        """Return the primary descendants of `node`, annotated with `depth`.
+
+        :param bool active: Exclude deleted descendants
+        :param int max_depth: Only include descendants at most this many levels below `node`
+        """
+        qs = self.filter(ancestor_closures__ancestor_id=node.pk)
+        if max_depth is not None:
+            qs = qs.filter(ancestor_closures__depth__lte=max_depth)
+        if active:
+            qs = qs.filter(is_deleted=False)
+        return qs.annotate(depth=F('ancestor_closures__depth'))
+
+    def get_root_id(self, node):
+        """Return the pk of the topmost primary ancestor of `node`, or `node`'s own pk."""
+        root_id = NodeClosure.objects.filter(
+            descendant_id=node.pk
+        ).order_by('-depth').values_list('ancestor_id', flat=True).first()
+        return root_id or node.pk
 
     def can_view(self, user=None, private_link=None):
         qs = self.filter(is_public=True)
@@ -139,7 +122,10 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
             if not isinstance(private_link, basestring):
                 raise TypeError('"private_link" must be either {} or {}. Got {!r}'.format(str, PrivateLink, private_link))
 
-            qs |= self.filter(private_links__is_deleted=False, private_links__key=private_link)
+            if settings.ENABLE_NODE_READ_ACCESS_INDEX:
+                qs |= self.filter(id__in=NodeReadAccess.objects.filter(private_link_key=private_link).values('node_id'))
+            else:
+                qs |= self.filter(private_links__is_deleted=False, private_links__key=private_link)
 
         if user is not None and not isinstance(user, AnonymousUser):
             if isinstance(user, OSFUser):
@@ -147,6 +133,9 @@ class AbstractNodeQuerySet(GuidMixinQuerySet):
             if not isinstance(user, int):
                 raise TypeError('"user" must be either {} or {}. Got {!r}'.format(int, OSFUser, user))
 
+            if settings.ENABLE_NODE_READ_ACCESS_INDEX:
+                return qs | self.filter(id__in=NodeReadAccess.objects.filter(user_id=user).values('node_id'))
+
             sqs = Contributor.objects.filter(node=models.OuterRef('pk'), user__id=user, read=True)
             qs |= self.annotate(can_view=models.Exists(sqs)).filter(can_view=True)
             qs |= self.extra(where=['''
@@ -183,6 +172,15 @@ class AbstractNodeManager(TypedModelManager, IncludeManager):
     def get_children(self, root, active=False):
         return self.get_queryset().get_children(root, active=active)
 
+    def get_ancestors(self, node):
+        return self.get_queryset().get_ancestors(node)
+
+    def get_descendants(self, node, active=False, max_depth=None):
+        return self.get_queryset().get_descendants(node, active=active, max_depth=max_depth)
+
+    def get_root_id(self, node):
+        return self.get_queryset().get_root_id(node)
+
     def can_view(self, user=None, private_link=None):
         return self.get_queryset().can_view(user=user, private_link=private_link)
 
@@ -234,6 +232,13 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         'preprint_file',
     }
 
+    # Node fields that are written on every log, and that don't decide whether a node is listed.
+    # Saving only these keeps the cached totals of the node lists, see api.caching.counts
+    LIST_COUNT_IGNORED_FIELDS = {
+        'last_logged',
+        'modified',
+    }
+
     # Node fields that trigger an identifier update on save
     IDENTIFIER_UPDATE_FIELDS = {
         'title',
@@ -717,17 +722,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
     def bulk_update_search(cls, nodes, index=None):
         from website import search
         try:
-            serialize = functools.partial(search.search.update_node, index=index, bulk=True, async=False)
-            search.search.bulk_update_nodes(serialize, nodes, index=index)
+            search.search.bulk_index_nodes(nodes, index=index)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
 
-    def update_search(self):
+    def update_search(self, saved_fields=None):
         from website import search
 
         try:
-            search.search.update_node(self, bulk=False, async=True)
+            search.search.update_node(self, bulk=False, async=True, saved_fields=saved_fields)
         except search.exceptions.SearchUnavailableError as e:
             logger.exception(e)
             log_exception()
@@ -872,6 +876,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         """
         if not user:
             return False
+        resolver = get_permission_resolver()
+        if resolver is not None and self.pk and user.pk:
+            return resolver.has_permission(self, user, permission, check_parent=check_parent)
         query = {'node': self, permission: True}
         has_permission = user.contributor_set.filter(**query).exists()
         if not has_permission and permission == 'read' and check_parent:
@@ -882,6 +889,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         """Checks if the given user has a given permission on any child nodes
             that are not registrations or deleted
         """
+        resolver = get_permission_resolver()
+        if resolver is not None and self.pk and user and user.pk:
+            return resolver.has_permission_on_children(self, user, permission)
         if self.has_permission(user, permission):
             return True
         for node in self.nodes_primary.filter(is_deleted=False):
@@ -890,6 +900,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return False
 
     def is_admin_parent(self, user):
+        resolver = get_permission_resolver()
+        if resolver is not None and self.pk and user and user.pk:
+            return resolver.is_admin_parent(self, user)
         if self.has_permission(user, 'admin', check_parent=False):
             return True
         parent = self.parent_node
@@ -914,9 +927,7 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
 
     @property
     def parents(self):
-        if self.parent_node:
-            return [self.parent_node] + self.parent_node.parents
-        return []
+        return list(AbstractNode.objects.get_ancestors(self))
 
     @property
     def admin_contributor_ids(self):
@@ -1663,39 +1674,8 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         return self.private_links.filter(is_deleted=True).values_list('key', flat=True)
 
     def get_root(self):
-        sql = """
-            WITH RECURSIVE ascendants AS (
-              SELECT
-                parent_id,
-                child_id,
-                1 AS LEVEL,
-                ARRAY[child_id] as cids
-              FROM %s
-              WHERE is_node_link IS FALSE and child_id = %s
-              UNION ALL
-              SELECT
-                S.parent_id,
-                D.child_id,
-                D.level + 1,
-                D.cids || S.child_id
-              FROM ascendants AS D
-                JOIN %s AS S
-                  ON D.parent_id = S.child_id
-              WHERE S.is_node_link IS FALSE
-                AND %s = ANY(cids)
-            ) SELECT parent_id
-              FROM ascendants
-              WHERE child_id = %s
-              ORDER BY level DESC
-              LIMIT 1;
-        """
-        with connection.cursor() as cursor:
-            node_relation_table = AsIs(NodeRelation._meta.db_table)
-            cursor.execute(sql, [node_relation_table, self.pk, node_relation_table, self.pk, self.pk])
-            res = cursor.fetchone()
-            if res:
-                return AbstractNode.objects.get(pk=res[0])
-            return self
+        root = AbstractNode.objects.get_ancestors(self).order_by('-depth').first()
+        return root or self
 
     def find_readable_antecedent(self, auth):
         """ Returns first antecendant node readable by <user>.
@@ -1714,6 +1694,9 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             contrib.node = self
             contribs.append(contrib)
         Contributor.objects.bulk_create(contribs)
+        # bulk_create skips the signals that maintain the read access index and permission cache
+        NodeReadAccess.objects.refresh_subtree(self.id)
+        invalidate_permissions()
 
     def register_node(self, schema, auth, data, parent=None):
         """Make a frozen copy of a node.
@@ -1906,122 +1889,16 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
                 return True
         return False
 
-    # TODO: Optimize me (e.g. use bulk create)
-    def fork_node(self, auth, title=None, parent=None):
-        """Recursively fork a node.
+    def fork_node(self, auth, title=None):
+        """Fork a node and all of its primary descendants that the user can view.
+
+        The whole tree is written with bulk inserts; see `osf.utils.forking`.
 
         :param Auth auth: Consolidated authorization
         :param str title: Optional text to prepend to forked title
-        :param Node parent: Sets parent, should only be non-null when recursing
         :return: Forked node
         """
-        Registration = apps.get_model('osf.Registration')
-        PREFIX = 'Fork of '
-        user = auth.user
-
-        # Non-contributors can't fork private nodes
-        if not (self.is_public or self.has_permission(user, 'read')):
-            raise PermissionsError('{0!r} does not have permission to fork node {1!r}'.format(user, self._id))
-
-        when = timezone.now()
-
-        original = self
-
-        if original.is_deleted:
-            raise NodeStateError('Cannot fork deleted node.')
-
-        # Note: Cloning a node will clone each WikiPage on the node and all the related WikiVersions
-        # and point them towards the fork
-        forked = original.clone()
-        if isinstance(forked, Registration):
-            forked.recast('osf.node')
-
-        forked.is_fork = True
-        forked.forked_date = when
-        forked.forked_from = original
-        forked.creator = user
-        forked.node_license = original.license.copy() if original.license else None
-        forked.wiki_private_uuids = {}
-
-        # Forks default to private status
-        forked.is_public = False
-
-        # Need to save here in order to access m2m fields
-        forked.save()
-
-        forked.tags.add(*self.all_tags.values_list('pk', flat=True))
-        forked.subjects.add(*self.subjects.values_list('pk', flat=True))
-
-        if parent:
-            node_relation = NodeRelation.objects.get(parent=parent.forked_from, child=original)
-            NodeRelation.objects.get_or_create(_order=node_relation._order, parent=parent, child=forked)
-
-        for node_relation in original.node_relations.filter(child__is_deleted=False):
-            node_contained = node_relation.child
-            # Fork child nodes
-            if not node_relation.is_node_link:
-                try:  # Catch the potential PermissionsError above
-                    node_contained.fork_node(
-                        auth=auth,
-                        title='',
-                        parent=forked,
-                    )
-                except PermissionsError:
-                    pass  # If this exception is thrown omit the node from the result set
-            else:
-                # Copy linked nodes
-                NodeRelation.objects.get_or_create(
-                    is_node_link=True,
-                    parent=forked,
-                    child=node_contained
-                )
-
-        if title is None:
-            forked.title = PREFIX + original.title
-        elif title == '':
-            forked.title = original.title
-        else:
-            forked.title = title
-
-        if len(forked.title) > 200:
-            forked.title = forked.title[:200]
-
-        forked.add_contributor(
-            contributor=user,
-            permissions=CREATOR_PERMISSIONS,
-            log=False,
-            save=False
-        )
-
-        forked.root = None  # Recompute root on save
-
-        forked.save()
-
-        # Need to call this after save for the notifications to be created with the _primary_key
-        project_signals.contributor_added.send(forked, contributor=user, auth=auth, email_template='false')
-
-        forked.add_log(
-            action=NodeLog.NODE_FORKED,
-            params={
-                'parent_node': original.parent_id,
-                'node': original._primary_key,
-                'registration': forked._primary_key,  # TODO: Remove this in favor of 'fork'
-                'fork': forked._primary_key,
-            },
-            auth=auth,
-            log_date=when,
-            save=False,
-        )
-
-        # Clone each log from the original node for this fork.
-        self.clone_logs(forked)
-        forked.refresh_from_db()
-
-        # After fork callback
-        for addon in original.get_addons():
-            addon.after_fork(original, forked, user)
-
-        return forked
+        return fork_node_tree(self, auth, title=title)
 
     def clone_logs(self, node, page_size=100):
         paginator = Paginator(self.logs.order_by('pk').all(), page_size)
@@ -2047,113 +1924,28 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
             ]
             NodeLog.objects.bulk_create(logs_to_create)
 
-    def use_as_template(self, auth, changes=None, top_level=True, parent=None):
+    def use_as_template(self, auth, changes=None, top_level=True):
         """Create a new project, using an existing project as a template.
 
+        The whole tree is written with bulk inserts; see `osf.utils.forking`.
+
         :param auth: The user to be assigned as creator
         :param changes: A dictionary of changes, keyed by node id, which
                         override the attributes of the template project or its
                         children.
         :param Bool top_level: indicates existence of parent TODO: deprecate
-        :param Node parent: parent template. Should only be passed in during recursion
         :return: The `Node` instance created.
         """
-        Registration = apps.get_model('osf.Registration')
-        changes = changes or dict()
-
-        # build the dict of attributes to change for the new node
-        try:
-            attributes = changes[self._id]
-            # TODO: explicitly define attributes which may be changed.
-        except (AttributeError, KeyError):
-            attributes = dict()
-
-        if self.is_deleted:
-            raise NodeStateError('Cannot use deleted node as template.')
-
-        # Non-contributors can't template private nodes
-        if not (self.is_public or self.has_permission(auth.user, 'read')):
-            raise PermissionsError('{0!r} does not have permission to template node {1!r}'.format(auth.user, self._id))
-
-        new = self.clone()
-        if isinstance(new, Registration):
-            new.recast('osf.node')
-
-        new._is_templated_clone = True  # This attribute may be read in post_save handlers
-
-        # Clear quasi-foreign fields
-        new.wiki_private_uuids.clear()
-        new.file_guid_to_share_uuids.clear()
-
-        # set attributes which may be overridden by `changes`
-        new.is_public = False
-        new.description = ''
-
-        # apply `changes`
-        for attr, val in attributes.iteritems():
-            setattr(new, attr, val)
-
-        # set attributes which may NOT be overridden by `changes`
-        new.creator = auth.user
-        new.template_node = self
-        # Need to save in order to access contributors m2m table
-        new.save(suppress_log=True)
-        new.add_contributor(contributor=auth.user, permissions=CREATOR_PERMISSIONS, log=False, save=False)
-        new.is_fork = False
-        new.node_license = self.license.copy() if self.license else None
-
-        # If that title hasn't been changed, apply the default prefix (once)
-        if (
-            new.title == self.title and top_level and
-            language.TEMPLATED_FROM_PREFIX not in new.title
-        ):
-            new.title = ''.join((language.TEMPLATED_FROM_PREFIX, new.title,))
-
-        if len(new.title) > 200:
-            new.title = new.title[:200]
+        return template_node_tree(self, auth, [changes], top_level=top_level)[0]
 
-        # Slight hack - created is a read-only field.
-        new.created = timezone.now()
+    def bulk_use_as_template(self, auth, changes_list):
+        """Create one new project per entry of `changes_list`, using this project as a template.
 
-        new.save(suppress_log=True)
-
-        # Need to call this after save for the notifications to be created with the _primary_key
-        project_signals.contributor_added.send(new, contributor=auth.user, auth=auth, email_template='false')
-
-        # Log the creation
-        new.add_log(
-            NodeLog.CREATED_FROM,
-            params={
-                'node': new._primary_key,
-                'template_node': {
-                    'id': self._primary_key,
-                    'url': self.url,
-                    'title': self.title,
-                },
-            },
-            auth=auth,
-            log_date=new.created,
-            save=False,
-        )
-        new.save()
-
-        if parent:
-            node_relation = NodeRelation.objects.get(parent=parent.template_node, child=self)
-            NodeRelation.objects.get_or_create(_order=node_relation._order, parent=parent, child=new)
-
-        # deal with the children of the node, if any
-        for node_relation in self.node_relations.select_related('child').filter(child__is_deleted=False):
-            node_contained = node_relation.child
-            # template child nodes
-            if not node_relation.is_node_link:
-                try:  # Catch the potential PermissionsError above
-                    node_contained.use_as_template(auth, changes, top_level=False, parent=new)
-                except PermissionsError:
-                    pass
-
-        new.root = None
-        new.save()  # Recompute root on save()
-        return new
+        :param auth: The user to be assigned as creator
+        :param list changes_list: `changes` dictionaries as accepted by `use_as_template`
+        :return: The list of `Node` instances created, in the order of `changes_list`.
+        """
+        return template_node_tree(self, auth, changes_list)
 
     def next_descendants(self, auth, condition=lambda auth, node: True):
         """
@@ -2393,6 +2185,12 @@ class AbstractNode(DirtyFieldsMixin, TypedModel, AddonModelMixin, IdentifierMixi
         if saved_fields:
             self.on_update(first_save, saved_fields)
 
+        if first_save or set(saved_fields) - self.LIST_COUNT_IGNORED_FIELDS:
+            invalidate_list_counts(AbstractNode)
+
+        if 'is_deleted' in saved_fields:
+            invalidate_node_trees()
+
         if 'node_license' in saved_fields:
             children = list(self.descendants.filter(node_license=None, is_public=True, is_deleted=False))
             while len(children):
@@ -3050,6 +2848,19 @@ def remove_addons(auth, resource_object_list):
 
 
 ##### Signal listeners #####
+@receiver(post_delete)
+def invalidate_node_list_counts(sender, instance, **kwargs):
+    # Nodes, or who may see them, changed. Node saves invalidate in AbstractNode.save
+    if isinstance(instance, (AbstractNode, Contributor)):
+        invalidate_list_counts(AbstractNode)
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(m2m_changed, sender=AbstractNode.tags.through)
+def invalidate_node_list_counts_on_change(sender, instance, **kwargs):
+    invalidate_list_counts(AbstractNode)
+
+
 @receiver(post_save, sender=Node)
 @receiver(post_save, sender='osf.QuickFilesNode')
 def add_creator_as_contributor(sender, instance, created, **kwargs):
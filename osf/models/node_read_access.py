@@ -0,0 +1,181 @@
+from django.db import connection, models
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from osf.models.contributor import Contributor
+from osf.models.node_relation import NodeClosure, NodeRelation
+from osf.models.private_link import PrivateLink
+
+
+class NodeReadAccessManager(models.Manager):
+
+    # Direct read contributorships, plus implicit read on every primary descendant
+    # of a node the user administers. Overlapping refreshes can't see the rows each
+    # other inserts until they commit, so the last one to insert a row wins.
+    REFRESH_USERS_SQL = """
+        DELETE FROM "{access}" WHERE user_id IS NOT NULL {node_filter} {user_filter};
+        INSERT INTO "{access}" (node_id, user_id, private_link_key, is_contributor)
+        SELECT node_id, user_id, NULL, bool_or(is_contributor)
+        FROM (
+            SELECT node_id, user_id, TRUE AS is_contributor
+            FROM "{contributor}"
+            WHERE read IS TRUE {node_filter} {user_filter}
+          UNION ALL
+            SELECT CL.descendant_id AS node_id, C.user_id, FALSE AS is_contributor
+            FROM "{closure}" AS CL
+                JOIN "{contributor}" AS C ON C.node_id = CL.ancestor_id
+            WHERE C.admin IS TRUE {descendant_filter} {user_filter}
+        ) AS access
+        GROUP BY node_id, user_id
+        ON CONFLICT (user_id, node_id) DO UPDATE SET is_contributor = EXCLUDED.is_contributor;
+    """
+
+    REFRESH_PRIVATE_LINKS_SQL = """
+        DELETE FROM "{access}" WHERE private_link_key IS NOT NULL {access_key_filter};
+        INSERT INTO "{access}" (node_id, user_id, private_link_key, is_contributor)
+        SELECT N.abstractnode_id, NULL, P.key, FALSE
+        FROM "{privatelink}" AS P
+            JOIN "{privatelink_nodes}" AS N ON N.privatelink_id = P.id
+        WHERE P.is_deleted IS FALSE {link_key_filter}
+        ON CONFLICT DO NOTHING;
+    """
+
+    # Rows that should exist but do not, and rows that exist but should not.
+    DIFF_SQL = """
+        CREATE TEMPORARY TABLE expected_read_access ON COMMIT DROP AS
+        SELECT node_id, user_id, private_link_key, bool_or(is_contributor) AS is_contributor
+        FROM (
+            SELECT node_id, user_id, NULL::varchar AS private_link_key, TRUE AS is_contributor
+            FROM "{contributor}" WHERE read IS TRUE
+          UNION ALL
+            SELECT CL.descendant_id, C.user_id, NULL, FALSE
+            FROM "{closure}" AS CL JOIN "{contributor}" AS C ON C.node_id = CL.ancestor_id
+            WHERE C.admin IS TRUE
+          UNION ALL
+            SELECT N.abstractnode_id, NULL, P.key, FALSE
+            FROM "{privatelink}" AS P JOIN "{privatelink_nodes}" AS N ON N.privatelink_id = P.id
+            WHERE P.is_deleted IS FALSE
+        ) AS access
+        GROUP BY node_id, user_id, private_link_key;
+        SELECT 'missing', * FROM (
+            SELECT node_id, user_id, private_link_key, is_contributor FROM expected_read_access
+            EXCEPT SELECT node_id, user_id, private_link_key, is_contributor FROM "{access}"
+        ) AS missing
+        UNION ALL
+        SELECT 'extra', * FROM (
+            SELECT node_id, user_id, private_link_key, is_contributor FROM "{access}"
+            EXCEPT SELECT node_id, user_id, private_link_key, is_contributor FROM expected_read_access
+        ) AS extra;
+    """
+
+    def _execute(self, sql, params=None, fetch=False, **filters):
+        sql = sql.format(
+            access=self.model._meta.db_table,
+            contributor=Contributor._meta.db_table,
+            closure=NodeClosure._meta.db_table,
+            privatelink=PrivateLink._meta.db_table,
+            privatelink_nodes=PrivateLink.nodes.through._meta.db_table,
+            **filters
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if fetch:
+                return cursor.fetchall()
+
+    def refresh(self, node_ids=None, user_ids=None):
+        """Recompute the user rows for ``node_ids`` and ``user_ids``. Either may be None
+        to mean every node or every user. Callers are responsible for including the
+        descendants of a node whose admins changed; see ``refresh_subtree``.
+        """
+        filters = {'node_filter': '', 'descendant_filter': '', 'user_filter': ''}
+        params = {}
+        if node_ids is not None:
+            filters['node_filter'] = 'AND node_id = ANY(%(node_ids)s)'
+            filters['descendant_filter'] = 'AND CL.descendant_id = ANY(%(node_ids)s)'
+            params['node_ids'] = list(node_ids)
+        if user_ids is not None:
+            filters['user_filter'] = 'AND user_id = ANY(%(user_ids)s)'
+            params['user_ids'] = list(user_ids)
+        self._execute(self.REFRESH_USERS_SQL, params, **filters)
+
+    def refresh_subtree(self, node_id, user_ids=None):
+        node_ids = [node_id] + list(
+            NodeClosure.objects.filter(ancestor_id=node_id).values_list('descendant_id', flat=True)
+        )
+        self.refresh(node_ids=node_ids, user_ids=user_ids)
+
+    def refresh_private_link(self, private_link=None):
+        """Recompute the rows for ``private_link``, or for every private link if None."""
+        filters = {'access_key_filter': '', 'link_key_filter': ''}
+        params = {}
+        if private_link is not None:
+            filters['access_key_filter'] = 'AND private_link_key = %(key)s'
+            filters['link_key_filter'] = 'AND P.key = %(key)s'
+            params['key'] = private_link.key
+        self._execute(self.REFRESH_PRIVATE_LINKS_SQL, params, **filters)
+
+    def rebuild(self):
+        """Recompute every row. Should be run inside a transaction."""
+        self.refresh()
+        self.refresh_private_link()
+
+    def diff(self):
+        """Return a list of ``(problem, node_id, user_id, private_link_key, is_contributor)``
+        tuples, where problem is 'missing' or 'extra'. Must be run inside a transaction.
+        """
+        return self._execute(self.DIFF_SQL, fetch=True)
+
+
+class NodeReadAccess(models.Model):
+    """Denormalized "who can read this node" index used by ``AbstractNodeQuerySet.can_view``
+    when ``settings.ENABLE_NODE_READ_ACCESS_INDEX`` is on.
+
+    Each row grants read on ``node`` either to ``user`` or to holders of ``private_link_key``.
+    ``is_contributor`` is True when the user is a read contributor on the node itself,
+    rather than only an admin on one of its ancestors.
+    """
+    node = models.ForeignKey('AbstractNode', related_name='read_access', on_delete=models.CASCADE)
+    user = models.ForeignKey('OSFUser', null=True, blank=True, related_name='node_read_access', on_delete=models.CASCADE)
+    private_link_key = models.CharField(max_length=512, null=True, blank=True, db_index=True)
+    is_contributor = models.BooleanField(default=False)
+
+    objects = NodeReadAccessManager()
+
+    class Meta:
+        unique_together = (
+            ('user', 'node'),
+            ('private_link_key', 'node'),
+        )
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def update_read_access_for_contributor(sender, instance, **kwargs):
+    NodeReadAccess.objects.refresh_subtree(instance.node_id, user_ids=[instance.user_id])
+
+
+@receiver(post_save, sender=NodeRelation)
+@receiver(post_delete, sender=NodeRelation)
+def update_read_access_for_node_relation(sender, instance, **kwargs):
+    # Registered after the NodeClosure handlers, so the closure is already up to date
+    if not instance.is_node_link:
+        NodeReadAccess.objects.refresh_subtree(instance.child_id)
+
+
+@receiver(post_save, sender=PrivateLink)
+def update_read_access_for_private_link(sender, instance, **kwargs):
+    NodeReadAccess.objects.refresh_private_link(instance)
+
+
+@receiver(m2m_changed, sender=PrivateLink.nodes.through)
+def update_read_access_for_private_link_nodes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        NodeReadAccess.objects.refresh_private_link(instance)
+    elif action == 'post_clear':
+        # instance is a node, and pk_set is not available when clearing
+        NodeReadAccess.objects.filter(node_id=instance.id, private_link_key__isnull=False).delete()
+    else:
+        for private_link in PrivateLink.objects.filter(id__in=pk_set):
+            NodeReadAccess.objects.refresh_private_link(private_link)
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import connection, models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 
 from .base import BaseModel, ObjectIDMixin
 
@@ -25,3 +27,109 @@ class NodeRelation(ObjectIDMixin, BaseModel):
         index_together = (
             ('is_node_link', 'child', 'parent'),
         )
+
+
+class NodeClosureManager(models.Manager):
+
+    ATTACH_SQL = """
+        INSERT INTO "{closure}" (ancestor_id, descendant_id, depth)
+        SELECT A.ancestor_id, D.descendant_id, A.depth + D.depth + 1
+        FROM (
+            SELECT ancestor_id, depth FROM "{closure}" WHERE descendant_id = %(parent)s
+            UNION ALL SELECT %(parent)s, 0
+        ) AS A CROSS JOIN (
+            SELECT descendant_id, depth FROM "{closure}" WHERE ancestor_id = %(child)s
+            UNION ALL SELECT %(child)s, 0
+        ) AS D
+        WHERE A.ancestor_id != D.descendant_id
+        ON CONFLICT (ancestor_id, descendant_id) DO NOTHING;
+    """
+
+    DETACH_SQL = """
+        DELETE FROM "{closure}"
+        WHERE ancestor_id IN (
+            SELECT ancestor_id FROM "{closure}" WHERE descendant_id = %(parent)s
+            UNION ALL SELECT %(parent)s
+        ) AND descendant_id IN (
+            SELECT descendant_id FROM "{closure}" WHERE ancestor_id = %(child)s
+            UNION ALL SELECT %(child)s
+        );
+    """
+
+    # Rebuilds the whole table from osf_noderelation. The path array guards
+    # against cycles, which the application does not prevent at the db level.
+    REBUILD_SQL = """
+        INSERT INTO "{closure}" (ancestor_id, descendant_id, depth)
+        WITH RECURSIVE closure AS (
+            SELECT
+                parent_id AS ancestor_id,
+                child_id AS descendant_id,
+                1 AS depth,
+                ARRAY[parent_id, child_id] AS path
+            FROM "{noderelation}"
+            WHERE is_node_link IS FALSE
+          UNION ALL
+            SELECT
+                C.ancestor_id,
+                R.child_id,
+                C.depth + 1,
+                C.path || R.child_id
+            FROM closure AS C
+                JOIN "{noderelation}" AS R ON R.parent_id = C.descendant_id
+            WHERE R.is_node_link IS FALSE
+                AND NOT R.child_id = ANY(C.path)
+        ) SELECT ancestor_id, descendant_id, MIN(depth)
+          FROM closure
+          GROUP BY ancestor_id, descendant_id;
+    """
+
+    def _execute(self, sql, params=None):
+        sql = sql.format(closure=self.model._meta.db_table, noderelation=NodeRelation._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.rowcount
+
+    def attach(self, parent_id, child_id):
+        """Link the subtree rooted at ``child_id`` below ``parent_id`` and all of its ancestors."""
+        return self._execute(self.ATTACH_SQL, {'parent': parent_id, 'child': child_id})
+
+    def detach(self, parent_id, child_id):
+        """Remove every path that went through the ``parent_id`` -> ``child_id`` edge."""
+        return self._execute(self.DETACH_SQL, {'parent': parent_id, 'child': child_id})
+
+    def rebuild(self):
+        """Truncate and repopulate the closure table. Should be run inside a transaction."""
+        self.all().delete()
+        return self._execute(self.REBUILD_SQL)
+
+
+class NodeClosure(models.Model):
+    """Materialized transitive closure of the primary (non-link) node tree.
+
+    There is one row for every (ancestor, descendant) pair, with ``depth`` being
+    the number of edges between the two. Nodes are not their own ancestors.
+    Rows are maintained by the ``NodeRelation`` signal handlers below.
+    """
+    ancestor = models.ForeignKey('AbstractNode', related_name='descendant_closures', on_delete=models.CASCADE)
+    descendant = models.ForeignKey('AbstractNode', related_name='ancestor_closures', on_delete=models.CASCADE)
+    depth = models.PositiveIntegerField()
+
+    objects = NodeClosureManager()
+
+    class Meta:
+        unique_together = ('ancestor', 'descendant')
+        index_together = (
+            ('descendant', 'depth'),
+        )
+
+
+@receiver(post_save, sender=NodeRelation)
+def add_node_closure(sender, instance, created, **kwargs):
+    if created and not instance.is_node_link:
+        NodeClosure.objects.attach(instance.parent_id, instance.child_id)
+
+
+@receiver(post_delete, sender=NodeRelation)
+def remove_node_closure(sender, instance, **kwargs):
+    if not instance.is_node_link:
+        NodeClosure.objects.detach(instance.parent_id, instance.child_id)
@@ -0,0 +1,89 @@
+from django.db import connection, models
+
+
+class SearchIndexQueueEntryManager(models.Manager):
+
+    # Re-dirtying a queued document only bumps ``modified``, so a document that is saved many
+    # times between two runs of the indexer is indexed once. ``created`` keeps the time the
+    # document first became stale, which is what the indexing lag is measured from.
+    ENQUEUE_SQL = """
+        INSERT INTO "{queue}" (category, doc_id, created, modified)
+        SELECT %(category)s, doc_id, clock_timestamp(), clock_timestamp()
+        FROM unnest(%(doc_ids)s::varchar[]) AS doc_id
+        ON CONFLICT (category, doc_id) DO UPDATE SET modified = EXCLUDED.modified;
+    """
+
+    ENQUEUE_NODE_FILES_SQL = """
+        INSERT INTO "{queue}" (category, doc_id, created, modified)
+        SELECT 'file', F._id, clock_timestamp(), clock_timestamp()
+        FROM "{basefilenode}" AS F
+        WHERE F.node_id = ANY(%(node_ids)s) AND F.type = 'osf.osfstoragefile'
+        ON CONFLICT (category, doc_id) DO UPDATE SET modified = EXCLUDED.modified;
+    """
+
+    METRICS_SQL = """
+        SELECT category, count(*), extract(epoch FROM clock_timestamp() - min(created))
+        FROM "{queue}"
+        GROUP BY category;
+    """
+
+    def _execute(self, sql, params=None, fetch=False):
+        BaseFileNode = self.model._meta.apps.get_model('osf', 'BaseFileNode')
+        sql = sql.format(queue=self.model._meta.db_table, basefilenode=BaseFileNode._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            if fetch:
+                return cursor.fetchall()
+
+    def enqueue(self, category, doc_ids):
+        """Mark the search documents ``doc_ids`` of ``category`` as stale."""
+        doc_ids = list(doc_ids)
+        if doc_ids:
+            self._execute(self.ENQUEUE_SQL, {'category': category, 'doc_ids': doc_ids})
+
+    def enqueue_node_files(self, node_ids):
+        """Mark the search documents of every OsfStorage file of ``node_ids`` as stale."""
+        node_ids = list(node_ids)
+        if node_ids:
+            self._execute(self.ENQUEUE_NODE_FILES_SQL, {'node_ids': node_ids})
+
+    def clock(self):
+        """The database's current time, to compare with ``modified``."""
+        return self._execute('SELECT clock_timestamp();', fetch=True)[0][0]
+
+    def metrics(self):
+        """Return the number of queued documents per category and overall, and the age
+        in seconds of the oldest queued document.
+        """
+        rows = self._execute(self.METRICS_SQL, fetch=True)
+        depth = {category: count for category, count, _ in rows}
+        return {
+            'depth': sum(depth.values()),
+            'depth_by_category': depth,
+            'lag': max([lag for _, _, lag in rows] or [0]),
+        }
+
+
+class SearchIndexQueueEntry(models.Model):
+    """A search document waiting to be re-indexed when ``settings.ENABLE_SEARCH_INDEX_QUEUE``
+    is on. See ``website.search.elastic_search.process_index_queue``.
+    """
+    NODE = 'node'
+    FILE = 'file'
+    USER = 'user'
+    CATEGORY_CHOICES = (
+        (NODE, 'Node'),
+        (FILE, 'File'),
+        (USER, 'User'),
+    )
+
+    category = models.CharField(max_length=4, choices=CATEGORY_CHOICES)
+    # The id of the search document: a guid for nodes and users, the object id for files
+    doc_id = models.CharField(max_length=255)
+    created = models.DateTimeField(db_index=True)
+    modified = models.DateTimeField()
+
+    objects = SearchIndexQueueEntryManager()
+
+    class Meta:
+        unique_together = ('category', 'doc_id')
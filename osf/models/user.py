@@ -38,6 +38,7 @@ from osf.exceptions import reraise_django_validation_errors, MaxRetriesError
 from osf.models.base import BaseModel, GuidMixin, GuidMixinQuerySet
 from osf.models.contributor import Contributor, RecentlyAddedContributor
 from osf.models.institution import Institution
+from osf.models.node_read_access import NodeReadAccess
 from osf.models.mixins import AddonModelMixin
 from osf.models.session import Session
 from osf.models.tag import Tag
@@ -45,6 +46,7 @@ from osf.models.validators import validate_email, validate_social, validate_hist
 from osf.utils.datetime_aware_jsonfield import DateTimeAwareJSONField
 from osf.utils.fields import NonNaiveDateTimeField, LowercaseEmailField
 from osf.utils.names import impute_names
+from osf.utils.permission_resolver import invalidate_permissions
 from osf.utils.requests import check_select_for_update
 from website import settings as website_settings
 from website import filters, mails
@@ -691,6 +693,8 @@ class OSFUser(DirtyFieldsMixin, GuidMixin, BaseModel, AbstractBaseUser, Permissi
                 node.contributor_set.filter(user=user).delete()
             else:
                 node.contributor_set.filter(user=user).update(user=self)
+                NodeReadAccess.objects.refresh_subtree(node.id, user_ids=[user.id, self.id])
+                invalidate_permissions()
 
             node.save()
 
@@ -2,6 +2,8 @@ from __future__ import absolute_import
 
 import requests
 
+from framework import outbound
+
 
 class AkismetClientError(Exception):
 
@@ -32,7 +34,8 @@ class AkismetClient(object):
         if self._apikey_is_valid is not None:
             return self._apikey_is_valid
         else:
-            res = requests.post(
+            res = outbound.post(
+                'akismet',
                 '{}{}/1.1/verify-key'.format(self.API_PROTOCOL, self.API_HOST),
                 data={
                     'key': self.apikey,
@@ -69,7 +72,8 @@ class AkismetClient(object):
         data['user_agent'] = user_agent
 
         try:
-            res = requests.post(
+            res = outbound.post(
+                'akismet',
                 '{}{}.{}/1.1/comment-check'.format(self.API_PROTOCOL, self.apikey, self.API_HOST),
                 data=data,
                 headers=self._default_headers,
@@ -92,7 +96,8 @@ class AkismetClient(object):
         data['user_ip'] = user_ip
         data['user_agent'] = user_agent
 
-        res = requests.post(
+        res = outbound.post(
+            'akismet',
             '{}{}.{}/1.1/submit-spam'.format(self.API_PROTOCOL, self.apikey, self.API_HOST),
             data=data,
             headers=self._default_headers
@@ -112,7 +117,8 @@ class AkismetClient(object):
         data['user_ip'] = user_ip
         data['user_agent'] = user_agent
 
-        res = requests.post(
+        res = outbound.post(
+            'akismet',
             '{}{}.{}/1.1/submit-ham'.format(self.API_PROTOCOL, self.apikey, self.API_HOST),
             data=data,
             headers=self._default_headers
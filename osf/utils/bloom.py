@@ -0,0 +1,41 @@
+import hashlib
+import struct
+
+
+class BloomFilter(object):
+    """A set of strings in a fixed ``num_bits`` bits. It never misses a string that was added,
+    but may claim to contain one that wasn't, more often the fuller it gets.
+
+    :param int num_bits: Size of the filter
+    :param int num_hashes: Number of bits set per string
+    :param bits: The bytes of a filter of the same size, as returned by ``to_bytes``
+    """
+    def __init__(self, num_bits, num_hashes, bits=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        size = (num_bits + 7) // 8
+        # Filters stored with another size can't be read, start over
+        self.bits = bytearray(bits) if bits is not None and len(bits) == size else bytearray(size)
+
+    def _positions(self, key):
+        if isinstance(key, unicode):
+            key = key.encode('utf-8')
+        # Double hashing, with the two halves of one digest
+        first, second = struct.unpack('<QQ', hashlib.md5(key).digest())
+        return [(first + i * second) % self.num_bits for i in range(self.num_hashes)]
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def add(self, key):
+        """Add ``key``, and return whether it was not in the filter yet."""
+        added = False
+        for position in self._positions(key):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                added = True
+        return added
+
+    def to_bytes(self):
+        return bytes(self.bits)
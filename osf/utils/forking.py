@@ -0,0 +1,481 @@
+# -*- coding: utf-8 -*-
+"""Fork or template a whole node tree with a fixed number of queries.
+
+``NodeTreeCopier`` collects the primary subtree of the node being copied up front, then
+bulk-creates the new nodes, guids, ``NodeRelation``s, closure rows, contributors and
+licenses for one or more copies of the tree. ``NodeTreeForker`` and ``NodeTreeTemplater``
+add what is specific to forks and templates. Only the per-node hooks (signals, user activity
+counters and addon callbacks) run once per new node, after all rows exist.
+"""
+import logging
+import time
+
+import bson
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connection, transaction
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from api.caching.counts import invalidate_list_counts
+from framework.analytics import increment_user_activity_counters
+from framework.celery_tasks.handlers import enqueue_task
+from framework.exceptions import PermissionsError
+from osf.models.base import generate_guids
+from osf.utils.permission_resolver import invalidate_node_trees, invalidate_permissions
+from osf.utils.permissions import CREATOR_PERMISSIONS
+from website import language, settings
+from website.exceptions import NodeStateError
+from website.project import signals as project_signals
+from website.project import tasks as node_tasks
+
+logger = logging.getLogger(__name__)
+
+FORK_TITLE_PREFIX = 'Fork of '
+MAX_TITLE_LENGTH = 200
+LOG_PAGE_SIZE = 1000
+
+# Columns that BaseModel.clone nulls out or that the copy sets itself
+EXCLUDED_FIELDS = {'id', 'type', 'root', 'last_logged'}
+
+
+class NodeTreeCopier(object):
+    """Base class for bulk copies of a node tree.
+
+    Subclasses set ``verb`` and ``copy_node_links``, build each new node in ``_new_node``
+    and add their own rows in ``_populate`` and per-node side effects in ``_run_hooks``.
+    """
+    verb = 'copy'
+    deleted_message = 'Cannot copy deleted node.'
+    copy_node_links = True
+
+    def __init__(self, node, auth, count=1):
+        self.original = node
+        self.auth = auth
+        self.user = auth.user
+        self.count = count
+        self.when = timezone.now()
+
+        self.originals = {}  # original id -> original node
+        self.children = {}  # original id -> [(child id, is_node_link, _order)]
+        self.deleted_links = set()  # ids of deleted nodes that originals link to
+        self.copies = []  # one {original id: new node} per copy of the tree
+        self.guids = {}  # new node id -> guid
+        self.new_nodes = {}  # new node id -> new node, as loaded after the bulk inserts
+        self.stats = {}
+
+    def run(self):
+        """Copy the tree ``count`` times and return the new root nodes."""
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        NodeReadAccess = apps.get_model('osf.NodeReadAccess')
+        self._check()
+
+        start = time.time()
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                self._collect()
+                self._create_nodes()
+                self._create_relations()
+                self._create_contributors()
+                self._populate()
+            NodeReadAccess.objects.refresh(node_ids=self.guids.keys())
+        invalidate_node_trees()
+        invalidate_permissions(user_id=self.user.id)
+        # Bulk inserts don't send the post_save signals that forget the cached totals
+        invalidate_list_counts(AbstractNode)
+
+        # Hooks get freshly loaded nodes, so that any save() in them only writes what they changed
+        self.new_nodes = AbstractNode.objects.in_bulk(self.guids.keys())
+        with CaptureQueriesContext(connection) as hook_queries:
+            self._run_hooks()
+
+        self.stats = {
+            'nodes': len(self.guids),
+            'queries': len(queries),
+            'hook_queries': len(hook_queries),
+            'seconds': time.time() - start,
+        }
+        logger.info(
+            'Created %(nodes)s nodes in %(seconds).2fs: %(queries)s queries for the tree, %(hook_queries)s for hooks',
+            self.stats
+        )
+        return [self.new_nodes[root.id] for root in self.roots]
+
+    @property
+    def roots(self):
+        return [copy[self.original.id] for copy in self.copies]
+
+    def _check(self):
+        if self.original.is_deleted:
+            raise NodeStateError(self.deleted_message)
+        if self.original.is_quickfiles:
+            raise NodeStateError('A QuickFilesNode may not be forked, used as a template, or registered.')
+        if not (self.original.is_public or self.original.has_permission(self.user, 'read')):
+            raise PermissionsError('{0!r} does not have permission to {1} node {2!r}'.format(self.user, self.verb, self.original._id))
+
+    def _collect(self):
+        """Load the subtree, keeping only the nodes that the old recursive copy would have
+        visited: undeleted, viewable by the user and not below a skipped node.
+        """
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        NodeRelation = apps.get_model('osf.NodeRelation')
+
+        descendant_ids = list(AbstractNode.objects.get_descendants(self.original).values_list('id', flat=True))
+        candidates = {node.id: node for node in AbstractNode.objects.filter(id__in=[self.original.id] + descendant_ids)}
+        viewable = set(AbstractNode.objects.filter(id__in=descendant_ids).can_view(user=self.user).values_list('id', flat=True))
+
+        relations = NodeRelation.objects.filter(parent_id__in=candidates.keys())
+        if not self.copy_node_links:
+            relations = relations.filter(is_node_link=False)
+        for parent_id, child_id, is_node_link, order in relations.order_by('_order').values_list('parent_id', 'child_id', 'is_node_link', '_order'):
+            self.children.setdefault(parent_id, []).append((child_id, is_node_link, order))
+
+        linked_ids = set()
+        stack = [self.original.id]
+        while stack:
+            node_id = stack.pop()
+            self.originals[node_id] = candidates[node_id]
+            for child_id, is_node_link, _ in self.children.get(node_id, []):
+                if is_node_link:
+                    linked_ids.add(child_id)
+                elif child_id in viewable and not candidates[child_id].is_deleted:
+                    stack.append(child_id)
+
+        # Node links to deleted nodes are not copied
+        if linked_ids:
+            self.deleted_links = set(
+                AbstractNode.objects.filter(id__in=linked_ids, is_deleted=True).values_list('id', flat=True)
+            )
+
+    def _parents(self):
+        """Map original id -> original parent id, for every collected node but the root."""
+        return {
+            child_id: parent_id
+            for parent_id, children in self.children.items()
+            for child_id, is_node_link, _ in children
+            if not is_node_link and parent_id in self.originals and child_id in self.originals
+        }
+
+    def _licenses(self):
+        """Map original id -> the NodeLicenseRecord id it inherits, mirroring ``AbstractNode.license``."""
+        parents = self._parents()
+        root_license = self.original.license
+        licenses = {}
+        for node_id, node in self.originals.items():
+            current = node
+            while not current.node_license_id and current.id in parents:
+                current = self.originals[parents[current.id]]
+            licenses[node_id] = current.node_license_id or (root_license.id if root_license else None)
+        return licenses
+
+    def _new_node(self, original):
+        """Return an unsaved copy of ``original``. Relations are set by the caller."""
+        raise NotImplementedError
+
+    def _create_nodes(self):
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        Guid = apps.get_model('osf.Guid')
+        Node = apps.get_model('osf.Node')
+        NodeLicenseRecord = apps.get_model('osf.NodeLicenseRecord')
+
+        # Each new node gets its own copy of the license record it inherits
+        licenses = self._licenses()
+        records = NodeLicenseRecord.objects.in_bulk(set(filter(None, licenses.values())))
+        license_copies = [
+            {
+                node_id: NodeLicenseRecord(
+                    node_license_id=records[license_id].node_license_id,
+                    year=records[license_id].year,
+                    copyright_holders=records[license_id].copyright_holders,
+                )
+                for node_id, license_id in licenses.items() if license_id
+            }
+            for _ in range(self.count)
+        ]
+        NodeLicenseRecord.objects.bulk_create([record for copy in license_copies for record in copy.values()])
+
+        for license_copy in license_copies:
+            copy = {}
+            for node_id, original in self.originals.items():
+                new = self._new_node(original)
+                new.creator_id = self.user.id
+                new.node_license = license_copy.get(node_id)
+                new.last_logged = self.when
+                copy[node_id] = new
+            self.copies.append(copy)
+
+        # Roots first, so that every other new node can be inserted with its root set
+        roots = self.roots
+        Node.objects.bulk_create(roots)
+        Node.objects.filter(id__in=[root.id for root in roots]).update(root_id=F('id'))
+        descendants = []
+        for copy in self.copies:
+            root = copy[self.original.id]
+            root.root_id = root.id
+            for node_id, new in copy.items():
+                if node_id != self.original.id:
+                    new.root_id = root.id
+                    descendants.append(new)
+        Node.objects.bulk_create(descendants)
+
+        new_nodes = [new for copy in self.copies for new in copy.values()]
+        content_type = ContentType.objects.get_for_model(AbstractNode)
+        guids = generate_guids(len(new_nodes), length=Node.__guid_min_length__)
+        Guid.objects.bulk_create([
+            Guid(_id=guid, object_id=new.id, content_type=content_type)
+            for guid, new in zip(guids, new_nodes)
+        ])
+        self.guids = {new.id: guid for guid, new in zip(guids, new_nodes)}
+
+    def _create_relations(self):
+        NodeClosure = apps.get_model('osf.NodeClosure')
+        NodeRelation = apps.get_model('osf.NodeRelation')
+
+        relations = []
+        closures = []
+        for copy in self.copies:
+            ancestors = {self.original.id: []}  # original id -> new ids of its ancestors, nearest first
+            stack = [self.original.id]
+            while stack:
+                node_id = stack.pop()
+                new = copy[node_id]
+                for child_id, is_node_link, order in self.children.get(node_id, []):
+                    if is_node_link:
+                        if child_id not in self.deleted_links:
+                            relations.append(NodeRelation(parent=new, child_id=child_id, is_node_link=True, _order=order))
+                    elif child_id in copy:
+                        child = copy[child_id]
+                        relations.append(NodeRelation(parent=new, child=child, is_node_link=False, _order=order))
+                        ancestors[child_id] = [new.id] + ancestors[node_id]
+                        closures.extend(
+                            NodeClosure(ancestor_id=ancestor_id, descendant_id=child.id, depth=depth)
+                            for depth, ancestor_id in enumerate(ancestors[child_id], 1)
+                        )
+                        stack.append(child_id)
+        NodeRelation.objects.bulk_create(relations)
+        NodeClosure.objects.bulk_create(closures)
+
+    def _create_contributors(self):
+        Contributor = apps.get_model('osf.Contributor')
+        Contributor.objects.bulk_create([
+            Contributor(
+                user=self.user,
+                node=new,
+                visible=True,
+                _order=0,
+                **{permission: True for permission in CREATOR_PERMISSIONS}
+            )
+            for copy in self.copies for new in copy.values()
+        ])
+
+    def _populate(self):
+        """Bulk-create any other rows of the new nodes."""
+        pass
+
+    def _run_hooks(self):
+        pass
+
+
+class NodeTreeForker(NodeTreeCopier):
+    verb = 'fork'
+    deleted_message = 'Cannot fork deleted node.'
+
+    def __init__(self, node, auth, title=None):
+        super(NodeTreeForker, self).__init__(node, auth)
+        self.title = title
+
+    def _fork_title(self, original):
+        if original.id != self.original.id or self.title == '':
+            title = original.title
+        elif self.title is None:
+            title = FORK_TITLE_PREFIX + original.title
+        else:
+            title = self.title
+        return title[:MAX_TITLE_LENGTH]
+
+    def _new_node(self, original):
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        Node = apps.get_model('osf.Node')
+        fork = Node(**{
+            field.attname: getattr(original, field.attname)
+            for field in AbstractNode._meta.concrete_fields
+            if field.name not in EXCLUDED_FIELDS and not field.is_relation
+        })
+        fork.is_fork = True
+        fork.forked_date = self.when
+        fork.forked_from_id = original.id
+        fork.wiki_private_uuids = {}
+        fork.is_public = False
+        fork.title = self._fork_title(original)
+        return fork
+
+    @property
+    def forks(self):
+        return self.copies[0]
+
+    def _populate(self):
+        self._copy_m2m()
+        self._create_logs()
+
+    def _copy_m2m(self):
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        for field_name, target in (('tags', 'tag_id'), ('subjects', 'subject_id')):
+            through = getattr(AbstractNode, field_name).through
+            rows = through.objects.filter(abstractnode_id__in=self.originals.keys()).values_list('abstractnode_id', target)
+            through.objects.bulk_create([
+                through(**{'abstractnode_id': self.forks[node_id].id, target: target_id})
+                for node_id, target_id in rows
+            ])
+
+    def _create_logs(self):
+        NodeLog = apps.get_model('osf.NodeLog')
+        parent_guids = {child_id: self.originals[parent_id]._id for child_id, parent_id in self._parents().items()}
+        parent_guids[self.original.id] = self.original.parent_id
+
+        NodeLog.objects.bulk_create([
+            NodeLog(
+                _id=bson.ObjectId(),
+                action=NodeLog.NODE_FORKED,
+                date=self.when,
+                params={
+                    'parent_node': parent_guids.get(node_id),
+                    'node': original._id,
+                    'registration': self.guids[self.forks[node_id].id],  # TODO: Remove this in favor of 'fork'
+                    'fork': self.guids[self.forks[node_id].id],
+                },
+                node_id=self.forks[node_id].id,
+                user_id=self.user.id,
+                original_node_id=node_id,
+            )
+            for node_id, original in self.originals.items()
+        ])
+
+        # Clone every log of every original, keyset-paginated across the whole tree.
+        # Instantiate NodeLogs "manually" because BaseModel#clone() is too slow for large projects
+        logs = NodeLog.objects.filter(node_id__in=self.originals.keys()).order_by('pk')
+        last_pk = 0
+        while True:
+            page = list(logs.filter(pk__gt=last_pk)[:LOG_PAGE_SIZE])
+            if not page:
+                break
+            NodeLog.objects.bulk_create([
+                NodeLog(
+                    _id=bson.ObjectId(),
+                    action=log.action,
+                    date=log.date,
+                    params=log.params,
+                    should_hide=log.should_hide,
+                    foreign_user=log.foreign_user,
+                    node_id=self.forks[log.node_id].id,
+                    user_id=log.user_id,
+                    original_node_id=log.original_node_id
+                )
+                for log in page
+            ])
+            last_pk = page[-1].pk
+
+    def _run_hooks(self):
+        NodeLog = apps.get_model('osf.NodeLog')
+        for node_id, original in self.originals.items():
+            fork = self.new_nodes[self.forks[node_id].id]
+            # Need to call this after save for the notifications to be created with the _primary_key
+            project_signals.contributor_added.send(fork, contributor=self.user, auth=self.auth, email_template='false')
+            increment_user_activity_counters(self.user._primary_key, NodeLog.NODE_FORKED, self.when.isoformat())
+            for addon in original.get_addons():
+                addon.after_fork(original, fork, self.user)
+
+
+class NodeTreeTemplater(NodeTreeCopier):
+    """Create one new project per entry of ``changes_list`` from the tree below ``node``.
+    Each entry is a ``changes`` dict as accepted by ``AbstractNode.use_as_template``.
+    """
+    verb = 'template'
+    deleted_message = 'Cannot use deleted node as template.'
+    copy_node_links = False
+
+    def __init__(self, node, auth, changes_list, top_level=True):
+        super(NodeTreeTemplater, self).__init__(node, auth, count=len(changes_list))
+        self.changes_list = [changes or {} for changes in changes_list]
+        self.top_level = top_level
+
+    def _new_node(self, original):
+        AbstractNode = apps.get_model('osf.AbstractNode')
+        Node = apps.get_model('osf.Node')
+        new = Node(**{
+            field.attname: getattr(original, field.attname)
+            for field in AbstractNode._meta.concrete_fields
+            if field.name not in EXCLUDED_FIELDS and not field.is_relation
+        })
+        new._is_templated_clone = True
+
+        # Clear quasi-foreign fields
+        new.wiki_private_uuids = {}
+        new.file_guid_to_share_uuids = {}
+
+        # set attributes which may be overridden by `changes`
+        new.is_public = False
+        new.description = ''
+
+        # apply `changes`
+        changes = self.changes_list[len(self.copies)]
+        for attr, val in changes.get(original._id, {}).iteritems():
+            setattr(new, attr, val)
+
+        # set attributes which may NOT be overridden by `changes`
+        new.template_node_id = original.id
+        new.is_fork = False
+        new.created = self.when
+
+        # If that title hasn't been changed, apply the default prefix (once)
+        if (
+            original.id == self.original.id and self.top_level and new.title == original.title and
+            language.TEMPLATED_FROM_PREFIX not in new.title
+        ):
+            new.title = ''.join((language.TEMPLATED_FROM_PREFIX, new.title,))
+        new.title = new.title[:MAX_TITLE_LENGTH]
+        return new
+
+    def _populate(self):
+        NodeLog = apps.get_model('osf.NodeLog')
+        logs = []
+        for copy in self.copies:
+            for node_id, original in self.originals.items():
+                new = copy[node_id]
+                logs.append(NodeLog(
+                    _id=bson.ObjectId(),
+                    action=NodeLog.CREATED_FROM,
+                    date=self.when,
+                    params={
+                        'node': self.guids[new.id],
+                        'template_node': {
+                            'id': original._id,
+                            'url': original.url,
+                            'title': original.title,
+                        },
+                    },
+                    node_id=new.id,
+                    user_id=self.user.id,
+                    original_node_id=new.id,
+                ))
+        NodeLog.objects.bulk_create(logs)
+
+    def _run_hooks(self):
+        NodeLog = apps.get_model('osf.NodeLog')
+        default_addons = [addon.short_name for addon in settings.ADDONS_AVAILABLE if 'node' in addon.added_default]
+        for new in self.new_nodes.values():
+            project_signals.contributor_added.send(new, contributor=self.user, auth=self.auth, email_template='false')
+            increment_user_activity_counters(self.user._primary_key, NodeLog.CREATED_FROM, self.when.isoformat())
+            for addon_name in default_addons:
+                new.add_addon(addon_name, auth=None, log=False)
+        enqueue_task(node_tasks.on_nodes_created.s(node_ids=self.guids.values()))
+
+
+def fork_node_tree(node, auth, title=None):
+    """Fork ``node`` and its primary descendants. See ``AbstractNode.fork_node``."""
+    return NodeTreeForker(node, auth, title=title).run()[0]
+
+
+def template_node_tree(node, auth, changes_list, top_level=True):
+    """Create a project from ``node`` for each entry of ``changes_list``. See ``AbstractNode.use_as_template``."""
+    return NodeTreeTemplater(node, auth, changes_list, top_level=top_level).run()
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+"""Request-scoped cache for node permission checks.
+
+``AbstractNode.has_permission``, ``is_admin_parent`` and ``has_permission_on_children``
+are called in loops by serializers and notification code. Within a request, the first
+check for a (user, node tree) pair loads the tree's structure and all of that user's
+contributorships in the tree, and every later check is answered from memory.
+
+Outside of a request (celery tasks, scripts, shells) there is no resolver and the
+model methods query the database directly.
+"""
+import threading
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from osf.utils.permissions import ADMIN, READ
+
+_local = threading.local()
+
+
+class NodeTree(object):
+    """The primary tree below ``root_id``, as loaded from NodeClosure."""
+
+    def __init__(self, root_id):
+        NodeClosure = apps.get_model('osf.NodeClosure')
+        AbstractNode = apps.get_model('osf.AbstractNode')
+
+        self.root_id = root_id
+        self.members = {root_id}
+        self.ancestors = {root_id: set()}
+        self.descendants = {root_id: set()}
+        member_ids = NodeClosure.objects.filter(ancestor_id=root_id).values('descendant_id')
+        pairs = NodeClosure.objects.filter(descendant_id__in=member_ids).values_list('ancestor_id', 'descendant_id')
+        for ancestor_id, descendant_id in pairs:
+            self.members.update((ancestor_id, descendant_id))
+            self.ancestors.setdefault(descendant_id, set()).add(ancestor_id)
+            self.descendants.setdefault(ancestor_id, set()).add(descendant_id)
+        self.deleted = set(
+            AbstractNode.objects.filter(id__in=self.members, is_deleted=True).values_list('id', flat=True)
+        )
+
+    def active_subtree(self, node_id):
+        """``node_id`` plus every descendant reachable without passing through a deleted node."""
+        descendants = self.descendants.get(node_id, set())
+        deleted_below = descendants & self.deleted
+        return {node_id} | {
+            each for each in descendants - deleted_below
+            if not self.ancestors.get(each, set()) & deleted_below
+        }
+
+
+class PermissionResolver(object):
+
+    def __init__(self):
+        self._trees = {}  # root id -> NodeTree
+        self._roots = {}  # node id -> root id
+        self._permissions = {}  # (user id, root id) -> {node id: {'read': bool, 'write': bool, 'admin': bool}}
+
+    def _get_tree(self, node):
+        root_id = self._roots.get(node.id)
+        if root_id is None:
+            root_id = node.root_id or node.id
+            if root_id not in self._trees:
+                self._trees[root_id] = NodeTree(root_id)
+            if node.id not in self._trees[root_id].members:
+                # node.root is stale; fall back to the closure table
+                root_id = apps.get_model('osf.AbstractNode').objects.get_root_id(node)
+                if root_id not in self._trees:
+                    self._trees[root_id] = NodeTree(root_id)
+            for member_id in self._trees[root_id].members:
+                self._roots[member_id] = root_id
+        return self._trees[root_id]
+
+    def _get_permissions(self, user, tree):
+        key = (user.id, tree.root_id)
+        if key not in self._permissions:
+            Contributor = apps.get_model('osf.Contributor')
+            self._permissions[key] = {
+                node_id: {'read': read, 'write': write, 'admin': admin}
+                for node_id, read, write, admin in Contributor.objects.filter(
+                    user_id=user.id, node_id__in=tree.members
+                ).values_list('node_id', 'read', 'write', 'admin')
+            }
+        return self._permissions[key]
+
+    def has_permission(self, node, user, permission, check_parent=True):
+        tree = self._get_tree(node)
+        permissions = self._get_permissions(user, tree)
+        if permissions.get(node.id, {}).get(permission, False):
+            return True
+        if permission == READ and check_parent:
+            return self._is_admin_parent(node.id, permissions, tree)
+        return False
+
+    def is_admin_parent(self, node, user):
+        tree = self._get_tree(node)
+        return self._is_admin_parent(node.id, self._get_permissions(user, tree), tree)
+
+    def _is_admin_parent(self, node_id, permissions, tree):
+        return any(
+            permissions.get(each, {}).get(ADMIN, False)
+            for each in tree.ancestors.get(node_id, set()) | {node_id}
+        )
+
+    def has_permission_on_children(self, node, user, permission):
+        tree = self._get_tree(node)
+        permissions = self._get_permissions(user, tree)
+        for node_id in tree.active_subtree(node.id):
+            if permissions.get(node_id, {}).get(permission, False):
+                return True
+            if permission == READ and self._is_admin_parent(node_id, permissions, tree):
+                return True
+        return False
+
+    def invalidate(self, user_id=None):
+        """Forget cached contributorships for ``user_id``, or for every user if None."""
+        if user_id is None:
+            self._permissions = {}
+        else:
+            self._permissions = {key: value for key, value in self._permissions.items() if key[0] != user_id}
+
+    def invalidate_trees(self):
+        """Forget cached tree structure, e.g. after a node was moved or deleted."""
+        self._trees = {}
+        self._roots = {}
+        self._permissions = {}
+
+
+def get_permission_resolver():
+    """Return the current request's resolver, or None if not in a request."""
+    return getattr(_local, 'resolver', None)
+
+
+def invalidate_permissions(user_id=None):
+    resolver = get_permission_resolver()
+    if resolver is not None:
+        resolver.invalidate(user_id=user_id)
+
+
+def invalidate_node_trees():
+    resolver = get_permission_resolver()
+    if resolver is not None:
+        resolver.invalidate_trees()
+
+
+def permission_resolver_before_request():
+    _local.resolver = PermissionResolver()
+
+
+def permission_resolver_teardown_request(error=None):
+    _local.resolver = None
+
+
+handlers = {
+    'before_request': permission_resolver_before_request,
+    'teardown_request': permission_resolver_teardown_request,
+}
+
+
+@receiver(post_save, sender='osf.Contributor')
+@receiver(post_delete, sender='osf.Contributor')
+def invalidate_contributor_permissions(sender, instance, **kwargs):
+    invalidate_permissions(user_id=instance.user_id)
+
+
+@receiver(post_save, sender='osf.NodeRelation')
+@receiver(post_delete, sender='osf.NodeRelation')
+def invalidate_node_relation_trees(sender, instance, **kwargs):
+    if not instance.is_node_link:
+        invalidate_node_trees()
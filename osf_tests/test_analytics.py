@@ -5,19 +5,23 @@ Unit tests for analytics logic in framework/analytics/__init__.py
 
 import unittest
 
+import mock
 import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 from nose.tools import *  # flake8: noqa  (PEP8 asserts)
 from flask import Flask
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from framework import analytics, sessions
-from framework.sessions import session
-from osf.models import PageCounter, Session
+from framework.sessions import session, set_session
+from osf.models import PageCounter, PageCounterIncrement, Session, SessionVisits, UserActivityCounter, UserActivityIncrement
+from osf.utils.bloom import BloomFilter
 
 from tests.base import OsfTestCase
-from osf_tests.factories import UserFactory, ProjectFactory
+from osf_tests.factories import UserFactory, ProjectFactory, SessionFactory
 
 pytestmark = pytest.mark.django_db
 
@@ -42,3 +46,117 @@ class TestAnalytics(OsfTestCase):
         assert_equal(user.get_activity_points(), 0)
         analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
         assert_equal(user.get_activity_points(), 1)
+
+    def test_flush_user_activity_counters(self):
+        user = UserFactory()
+        date = datetime(2018, 7, 1)
+        for action in ('project_created', 'project_created', 'file_added'):
+            analytics.increment_user_activity_counters(user._id, action, date.isoformat())
+
+        assert_equal(UserActivityCounter.flush(batch_size=2), 3)
+        assert_equal(UserActivityIncrement.objects.count(), 0)
+        counter = UserActivityCounter.objects.get(_id=user._id)
+        assert_equal(counter.total, 3)
+        assert_equal(
+            set(counter.days.values_list('action', 'date', 'total')),
+            {('project_created', date.date(), 2), ('file_added', date.date(), 1)}
+        )
+
+        analytics.increment_user_activity_counters(user._id, 'project_created', date.isoformat())
+        assert_equal(user.get_activity_points(), 4)
+        UserActivityCounter.flush(batch_size=10)
+        assert_equal(counter.days.get(action='project_created').total, 3)
+        assert_equal(user.get_activity_points(), 4)
+
+
+class TestPageCounter(OsfTestCase):
+
+    def setUp(self):
+        super(TestPageCounter, self).setUp()
+        set_session(SessionFactory())
+        self.node = ProjectFactory(is_public=True)
+        self.page = 'download:{}:abc12'.format(self.node._id)
+        self.node_info = {'contributors': self.node.contributors}
+
+    def test_counts_before_and_after_flush(self):
+        assert_equal(analytics.get_basic_counters(self.page), (None, None))
+        analytics.update_counter(self.page, node_info=self.node_info)
+        analytics.update_counter(self.page, node_info=self.node_info)
+        assert_equal(analytics.get_basic_counters(self.page), (1, 2))
+
+        assert_equal(PageCounter.flush(batch_size=10), 2)
+        assert_equal(PageCounterIncrement.objects.count(), 0)
+        assert_equal(analytics.get_basic_counters(self.page), (1, 2))
+
+        analytics.update_counter(self.page, node_info=self.node_info)
+        assert_equal(analytics.get_basic_counters(self.page), (1, 3))
+
+    def test_flush_per_day(self):
+        analytics.update_counter(self.page, node_info=self.node_info)
+        analytics.update_counter(self.page, node_info=self.node_info)
+        PageCounter.flush(batch_size=1)
+        counter = PageCounter.objects.get(_id=self.page)
+        day = counter.days.get()
+        assert_equal(day.date, timezone.now().date())
+        assert_equal((day.unique, day.total), (1, 2))
+
+    def test_contributor_downloads_are_not_counted_in_totals(self):
+        session.data['auth_user_id'] = self.node.creator._id
+        analytics.update_counter(self.page, node_info=self.node_info)
+        PageCounter.flush(batch_size=10)
+        counter = PageCounter.objects.get(_id=self.page)
+        assert_equal((counter.unique, counter.total), (0, 0))
+        assert_equal(counter.days.get().total, 1)
+
+    def test_visits_are_kept_out_of_the_session(self):
+        analytics.update_counter(self.page, node_info=self.node_info)
+        analytics.update_counter(self.page, node_info=self.node_info)
+        assert_not_in('visited', session.data)
+        assert_not_in('visited_by_date', session.data)
+        visits = SessionVisits.objects.get(session=session._get_current_object())
+        assert_in(self.page, visits.pages)
+
+        tomorrow = timezone.now() + timedelta(days=1)
+        with mock.patch('osf.models.analytics.timezone.now', return_value=tomorrow):
+            analytics.update_counter(self.page, node_info=self.node_info)
+        PageCounter.flush(batch_size=10)
+        counter = PageCounter.objects.get(_id=self.page)
+        assert_equal((counter.unique, counter.total), (1, 3))
+        assert_equal(
+            list(counter.days.order_by('date').values_list('unique', 'total')),
+            [(1, 2), (1, 1)]
+        )
+
+    def test_unchanged_visits_are_not_saved(self):
+        analytics.update_counter(self.page, node_info=self.node_info)
+        visits = SessionVisits.objects.get(session=session._get_current_object())
+        visits.pages.add(self.page)
+        with CaptureQueriesContext(connection) as queries:
+            visits.save_if_changed()
+        assert_equal(len(queries), 0)
+
+    def test_visits_of_unstored_sessions_are_unique(self):
+        set_session(Session())
+        analytics.update_counter(self.page, node_info=self.node_info)
+        analytics.update_counter(self.page, node_info=self.node_info)
+        assert_equal(analytics.get_basic_counters(self.page), (2, 2))
+        assert_false(SessionVisits.objects.exists())
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_add(self):
+        bloom = BloomFilter(1024, 4)
+        assert_true(bloom.add('download:abc12:def34'))
+        assert_false(bloom.add('download:abc12:def34'))
+        assert_in('download:abc12:def34', bloom)
+        assert_not_in('view:abc12:def34', bloom)
+
+    def test_to_bytes(self):
+        bloom = BloomFilter(1024, 4)
+        bloom.add(u'download:abc12:déf34')
+        assert_equal(len(bloom.to_bytes()), 128)
+        copy = BloomFilter(1024, 4, bytearray(bloom.to_bytes()))
+        assert_in(u'download:abc12:déf34', copy)
+        # Filters of another size start over
+        assert_not_in(u'download:abc12:déf34', BloomFilter(2048, 4, bytearray(bloom.to_bytes())))
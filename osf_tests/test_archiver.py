@@ -17,8 +17,10 @@ from mock import call
 import pytest
 from nose.tools import *  # flake8: noqa
 
+from framework import outbound
 from framework.auth import Auth
 from framework.celery_tasks import handlers
+from framework.exceptions import HTTPError
 
 from website.archiver import (
     ARCHIVER_INITIATED,
@@ -568,6 +570,17 @@ class TestArchiverTasks(ArchiverTestCase):
             )
         ))
 
+    @mock.patch('website.archiver.tasks.outbound.post')
+    def test_make_copy_request_reports_open_circuit_as_http_error(self, mock_post):
+        mock_post.side_effect = outbound.CircuitOpenError()
+        with assert_raises(HTTPError) as ctx:
+            make_copy_request(
+                job_pk=self.archive_job._id,
+                url=settings.WATERBUTLER_URL + '/ops/copy',
+                data={'provider': 'osfstorage'}
+            )
+        assert_equal(ctx.exception.code, 503)
+
     def test_archive_success(self):
         node = factories.NodeFactory(creator=self.user)
         file_trees, selected_files, node_index = generate_file_tree([node])
@@ -0,0 +1,175 @@
+import mock
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from framework.auth import Auth
+from framework.exceptions import PermissionsError
+from osf.models import NodeClosure, NodeLog, NodeRelation
+from osf.utils.forking import NodeTreeForker, NodeTreeTemplater
+from osf_tests.factories import (
+    NodeFactory,
+    ProjectFactory,
+    SubjectFactory,
+    UserFactory,
+)
+from website.exceptions import NodeStateError
+from website.project.tasks import fork_node as fork_node_task
+
+pytestmark = pytest.mark.django_db
+
+
+def make_tree(user, depth, width):
+    """Build a project with ``width`` components on each of ``depth`` levels below the root."""
+    root = ProjectFactory(creator=user)
+    level = [root]
+    for _ in range(depth):
+        level = [NodeFactory(creator=user, parent=parent) for parent in level for _ in range(width)]
+    return root
+
+
+def count_fork_queries(node, auth):
+    with mock.patch.object(NodeTreeForker, '_run_hooks'), CaptureQueriesContext(connection) as queries:
+        node.fork_node(auth)
+    return len(queries)
+
+
+def count_template_queries(node, auth, count):
+    with mock.patch.object(NodeTreeTemplater, '_run_hooks'), CaptureQueriesContext(connection) as queries:
+        node.bulk_use_as_template(auth, [None] * count)
+    return len(queries)
+
+
+@pytest.fixture()
+def user():
+    return UserFactory()
+
+@pytest.fixture()
+def auth(user):
+    return Auth(user)
+
+@pytest.fixture()
+def project(user):
+    return ProjectFactory(creator=user, title='Tree')
+
+
+class TestNodeTreeForker:
+
+    def test_fork_copies_tree(self, project, user, auth):
+        component = NodeFactory(creator=user, parent=project, title='Component')
+        grandchild = NodeFactory(creator=user, parent=component, title='Grandchild')
+        pointee = ProjectFactory()
+        project.add_pointer(pointee, auth=auth)
+        subject = SubjectFactory()
+        project.subjects.add(subject)
+        project.add_tag('forked', auth=auth)
+
+        fork = project.fork_node(auth)
+
+        assert fork.title == 'Fork of Tree'
+        assert fork.is_fork
+        assert fork.forked_from == project
+        assert fork.root == fork
+        assert list(fork.contributors.all()) == [user]
+        assert list(fork.subjects.all()) == [subject]
+        assert list(fork.tags.values_list('name', flat=True)) == ['forked']
+        assert list(fork.linked_nodes.all()) == [pointee]
+        assert fork.logs.latest().action == NodeLog.NODE_FORKED
+        assert fork.logs.count() == project.logs.count() + 1
+
+        forked_component = fork.nodes[0]
+        assert forked_component.title == 'Component'
+        assert forked_component.forked_from == component
+        assert forked_component.root_id == fork.id
+        forked_grandchild = forked_component.nodes[0]
+        assert forked_grandchild.forked_from == grandchild
+        assert NodeClosure.objects.filter(descendant=forked_grandchild).count() == 2
+        assert forked_grandchild.has_permission(user, 'admin')
+
+    def test_fork_skips_deleted_and_unviewable_children(self, project, user, auth):
+        deleted = NodeFactory(creator=user, parent=project)
+        NodeFactory(creator=user, parent=deleted)
+        deleted.is_deleted = True
+        deleted.save()
+        NodeFactory(parent=project)  # user is not a contributor
+        kept = NodeFactory(creator=user, parent=project)
+
+        fork = project.fork_node(auth)
+
+        assert [child.forked_from for child in fork.nodes] == [kept]
+        assert NodeRelation.objects.filter(parent=fork, is_node_link=False).count() == 1
+
+    def test_fork_with_custom_title(self, project, auth):
+        assert project.fork_node(auth, title='My fork').title == 'My fork'
+
+    def test_fork_requires_permission(self, project):
+        with pytest.raises(PermissionsError):
+            project.fork_node(Auth(UserFactory()))
+
+    def test_cannot_fork_deleted_node(self, project, auth):
+        project.is_deleted = True
+        project.save()
+        with pytest.raises(NodeStateError):
+            project.fork_node(auth)
+
+    def test_query_count_does_not_grow_with_tree_size(self, user, auth):
+        small = make_tree(user, depth=1, width=2)
+        large = make_tree(user, depth=3, width=3)
+        assert count_fork_queries(small, auth) == count_fork_queries(large, auth)
+
+
+class TestNodeTreeTemplater:
+
+    def test_bulk_use_as_template(self, project, user, auth):
+        component = NodeFactory(creator=user, parent=project, title='Component')
+        changes_list = [{project._id: {'title': 'Copy {}'.format(i)}} for i in range(3)]
+
+        new_projects = project.bulk_use_as_template(auth, changes_list)
+
+        assert [each.title for each in new_projects] == ['Copy 0', 'Copy 1', 'Copy 2']
+        for new in new_projects:
+            assert new.template_node == project
+            assert new.root == new
+            assert new.logs.get().action == NodeLog.CREATED_FROM
+            assert new.has_addon('osfstorage')
+            assert [child.template_node for child in new.nodes] == [component]
+            assert new.nodes[0].has_permission(user, 'admin')
+
+    def test_node_links_are_not_templated(self, project, auth):
+        project.add_pointer(ProjectFactory(), auth=auth)
+        assert not project.use_as_template(auth).linked_nodes.exists()
+
+    def test_search_and_share_updates_are_batched(self, project, user, auth):
+        NodeFactory(creator=user, parent=project)
+        with mock.patch('website.project.tasks.on_nodes_created') as mock_on_nodes_created:
+            project.bulk_use_as_template(auth, [None, None])
+        assert mock_on_nodes_created.s.call_count == 1
+        assert len(mock_on_nodes_created.s.call_args[1]['node_ids']) == 4
+
+    def test_stats(self, project, user, auth):
+        NodeFactory(creator=user, parent=project)
+        templater = NodeTreeTemplater(project, auth, [None, None])
+        templater.run()
+        assert templater.stats['nodes'] == 4
+        assert templater.stats['queries'] > 0
+
+    def test_query_count_does_not_grow_with_copies_or_tree_size(self, user, auth):
+        small = make_tree(user, depth=1, width=2)
+        large = make_tree(user, depth=3, width=3)
+        assert count_template_queries(small, auth, 1) == count_template_queries(large, auth, 5)
+
+
+class TestForkNodeTask:
+
+    @mock.patch('website.project.tasks.mails.send_mail')
+    def test_fork_node_task(self, mock_send_mail, project, user):
+        fork_node_task(project._id, user._id)
+        fork = project.forks.get()
+        assert mock_send_mail.call_args[1]['guid'] == fork._id
+
+    @mock.patch('website.project.tasks.mails.send_mail')
+    def test_fork_node_task_failure(self, mock_send_mail, project):
+        other = UserFactory()
+        with pytest.raises(PermissionsError):
+            fork_node_task(project._id, other._id)
+        assert mock_send_mail.call_args[1]['guid'] == project._id
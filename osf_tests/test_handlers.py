@@ -1,8 +1,14 @@
+import mock
 import pytest
 from nose.tools import assert_raises
 
-from framework.celery_tasks import handlers
+from api.base.api_globals import api_globals
+from framework.celery_tasks import app, error_handler, handlers, run_batch
+from framework.celery_tasks.routers import match_by_module
+from framework.postcommit_tasks import handlers as postcommit_handlers
+from website import settings
 from website.project.tasks import on_node_updated
+from website.search.elastic_search import update_user_async
 
 
 class TestCeleryHandlers:
@@ -11,6 +17,12 @@ class TestCeleryHandlers:
     def queue(self):
         return handlers.queue()
 
+    @pytest.fixture()
+    def request_context(self):
+        handlers.celery_before_request()
+        with mock.patch.object(api_globals, 'request', mock.Mock()):
+            yield
+
     def test_get_task_from_queue_not_there(self):
         task = handlers.get_task_from_queue(
             'website.project.tasks.on_node_updated',
@@ -40,3 +52,94 @@ class TestCeleryHandlers:
                 'website.project.tasks.on_node_updated',
                 predicate=lambda task: task.kwargs['node_id'] == 'woop'
             )
+
+    def test_enqueue_task_dedups(self, request_context):
+        handlers.enqueue_task(on_node_updated.s(node_id='woop', user_id='heyyo', first_save=False, saved_fields={'title'}))
+        handlers.enqueue_task(on_node_updated.s(node_id='woop', user_id='heyyo', first_save=False, saved_fields={'title'}))
+        handlers.enqueue_task(on_node_updated.s(node_id='woop', user_id='heyyo', first_save=False, saved_fields={'contributors'}))
+
+        assert len(handlers.queue()) == 2
+        assert handlers.metrics()['queued'] == 2
+        assert handlers.metrics()['deduplicated'] == 1
+
+    def test_teardown_publishes_merged_tasks(self, request_context):
+        for node_id in ('abc12', 'def34', 'ghi56'):
+            handlers.enqueue_task(on_node_updated.s(node_id=node_id, user_id='heyyo', first_save=False, saved_fields=['title']))
+        handlers.enqueue_task(update_user_async.s('jkl78', index=None))
+
+        with mock.patch.object(settings, 'USE_CELERY', True), \
+                mock.patch.object(handlers, 'publish') as mock_publish:
+            handlers.celery_teardown_request()
+
+        batch, user_task = mock_publish.call_args[0][0]
+        assert batch.task == 'framework.celery_tasks.run_batch'
+        assert batch.args[0] == 'website.project.tasks.on_node_updated'
+        assert [kwargs['node_id'] for args, kwargs in batch.args[1]] == ['abc12', 'def34', 'ghi56']
+        assert batch.options['queue'] == match_by_module('website.project.tasks.on_node_updated')
+        assert user_task.task == 'website.search.elastic_search.update_user_async'
+        assert handlers.metrics() == {'queued': 4, 'deduplicated': 0, 'merged': 3, 'dispatched': 2}
+
+
+class TestMergeSignatures:
+
+    def test_merges_same_arguments(self):
+        signatures = [
+            on_node_updated.s(node_id='abc12', user_id='heyyo', first_save=False, saved_fields=['title']),
+            on_node_updated.s(node_id='def34', user_id='heyyo', first_save=True, saved_fields=['title']),
+            on_node_updated.s(node_id='ghi56', user_id='heyyo', first_save=False, saved_fields=['title'], request_headers={}),
+        ]
+        merged = handlers.merge_signatures(signatures)
+
+        assert len(merged) == 2
+        assert merged[0].args[1] == [[[], signatures[0].kwargs], [[], signatures[1].kwargs]]
+        assert merged[1] is signatures[2]
+
+    def test_leaves_other_tasks_alone(self):
+        signatures = [
+            on_node_updated.s(node_id='abc12', user_id='heyyo', first_save=False, saved_fields=['title']).set(countdown=5),
+            on_node_updated.s(node_id='def34', user_id='heyyo', first_save=False, saved_fields=['title']).set(countdown=5),
+            error_handler.s('task-id', 'task'),
+            error_handler.s('other-task-id', 'task'),
+        ]
+        assert handlers.merge_signatures(signatures) == signatures
+
+    def test_run_batch_republishes_failed_calls(self):
+        task = mock.Mock(side_effect=[None, Exception('Failed'), None])
+        with mock.patch.dict(app.tasks, {'fake.task': task}):
+            run_batch('fake.task', [[['a'], {}], [['b'], {}], [['c'], {}]])
+
+        assert task.call_args_list == [mock.call('a'), mock.call('b'), mock.call('c')]
+        task.apply_async.assert_called_once_with(['b'], {})
+
+
+class TestPostcommitHandlers:
+
+    @pytest.fixture(autouse=True)
+    def before_request(self):
+        postcommit_handlers.postcommit_before_request()
+
+    def test_once_per_request(self):
+        for _ in range(2):
+            postcommit_handlers.enqueue_postcommit_task(on_node_updated, ('abc12', ), {'first_save': False}, celery=True)
+            postcommit_handlers.enqueue_postcommit_task(on_node_updated, ('def34', ), {'first_save': False}, celery=True, once_per_request=False)
+
+        assert len(postcommit_handlers.postcommit_celery_queue()) == 3
+        assert postcommit_handlers.postcommit_metrics()['deduplicated'] == 1
+
+    def test_after_request(self):
+        func = mock.Mock(__name__='func', __module__='tests')
+        postcommit_handlers.enqueue_postcommit_task(func, (), {})
+        for node_id in ('abc12', 'def34'):
+            postcommit_handlers.enqueue_postcommit_task(on_node_updated, (node_id, ), {'first_save': False}, celery=True)
+
+        with mock.patch.object(settings, 'USE_CELERY', True), \
+                mock.patch.object(postcommit_handlers, 'publish') as mock_publish:
+            postcommit_handlers.postcommit_after_request(mock.Mock(status_code=200))
+
+        func.assert_called_once_with()
+        (batch, ), = mock_publish.call_args[0]
+        assert batch.args[1] == [[['abc12'], {'first_save': False}], [['def34'], {'first_save': False}]]
+        assert postcommit_handlers.postcommit_metrics() == {'queued': 3, 'deduplicated': 0, 'merged': 2, 'dispatched': 2}
+
+    def test_pool_is_shared(self):
+        assert postcommit_handlers.postcommit_pool() is postcommit_handlers.postcommit_pool()
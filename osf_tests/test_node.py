@@ -3439,7 +3439,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_updates_share(self, requests, node, user):
         on_node_updated(node._id, user._id, False, {'is_public'})
 
@@ -3452,7 +3452,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_update_share_correctly_for_projects(self, requests, node, user, request_context):
         cases = [{
             'is_deleted': False,
@@ -3481,7 +3481,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     @mock.patch('osf.models.registrations.Registration.archiving', mock.PropertyMock(return_value=False))
     def test_update_share_correctly_for_registrations(self, requests, registration, user, request_context):
         cases = [{
@@ -3513,7 +3513,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_update_share_correctly_for_projects_with_qa_tags(self, requests, node, user, request_context):
         node.add_tag(settings.DO_NOT_INDEX_LIST['tags'][0], auth=Auth(user))
         on_node_updated(node._id, user._id, False, {'is_public'})
@@ -3531,7 +3531,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     @mock.patch('osf.models.registrations.Registration.archiving', mock.PropertyMock(return_value=False))
     def test_update_share_correctly_for_registrations_with_qa_tags(self, requests, registration, user, request_context):
         registration.add_tag(settings.DO_NOT_INDEX_LIST['tags'][0], auth=Auth(user))
@@ -3550,7 +3550,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_update_share_correctly_for_projects_with_qa_titles(self, requests, node, user, request_context):
         node.title = settings.DO_NOT_INDEX_LIST['titles'][0].join(random.choice(string.ascii_lowercase) for i in range(5))
         node.save()
@@ -3571,7 +3571,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'https://share.osf.io')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'Token')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     @mock.patch('osf.models.registrations.Registration.archiving', mock.PropertyMock(return_value=False))
     def test_update_share_correctly_for_registrations_with_qa_titles(self, requests, registration, user, request_context):
         registration.title = settings.DO_NOT_INDEX_LIST['titles'][0].join(random.choice(string.ascii_lowercase) for i in range(5))
@@ -3593,7 +3593,7 @@ class TestOnNodeUpdate:
 
     @mock.patch('website.project.tasks.settings.SHARE_URL', None)
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', None)
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_skips_no_settings(self, requests, node, user, request_context):
         on_node_updated(node._id, user._id, False, {'is_public'})
         assert requests.post.called is False
@@ -3601,7 +3601,7 @@ class TestOnNodeUpdate:
     @mock.patch('website.project.tasks.settings.SHARE_URL', 'a_real_url')
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'a_real_token')
     @mock.patch('website.project.tasks._async_update_node_share.delay')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_call_async_update_on_500_failure(self, requests, mock_async, node, user, request_context):
         requests.post.return_value = MockShareResponse(501)
         on_node_updated(node._id, user._id, False, {'is_public'})
@@ -3611,7 +3611,7 @@ class TestOnNodeUpdate:
     @mock.patch('website.project.tasks.settings.SHARE_API_TOKEN', 'a_real_token')
     @mock.patch('website.project.tasks.send_desk_share_error')
     @mock.patch('website.project.tasks._async_update_node_share.delay')
-    @mock.patch('website.project.tasks.requests')
+    @mock.patch('website.project.tasks.outbound')
     def test_no_call_async_update_on_400_failure(self, requests, mock_async, mock_mail, node, user, request_context):
         requests.post.return_value = MockShareResponse(400)
         on_node_updated(node._id, user._id, False, {'is_public'})
@@ -0,0 +1,92 @@
+import pytest
+
+from django.core.management import call_command
+
+from osf.models import AbstractNode, NodeClosure, NodeRelation
+from osf_tests.factories import (
+    NodeFactory,
+    NodeRelationFactory,
+    ProjectFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def closure_rows():
+    return set(NodeClosure.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+
+class TestNodeClosure:
+
+    @pytest.fixture()
+    def root(self):
+        return ProjectFactory()
+
+    @pytest.fixture()
+    def child(self, root):
+        return NodeFactory(parent=root, creator=root.creator)
+
+    @pytest.fixture()
+    def grandchild(self, child):
+        return NodeFactory(parent=child, creator=child.creator)
+
+    @pytest.fixture()
+    def great_grandchild(self, grandchild):
+        return NodeFactory(parent=grandchild, creator=grandchild.creator)
+
+    def test_creating_component_adds_closure_rows(self, root, child, grandchild):
+        assert closure_rows() == {
+            (root.id, child.id, 1),
+            (root.id, grandchild.id, 2),
+            (child.id, grandchild.id, 1),
+        }
+
+    def test_node_links_are_not_in_closure(self, root, child):
+        linked = ProjectFactory()
+        NodeRelationFactory(parent=root, child=linked, is_node_link=True)
+        assert not NodeClosure.objects.filter(descendant=linked).exists()
+
+    def test_deleting_relation_detaches_subtree(self, root, child, grandchild, great_grandchild):
+        NodeRelation.objects.get(parent=child, child=grandchild).delete()
+        assert closure_rows() == {
+            (root.id, child.id, 1),
+            (grandchild.id, great_grandchild.id, 1),
+        }
+
+    def test_attaching_existing_subtree(self, root, child, grandchild):
+        other = ProjectFactory()
+        NodeRelationFactory(parent=grandchild, child=other)
+        assert AbstractNode.objects.get_root_id(other) == root.id
+        assert list(AbstractNode.objects.get_ancestors(other)) == [grandchild, child, root]
+
+    def test_get_descendants(self, root, child, grandchild, great_grandchild):
+        descendants = AbstractNode.objects.get_descendants(root)
+        assert {(node.id, node.depth) for node in descendants} == {
+            (child.id, 1),
+            (grandchild.id, 2),
+            (great_grandchild.id, 3),
+        }
+        assert set(AbstractNode.objects.get_descendants(root, max_depth=2)) == {child, grandchild}
+
+    def test_get_descendants_active(self, root, child, grandchild):
+        grandchild.is_deleted = True
+        grandchild.save()
+        assert list(AbstractNode.objects.get_descendants(root, active=True)) == [child]
+
+    def test_get_root(self, root, child, grandchild):
+        assert grandchild.get_root() == root
+        assert root.get_root() == root
+        assert AbstractNode.objects.get_root_id(root) == root.id
+
+    @pytest.mark.django_assert_num_queries
+    def test_parents_is_a_single_query(self, root, child, grandchild, great_grandchild, django_assert_num_queries):
+        great_grandchild = AbstractNode.objects.get(id=great_grandchild.id)
+        with django_assert_num_queries(1):
+            assert great_grandchild.parents == [grandchild, child, root]
+
+    def test_rebuild_matches_incremental(self, root, child, grandchild, great_grandchild):
+        NodeFactory(parent=root, creator=root.creator)
+        expected = closure_rows()
+        NodeClosure.objects.all().delete()
+        call_command('backfill_node_closure')
+        assert closure_rows() == expected
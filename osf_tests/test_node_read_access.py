@@ -0,0 +1,124 @@
+import threading
+import time
+
+import mock
+import pytest
+
+from django.core.management import call_command
+from django.db import connection, transaction
+
+from framework.auth import Auth
+from osf.models import AbstractNode, NodeReadAccess, NodeRelation
+from osf_tests.factories import (
+    AuthUserFactory,
+    NodeFactory,
+    PrivateLinkFactory,
+    ProjectFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+def access_for(user):
+    return set(NodeReadAccess.objects.filter(user=user).values_list('node_id', 'is_contributor'))
+
+
+class TestNodeReadAccess:
+
+    @pytest.fixture()
+    def admin(self):
+        return AuthUserFactory()
+
+    @pytest.fixture()
+    def reader(self):
+        return AuthUserFactory()
+
+    @pytest.fixture()
+    def project(self, admin):
+        return ProjectFactory(creator=admin)
+
+    @pytest.fixture()
+    def component(self, project, admin):
+        return NodeFactory(parent=project, creator=admin)
+
+    @pytest.fixture()
+    def subcomponent(self, component, reader):
+        return NodeFactory(parent=component, creator=reader)
+
+    def test_admin_gets_implicit_read_on_descendants(self, admin, reader, project, component, subcomponent):
+        assert access_for(admin) == {
+            (project.id, True),
+            (component.id, True),
+            (subcomponent.id, False),
+        }
+        assert access_for(reader) == {(subcomponent.id, True)}
+
+    def test_adding_and_removing_contributor(self, admin, reader, project, component):
+        project.add_contributor(reader, permissions=['read'], auth=Auth(admin), save=True)
+        assert access_for(reader) == {(project.id, True)}
+
+        project.remove_contributor(reader, auth=Auth(admin))
+        assert access_for(reader) == set()
+
+    def test_promoting_to_admin_grants_descendants(self, admin, reader, project, component):
+        project.add_contributor(reader, permissions=['read'], auth=Auth(admin), save=True)
+        project.set_permissions(reader, ['read', 'write', 'admin'], save=True)
+        assert access_for(reader) == {(project.id, True), (component.id, False)}
+
+    def test_detaching_component_revokes_implicit_read(self, admin, reader, component, subcomponent):
+        NodeRelation.objects.get(parent=component, child=subcomponent).delete()
+        assert not NodeReadAccess.objects.filter(user=admin, node=subcomponent).exists()
+
+    def test_private_link_rows(self, project, component):
+        link = PrivateLinkFactory()
+        link.nodes.add(project, component)
+        assert set(NodeReadAccess.objects.filter(private_link_key=link.key).values_list('node_id', flat=True)) == {project.id, component.id}
+
+        link.nodes.remove(component)
+        assert set(NodeReadAccess.objects.filter(private_link_key=link.key).values_list('node_id', flat=True)) == {project.id}
+
+        link.is_deleted = True
+        link.save()
+        assert not NodeReadAccess.objects.filter(private_link_key=link.key).exists()
+
+    @pytest.mark.parametrize('use_index', [True, False])
+    def test_can_view_matches_with_and_without_index(self, use_index, admin, reader, project, component, subcomponent):
+        link = PrivateLinkFactory()
+        link.nodes.add(component)
+        with mock.patch('osf.models.node.settings.ENABLE_NODE_READ_ACCESS_INDEX', use_index):
+            assert set(AbstractNode.objects.can_view(user=admin)) == {project, component, subcomponent}
+            assert set(AbstractNode.objects.can_view(user=reader)) == {subcomponent}
+            assert set(AbstractNode.objects.can_view(private_link=link)) == {component}
+
+    def test_check_command_repairs_table(self, admin, project, component):
+        NodeReadAccess.objects.filter(user=admin).delete()
+        call_command('check_node_read_access', fix=True)
+        assert access_for(admin) == {(project.id, True), (component.id, True)}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_overlapping_refreshes():
+    admin = AuthUserFactory()
+    project = ProjectFactory(creator=admin)
+    NodeReadAccess.objects.filter(node=project).delete()
+    errors = []
+
+    def refresh():
+        try:
+            with transaction.atomic():
+                NodeReadAccess.objects.refresh(node_ids=[project.id])
+        except Exception as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+    with transaction.atomic():
+        NodeReadAccess.objects.refresh(node_ids=[project.id])
+        # The other refresh deletes nothing it can see, then waits to insert the same row
+        thread = threading.Thread(target=refresh)
+        thread.start()
+        time.sleep(0.5)
+    thread.join()
+
+    assert errors == []
+    assert access_for(admin) == {(project.id, True)}
@@ -0,0 +1,93 @@
+import pytest
+
+from framework.auth import Auth
+from osf.utils import permission_resolver
+from osf_tests.factories import (
+    AuthUserFactory,
+    NodeFactory,
+    ProjectFactory,
+)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def resolver():
+    permission_resolver.permission_resolver_before_request()
+    yield permission_resolver.get_permission_resolver()
+    permission_resolver.permission_resolver_teardown_request()
+
+
+class TestPermissionResolver:
+
+    @pytest.fixture()
+    def admin(self):
+        return AuthUserFactory()
+
+    @pytest.fixture()
+    def user(self):
+        return AuthUserFactory()
+
+    @pytest.fixture()
+    def project(self, admin):
+        return ProjectFactory(creator=admin)
+
+    @pytest.fixture()
+    def component(self, project, admin):
+        return NodeFactory(parent=project, creator=admin)
+
+    @pytest.fixture()
+    def subcomponent(self, component, admin):
+        return NodeFactory(parent=component, creator=admin)
+
+    def test_no_resolver_outside_request(self):
+        assert permission_resolver.get_permission_resolver() is None
+
+    def test_matches_uncached_checks(self, resolver, admin, user, project, component, subcomponent):
+        subcomponent.add_contributor(user, permissions=['read', 'write'], auth=Auth(admin), save=True)
+        cases = [
+            (node, each_user, permission, check_parent)
+            for node in (project, component, subcomponent)
+            for each_user in (admin, user)
+            for permission in ('read', 'write', 'admin')
+            for check_parent in (True, False)
+        ]
+        cached = [node.has_permission(u, perm, check_parent=cp) for node, u, perm, cp in cases]
+        cached += [node.is_admin_parent(u) for node in (project, component, subcomponent) for u in (admin, user)]
+        cached += [project.has_permission_on_children(u, perm) for u in (admin, user) for perm in ('read', 'write', 'admin')]
+
+        permission_resolver.permission_resolver_teardown_request()
+        uncached = [node.has_permission(u, perm, check_parent=cp) for node, u, perm, cp in cases]
+        uncached += [node.is_admin_parent(u) for node in (project, component, subcomponent) for u in (admin, user)]
+        uncached += [project.has_permission_on_children(u, perm) for u in (admin, user) for perm in ('read', 'write', 'admin')]
+        assert cached == uncached
+
+    @pytest.mark.django_assert_num_queries
+    def test_checks_across_tree_use_fixed_queries(self, resolver, admin, user, project, component, subcomponent, django_assert_num_queries):
+        # Tree: closure pairs + deleted nodes; user: contributorships
+        with django_assert_num_queries(3):
+            for node in (project, component, subcomponent):
+                node.has_permission(user, 'read')
+                node.has_permission(user, 'write')
+                node.is_admin_parent(user)
+            project.has_permission_on_children(user, 'write')
+
+    def test_add_permission_invalidates(self, resolver, admin, user, project, component):
+        project.add_contributor(user, permissions=['read'], auth=Auth(admin), save=True)
+        assert not project.has_permission(user, 'write')
+        assert not component.has_permission(user, 'read')
+
+        project.add_permission(user, 'admin', save=True)
+        assert project.has_permission(user, 'write')
+        assert component.has_permission(user, 'read')
+
+        project.set_permissions(user, ['read'], save=True)
+        assert not component.has_permission(user, 'read')
+
+    def test_deleted_children_are_skipped(self, resolver, admin, user, project, component, subcomponent):
+        subcomponent.add_contributor(user, permissions=['read', 'write'], auth=Auth(admin), save=True)
+        assert project.has_permission_on_children(user, 'write')
+
+        component.is_deleted = True
+        component.save()
+        assert not project.has_permission_on_children(user, 'write')
@@ -0,0 +1,147 @@
+import mock
+import pytest
+
+from addons.osfstorage.models import OsfStorageFile
+from framework.auth import Auth
+from osf.models import SearchIndexQueueEntry
+from osf_tests.factories import AuthUserFactory, ProjectFactory
+from website import settings
+from website.search import elastic_search, exceptions, search
+
+pytestmark = pytest.mark.django_db
+
+
+def queued():
+    return set(SearchIndexQueueEntry.objects.values_list('category', 'doc_id'))
+
+
+@pytest.fixture()
+def user():
+    return AuthUserFactory()
+
+@pytest.fixture()
+def project(user):
+    return ProjectFactory(creator=user, is_public=True)
+
+@pytest.fixture()
+def file_(project):
+    root = project.get_addon('osfstorage').get_root()
+    file_ = root.append_file('data.csv')
+    SearchIndexQueueEntry.objects.all().delete()
+    return file_
+
+@pytest.fixture()
+def mock_bulk():
+    with mock.patch.object(elastic_search, 'client'), \
+            mock.patch.object(elastic_search.helpers, 'bulk', return_value=(0, [])) as mock_bulk:
+        yield mock_bulk
+
+@pytest.fixture()
+def index_queue():
+    with mock.patch.object(settings, 'ENABLE_SEARCH_INDEX_QUEUE', True), \
+            mock.patch.object(search, 'search_engine', elastic_search):
+        yield
+
+
+class TestSearchIndexQueueEntryManager:
+
+    def test_enqueue_coalesces(self):
+        SearchIndexQueueEntry.objects.enqueue('node', ['abc12', 'def34'])
+        first = SearchIndexQueueEntry.objects.get(doc_id='abc12')
+        SearchIndexQueueEntry.objects.enqueue('node', ['abc12'])
+
+        entry = SearchIndexQueueEntry.objects.get(doc_id='abc12')
+        assert SearchIndexQueueEntry.objects.count() == 2
+        assert entry.created == first.created
+        assert entry.modified > first.modified
+
+    def test_enqueue_node_files(self, project, file_):
+        SearchIndexQueueEntry.objects.enqueue_node_files([project.id])
+        assert queued() == {('file', file_._id)}
+
+    def test_metrics(self):
+        assert SearchIndexQueueEntry.objects.metrics() == {'depth': 0, 'depth_by_category': {}, 'lag': 0}
+        SearchIndexQueueEntry.objects.enqueue('node', ['abc12', 'def34'])
+        SearchIndexQueueEntry.objects.enqueue('user', ['ghi56'])
+
+        metrics = SearchIndexQueueEntry.objects.metrics()
+        assert metrics['depth'] == 3
+        assert metrics['depth_by_category'] == {'node': 2, 'user': 1}
+        assert metrics['lag'] >= 0
+
+
+class TestEnqueueSearchUpdates:
+
+    def test_update_node_enqueues_files_only_for_file_fields(self, index_queue, project, file_):
+        search.update_node(project, saved_fields=['description'])
+        assert queued() == {('node', project._id)}
+
+        search.update_node(project, saved_fields=['title'])
+        assert queued() == {('node', project._id), ('file', file_._id)}
+
+    @pytest.mark.parametrize('field', ['tags', 'archiving', 'parent_node', 'retraction'])
+    def test_update_node_enqueues_files_for_visibility_fields(self, index_queue, project, file_, field):
+        search.update_node(project, saved_fields=[field])
+        assert ('file', file_._id) in queued()
+
+    def test_update_user_and_file(self, index_queue, user, file_):
+        search.update_user(user)
+        search.update_file(file_)
+        assert queued() == {('user', user._id), ('file', file_._id)}
+
+    def test_explicit_index_is_not_queued(self, project, index_queue):
+        with mock.patch.object(elastic_search, 'update_node_async') as mock_update_node_async:
+            search.update_node(project, index='other')
+        assert mock_update_node_async.called
+        assert not queued()
+
+
+class TestProcessIndexQueue:
+
+    def test_indexes_and_dequeues(self, mock_bulk, project, user, file_):
+        private = ProjectFactory(creator=user, is_public=False)
+        SearchIndexQueueEntry.objects.enqueue('node', [project._id, private._id])
+        SearchIndexQueueEntry.objects.enqueue('file', [file_._id, 'gone'])
+        SearchIndexQueueEntry.objects.enqueue('user', [user._id])
+
+        assert elastic_search.process_index_queue() == 5
+
+        assert mock_bulk.call_count == 1
+        actions = {(action['_op_type'], action['_id']) for action in mock_bulk.call_args[0][1]}
+        assert actions == {
+            ('index', project._id),
+            ('delete', private._id),
+            ('index', file_._id),
+            ('delete', 'gone'),
+            ('index', user._id),
+        }
+        assert 'refresh' not in mock_bulk.call_args[1]
+        assert not SearchIndexQueueEntry.objects.exists()
+
+    def test_batches(self, mock_bulk, user):
+        SearchIndexQueueEntry.objects.enqueue('user', [user._id, 'abc12', 'def34'])
+        elastic_search.process_index_queue(batch_size=2)
+        assert mock_bulk.call_count == 2
+
+    def test_failed_batch_stays_queued(self, mock_bulk, user):
+        mock_bulk.return_value = (0, [{'index': {'status': 500}}])
+        SearchIndexQueueEntry.objects.enqueue('user', [user._id])
+        with pytest.raises(exceptions.BulkUpdateError):
+            elastic_search.process_index_queue()
+        assert queued() == {('user', user._id)}
+
+    def test_qa_tag_deletes_file_docs(self, index_queue, mock_bulk, project, user, file_):
+        project.add_tag(settings.DO_NOT_INDEX_LIST['tags'][0], auth=Auth(user))
+        assert ('file', file_._id) in queued()
+
+        elastic_search.process_index_queue()
+        actions = {(action['_op_type'], action['_id']) for action in mock_bulk.call_args[0][1]}
+        assert ('delete', project._id) in actions
+        assert ('delete', file_._id) in actions
+
+    def test_trashed_file_is_deleted(self, mock_bulk, file_):
+        file_.delete()
+        assert not OsfStorageFile.objects.filter(_id=file_._id).exists()
+        SearchIndexQueueEntry.objects.enqueue('file', [file_._id])
+        elastic_search.process_index_queue()
+        assert mock_bulk.call_args[0][1] == [{'_op_type': 'delete', '_index': elastic_search.INDEX, '_type': 'file', '_id': file_._id}]
@@ -0,0 +1,74 @@
+import mock
+import pytest
+
+from osf.models import OSFUser
+from osf_tests.factories import UserFactory
+from website.search_migration.migrate import ReindexCheckpoint, migrate_ranges
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture()
+def checkpoint_path(tmpdir):
+    return str(tmpdir.join('checkpoint.json'))
+
+@pytest.fixture()
+def max_id():
+    return max(UserFactory().id for _ in range(3))
+
+@pytest.fixture()
+def migrate_range():
+    return mock.Mock(return_value=2)
+
+
+class TestReindexCheckpoint:
+
+    def test_saves_progress(self, checkpoint_path):
+        checkpoint = ReindexCheckpoint(checkpoint_path)
+        checkpoint.index = 'website_v2'
+        checkpoint.mark_done('node', 0, 1000)
+
+        resumed = ReindexCheckpoint(checkpoint_path)
+        assert resumed.index == 'website_v2'
+        assert resumed.is_done('node', 0, 1000)
+        assert not resumed.is_done('node', 1000, 2000)
+        assert not resumed.is_done('user', 0, 1000)
+
+        resumed.clear()
+        assert ReindexCheckpoint(checkpoint_path).index is None
+
+    def test_without_path(self):
+        checkpoint = ReindexCheckpoint()
+        checkpoint.mark_done('node', 0, 1000)
+        assert checkpoint.is_done('node', 0, 1000)
+
+
+class TestMigrateRanges:
+
+    def test_covers_all_ids(self, max_id, migrate_range):
+        total = migrate_ranges('test', False, 'user', OSFUser, migrate_range, 1)
+
+        ranges = sorted(call[0][2:] for call in migrate_range.call_args_list)
+        # One extra range for users created during the migration
+        assert ranges == [(start, start + 1) for start in range(0, max_id + 1)]
+        assert total == 2 * len(ranges)
+
+    def test_resumes_from_checkpoint(self, max_id, migrate_range, checkpoint_path):
+        checkpoint = ReindexCheckpoint(checkpoint_path)
+        checkpoint.mark_done('user', 0, 1)
+        migrate_range.side_effect = [2, Exception('Lost connection')]
+
+        with pytest.raises(Exception):
+            migrate_ranges('test', False, 'user', OSFUser, migrate_range, 1, checkpoint=checkpoint)
+        assert migrate_range.call_args_list[0][0][2:] == (1, 2)
+
+        migrate_range.side_effect = None
+        migrate_range.reset_mock()
+        migrate_ranges('test', False, 'user', OSFUser, migrate_range, 1, checkpoint=ReindexCheckpoint(checkpoint_path))
+        assert migrate_range.call_args_list[0][0][2:] == (2, 3)
+
+    def test_workers(self, max_id, migrate_range):
+        total = migrate_ranges('test', True, 'user', OSFUser, migrate_range, 1, workers=3)
+        assert migrate_range.call_count == max_id + 1
+        assert total == 2 * (max_id + 1)
+        assert all(call[0][:2] == ('test', True) for call in migrate_range.call_args_list)
@@ -0,0 +1,115 @@
+import mock
+import pytest
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from osf_tests.factories import NodeFactory, ProjectFactory
+from website import settings
+from website.search import elastic_search, exceptions
+
+pytestmark = pytest.mark.django_db
+
+
+def aggregation_response(name, buckets, total=0):
+    return {'hits': {'total': total, 'hits': []}, 'aggregations': {name: {'buckets': buckets}}}
+
+def msearch_response(hits):
+    return {'responses': [
+        aggregation_response('tag_cloud', [{'key': 'tag', 'doc_count': 1}]),
+        aggregation_response('licenses', [], total=len(hits)),
+        aggregation_response('counts', [{'key': 'project', 'doc_count': len(hits)}]),
+        {'hits': {'total': len(hits), 'hits': [{'_source': source} for source in hits]}},
+    ]}
+
+def node_hit(node):
+    parent = node.parent_node
+    return {
+        'id': node._id,
+        'category': 'component' if parent else 'project',
+        'parent_id': parent._id if parent else None,
+        'url': node.url,
+        'title': node.title,
+        'description': '',
+        'contributors': [],
+        'tags': [],
+        'is_registration': False,
+        'is_retracted': False,
+        'is_pending_retraction': False,
+        'embargo_end_date': False,
+        'is_pending_embargo': False,
+        'wikis': {},
+    }
+
+QUERY = {
+    'query': {'filtered': {'query': {'match_all': {}}, 'filter': {'term': {'_type': 'project'}}}},
+    'from': 0,
+    'size': 10,
+}
+
+
+@pytest.fixture()
+def mock_client():
+    with mock.patch.object(elastic_search, 'client') as mock_client:
+        yield mock_client.return_value
+
+@pytest.fixture()
+def project():
+    return ProjectFactory(is_public=True)
+
+
+class TestSearch:
+
+    def test_single_msearch(self, mock_client):
+        mock_client.msearch.return_value = msearch_response([])
+
+        ret = elastic_search.search(QUERY, index='test', doc_type='project')
+
+        assert mock_client.msearch.call_count == 1
+        assert not mock_client.search.called
+        body = mock_client.msearch.call_args[1]['body']
+        headers, queries = body[::2], body[1::2]
+        assert headers == [{'index': 'test'}, {'index': 'test', 'type': 'project'}, {'index': 'test'}, {'index': 'test', 'type': 'project'}]
+        # Aggregations and counts ignore the filter, the tag cloud keeps it, and only the hits are paginated
+        assert 'filter' in queries[0]['query']['filtered']
+        assert 'filter' not in queries[1]['query']['filtered']
+        assert 'filter' not in queries[2]['query']['filtered']
+        assert queries[3] == QUERY
+        assert 'filter' in QUERY['query']['filtered']
+        assert ret['tags'] == [{'key': 'tag', 'doc_count': 1}]
+        assert ret['counts'] == {'project': 0, 'total': 0}
+        assert ret['aggs'] == {'licenses': {}, 'total': 0}
+
+    def test_parents_are_loaded_at_once(self, mock_client, project):
+        components = [NodeFactory(parent=project, is_public=True) for _ in range(3)]
+        mock_client.msearch.return_value = msearch_response([node_hit(project)] + [node_hit(component) for component in components])
+
+        with CaptureQueriesContext(connection) as queries:
+            results = elastic_search.search(QUERY)['results']
+
+        assert len(queries) == 1
+        assert [result['parent_title'] for result in results] == [None] + [project.title] * 3
+        assert [result['is_component'] for result in results] == [False, True, True, True]
+
+    def test_private_parent_is_hidden(self, mock_client):
+        component = NodeFactory(parent=ProjectFactory(is_public=False), is_public=True)
+        mock_client.msearch.return_value = msearch_response([node_hit(component)])
+        result, = elastic_search.search(QUERY)['results']
+        assert result['parent_url'] is None
+
+    def test_failed_search_raises(self, mock_client):
+        response = msearch_response([])
+        response['responses'][3] = {'error': {'type': 'search_phase_execution_exception'}, 'status': 400}
+        mock_client.msearch.return_value = response
+        with pytest.raises(exceptions.MalformedQueryError):
+            elastic_search.search(QUERY)
+
+    def test_results_are_cached(self, mock_client):
+        mock_client.msearch.return_value = msearch_response([])
+        cache.clear()
+        with mock.patch.object(settings, 'SEARCH_RESULTS_CACHE_TIMEOUT', 30):
+            first = elastic_search.search(QUERY)
+            second = elastic_search.search(dict(QUERY))
+            elastic_search.search(dict(QUERY, size=20))
+        assert first == second
+        assert mock_client.msearch.call_count == 2
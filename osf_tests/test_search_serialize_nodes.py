@@ -0,0 +1,94 @@
+import mock
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from addons.wiki.tests.factories import WikiFactory, WikiVersionFactory
+from framework.auth import Auth
+from osf_tests.factories import (
+    AuthUserFactory,
+    InstitutionFactory,
+    NodeFactory,
+    NodeLicenseRecordFactory,
+    ProjectFactory,
+    RegistrationFactory,
+)
+from website.search import elastic_search
+
+pytestmark = pytest.mark.django_db
+
+
+def make_project(user):
+    project = ProjectFactory(creator=user, is_public=True, node_license=NodeLicenseRecordFactory())
+    project.add_contributor(AuthUserFactory(), auth=Auth(user), save=True)
+    project.add_tag('searchable', auth=Auth(user))
+    project.affiliated_institutions.add(InstitutionFactory())
+    WikiVersionFactory(wiki_page=WikiFactory(node=project, user=user), user=user, content='Some *wiki*')
+    NodeFactory(creator=user, parent=project, is_public=True)
+    return project
+
+def count_queries(nodes):
+    with CaptureQueriesContext(connection) as queries:
+        elastic_search.serialize_nodes(nodes)
+    return len(queries)
+
+
+@pytest.fixture()
+def user():
+    return AuthUserFactory()
+
+@pytest.fixture()
+def project(user):
+    return make_project(user)
+
+
+class TestSerializeNodes:
+
+    def test_matches_serialize_node(self, project):
+        component = project.nodes[0]
+        registration = RegistrationFactory(project=project, is_public=True)
+        nodes = [project, component, registration, registration.nodes[0]]
+
+        serialized = elastic_search.serialize_nodes(nodes)
+
+        assert [node for node, _, _ in serialized] == sorted(nodes, key=lambda node: node.id)
+        for node, doc_type, doc in serialized:
+            assert doc_type == elastic_search.get_doctype_from_node(node)
+            assert doc == elastic_search.serialize_node(node, doc_type)
+
+    def test_inherited_license(self, project):
+        component = project.nodes[0]
+        _, _, doc = elastic_search.serialize_nodes([component])[0]
+        assert doc['license']['copyright_holders'] == project.node_license.copyright_holders
+        assert doc['parent_id'] == project._id
+
+    def test_nodes_to_remove(self, user, project):
+        private = ProjectFactory(creator=user, is_public=False)
+        component = NodeFactory(creator=user, parent=private)
+        serialized = elastic_search.serialize_nodes([private, component])
+        assert serialized == [(private, 'project', None), (component, 'component', None)]
+
+    def test_query_count_does_not_grow_with_batch_size(self, user, project):
+        registration = RegistrationFactory(project=project, is_public=True)
+        others = [make_project(user) for _ in range(4)]
+        small = [project, project.nodes[0], registration]
+        large = small + others + [other.nodes[0] for other in others]
+        assert count_queries(small) == count_queries(large)
+
+
+class TestBulkUpdateNodes:
+
+    def test_updates_and_deletes(self, user, project):
+        private = ProjectFactory(creator=user, is_public=False)
+        with mock.patch.object(elastic_search, 'client'), \
+                mock.patch.object(elastic_search.helpers, 'bulk', return_value=(2, [])) as mock_bulk:
+            elastic_search.bulk_update_nodes(elastic_search.serialize_nodes, [project, private])
+
+        actions = {(action['_op_type'], action['_id']) for action in mock_bulk.call_args[0][1]}
+        assert actions == {('update', project._id), ('delete', private._id)}
+
+    def test_serialize_contributors(self, project):
+        (node, doc_type, doc), = elastic_search.serialize_contributors([project])
+        assert doc_type == 'project'
+        assert [contributor['fullname'] for contributor in doc['contributors']] == \
+            [user.fullname for user in project.visible_contributors]
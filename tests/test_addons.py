@@ -235,6 +235,14 @@ class TestAddonLogs(OsfTestCase):
         # assert_true(mock_form_message.called, "form_message not called")
         assert_true(mock_perform.called, 'perform not called')
 
+    @mock.patch('addons.base.views.forget_waterbutler_metadata')
+    @mock.patch('website.notifications.events.files.FileAdded.perform')
+    def test_add_log_forgets_waterbutler_metadata(self, mock_perform, mock_forget):
+        url = self.node.api_url_for('create_waterbutler_log')
+        payload = self.build_payload(metadata={'path': 'pizza'})
+        self.app.put_json(url, payload, headers={'Content-Type': 'application/json'})
+        mock_forget.assert_called_once_with(self.node)
+
     def test_waterbutler_hook_succeeds_for_quickfiles_nodes(self):
         quickfiles = QuickFilesNode.objects.get_for_user(self.user)
         materialized_path = 'pizza'
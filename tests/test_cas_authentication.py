@@ -1,11 +1,15 @@
 # -*- coding: utf-8 -*-
 import furl
+import json
 import responses
 import mock
 from nose.tools import *  # flake8: noqa (PEP8 asserts)
 import unittest
 
+from django.core.cache import cache
+
 from framework.auth import cas
+from website import settings
 
 from tests.base import OsfTestCase, fake
 from osf_tests.factories import UserFactory
@@ -210,6 +214,105 @@ class TestCASClient(OsfTestCase):
     def test_profile_valid_access_token_returns_cas_response(self):
         assert 0
 
+    def add_profile_response(self, status=200):
+        url = furl.furl(self.base_url)
+        url.path.segments.extend(('oauth2', 'profile',))
+        responses.add(
+            responses.Response(
+                responses.GET,
+                url.url,
+                body=json.dumps({'id': 'abc12', 'scope': ['osf.full_read']}),
+                status=status,
+            )
+        )
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    def test_profile_is_cached(self):
+        cache.clear()
+        self.add_profile_response()
+        before = cas.profile_cache_metrics()
+        for _ in range(3):
+            resp = self.client.profile('valid-access-token')
+            assert_equal(resp.user, 'abc12')
+            assert_equal(resp.attributes['accessTokenScope'], {'osf.full_read'})
+            assert_equal(resp.attributes['accessToken'], 'valid-access-token')
+        assert_equal(len(responses.calls), 1)
+        after = cas.profile_cache_metrics()
+        assert_equal(after['hits'] - before['hits'], 2)
+        assert_equal(after['misses'] - before['misses'], 1)
+        assert_not_in('valid-access-token', repr(cache.get(cas.get_profile_cache_key('valid-access-token'))))
+
+        self.client.profile('other-access-token')
+        assert_equal(len(responses.calls), 2)
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    def test_profile_rejection_is_cached(self):
+        cache.clear()
+        self.add_profile_response(status=401)
+        for _ in range(2):
+            with assert_raises(cas.CasHTTPError) as ctx:
+                self.client.profile('invalid-access-token')
+            assert_equal(ctx.exception.code, 401)
+        assert_equal(len(responses.calls), 1)
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    def test_profile_server_error_is_not_cached(self):
+        cache.clear()
+        self.add_profile_response(status=500)
+        for _ in range(2):
+            with assert_raises(cas.CasHTTPError):
+                self.client.profile('access-token')
+        assert_equal(len(responses.calls), 2)
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    def test_revoking_tokens_forgets_profiles(self):
+        cache.clear()
+        self.add_profile_response()
+        responses.add(responses.Response(responses.POST, self.client.get_auth_token_revocation_url(), status=204))
+        self.client.profile('access-token')
+        self.client.profile('other-access-token')
+
+        self.client.revoke_tokens({'token': 'access-token'})
+        self.client.profile('access-token')
+        self.client.profile('other-access-token')
+        assert_equal(len([call for call in responses.calls if call.request.method == 'GET']), 3)
+
+        self.client.revoke_application_tokens('fake_id', 'fake_secret')
+        self.client.profile('other-access-token')
+        assert_equal(len([call for call in responses.calls if call.request.method == 'GET']), 4)
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    def test_revoking_tokens_forgets_profiles_cached_meanwhile(self):
+        cache.clear()
+        self.add_profile_response()
+
+        def revoke(request):
+            # Another request looks the token up while CAS revokes it
+            self.client.profile('access-token')
+            return (204, {}, '')
+        responses.add_callback(responses.POST, self.client.get_auth_token_revocation_url(), callback=revoke)
+
+        self.client.revoke_tokens({'token': 'access-token'})
+        self.client.profile('access-token')
+        assert_equal(len([call for call in responses.calls if call.request.method == 'GET']), 2)
+
+    @responses.activate
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_TIMEOUT', 60)
+    @mock.patch.object(settings, 'CAS_PROFILE_CACHE_METRICS_INTERVAL', 1)
+    @mock.patch('framework.auth.cas.logger')
+    def test_profile_cache_metrics_are_logged(self, mock_logger):
+        cache.clear()
+        self.add_profile_response()
+        self.client.profile('access-token')
+        self.client.profile('access-token')
+        assert_equal(mock_logger.info.call_count, 2)
+        assert_in('hit_rate', mock_logger.info.call_args[0][0])
+
     @unittest.skip('finish me')
     def test_get_login_url(self):
         assert 0
@@ -1,7 +1,11 @@
 import os
 import json
 
-from api.citations.utils import render_citation
+import mock
+from django.utils import timezone
+
+from api.citations import utils as citation_utils
+from api.citations.utils import render_citation, render_citations
 from osf_tests.factories import UserFactory
 from tests.base import OsfTestCase
 from osf.models import OSFUser
@@ -55,3 +59,42 @@ class TestCiteprocpy(OsfTestCase):
                 citation.append(citeprocpy)
                 print k
         assert(len(not_matches) == 0)
+
+    def test_styles_are_parsed_once(self):
+        with mock.patch('api.citations.utils.CitationStylesStyle', wraps=citation_utils.CitationStylesStyle) as parse:
+            citation_utils._styles.pop('apa', None)
+            style = citation_utils.get_style('apa')
+            assert citation_utils.get_style('apa') is style
+            assert parse.call_count == 1
+
+    @mock.patch('api.citations.utils.settings.CITATION_STYLES_CACHE_SIZE', 1)
+    def test_least_recently_used_style_is_dropped(self):
+        citation_utils.get_style('apa')
+        citation_utils.get_style('modern-language-association')
+        assert list(citation_utils._styles) == ['modern-language-association']
+
+    @mock.patch('api.citations.utils.settings.CITATION_CACHE_TIMEOUT', 30)
+    def test_citations_are_cached_until_node_changes(self):
+        node = Node()
+        node.visible_contributors = OSFUser.objects.filter(fullname='Henrique Harman')
+        node.modified = timezone.now()
+        citation = render_citation(node, 'apa')
+        with mock.patch('api.citations.utils._bibliography') as bibliography:
+            assert render_citation(node, 'apa') == citation
+            assert not bibliography.called
+        node.modified = timezone.now()
+        with mock.patch('api.citations.utils._bibliography', return_value=['']) as bibliography:
+            render_citation(node, 'apa')
+            assert bibliography.called
+
+    def test_render_citations(self):
+        first = Node()
+        second = Node()
+        second._id = 'x7m3q'
+        second.csl = dict(Node.csl, id='x7m3q', title='The study of vanilla')
+        for node in (first, second):
+            node.visible_contributors = OSFUser.objects.filter(fullname='Henrique Harman')
+
+        for style in ('apa', 'modern-language-association', 'chicago-author-date', 'elsevier-harvard'):
+            expected = [render_citation(second, style), render_citation(first, style)]
+            assert render_citations([second, first, second], style) == expected + expected[:1]
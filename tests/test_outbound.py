@@ -0,0 +1,123 @@
+import mock
+import pytest
+import requests
+import responses
+
+from api.caching.tasks import send_ban
+from framework import outbound
+from website import settings
+
+HOST = 'service.test'
+URL = 'http://service.test/resource'
+
+
+@pytest.fixture(autouse=True)
+def service():
+    config = {'retries': 0, 'failure_threshold': 3, 'reset_timeout': 30}
+    with mock.patch.dict(settings.OUTBOUND_HTTP, {'test': config}), \
+            mock.patch.object(settings, 'OUTBOUND_HTTP_CIRCUIT_BREAKERS', True), \
+            mock.patch.dict(outbound._sessions), \
+            mock.patch.dict(outbound._breakers), \
+            mock.patch.dict(outbound._metrics):
+        yield 'test'
+
+
+class TestOutbound:
+
+    def test_reuses_session(self, service):
+        assert outbound.get_session(service) is outbound.get_session(service)
+        assert outbound.get_session(service) is not outbound.get_session('other')
+
+    @responses.activate
+    def test_default_timeout(self, service):
+        responses.add(responses.GET, URL, status=200)
+        with mock.patch.object(requests.Session, 'request', wraps=outbound.get_session(service).request) as request:
+            outbound.get(service, URL)
+            assert request.call_args[1]['timeout'] == settings.OUTBOUND_HTTP_DEFAULTS['timeout']
+            outbound.get(service, URL, timeout=1)
+            assert request.call_args[1]['timeout'] == 1
+
+    @responses.activate
+    def test_metrics(self, service):
+        responses.add(responses.GET, URL, status=200)
+        responses.add(responses.POST, URL, status=404)
+        responses.add(responses.PUT, URL, body=requests.Timeout())
+
+        outbound.get(service, URL)
+        outbound.post(service, URL)
+        with pytest.raises(requests.Timeout):
+            outbound.request(service, 'PUT', URL)
+
+        service_metrics = outbound.metrics()[service][HOST]
+        assert service_metrics['requests'] == 3
+        assert sum(service_metrics['latency']) == 3
+        assert service_metrics['errors']['client_error'] == 1
+        assert service_metrics['errors']['timeout'] == 1
+        assert service_metrics['errors']['server_error'] == 0
+
+    @responses.activate
+    def test_circuit_opens_after_failures(self, service):
+        responses.add(responses.GET, URL, status=503)
+        for _ in range(3):
+            assert outbound.get(service, URL).status_code == 503
+
+        with pytest.raises(outbound.CircuitOpenError):
+            outbound.get(service, URL)
+        assert len(responses.calls) == 3
+        assert outbound.metrics()[service][HOST]['errors']['circuit_open'] == 1
+
+    @responses.activate
+    def test_circuit_closes_after_reset_timeout(self, service):
+        responses.add(responses.GET, URL, body=requests.ConnectionError())
+        for _ in range(3):
+            with pytest.raises(requests.ConnectionError):
+                outbound.get(service, URL)
+
+        responses.reset()
+        responses.add(responses.GET, URL, status=200)
+        opened_at = outbound._breakers[(service, HOST)].opened_at
+        with mock.patch('framework.outbound.time.time', return_value=opened_at + 31):
+            assert outbound.get(service, URL).status_code == 200
+        assert outbound._breakers[(service, HOST)].opened_at is None
+        assert outbound._breakers[(service, HOST)].failures == 0
+
+    @pytest.mark.parametrize('status', [404, 500, 507])
+    @responses.activate
+    def test_other_errors_do_not_open_circuit(self, service, status):
+        responses.add(responses.GET, URL, status=status)
+        for _ in range(5):
+            assert outbound.get(service, URL).status_code == status
+
+    @responses.activate
+    def test_metrics_are_logged(self, service):
+        responses.add(responses.GET, URL, status=200)
+        with mock.patch.object(settings, 'OUTBOUND_HTTP_METRICS_INTERVAL', 2), \
+                mock.patch('framework.outbound.logger') as mock_logger:
+            for _ in range(3):
+                outbound.get(service, URL)
+        assert mock_logger.info.call_count == 1
+        assert "'requests': 2" in mock_logger.info.call_args[0][0]
+
+    @responses.activate
+    def test_circuit_breakers_disabled(self, service):
+        responses.add(responses.GET, URL, status=503)
+        with mock.patch.object(settings, 'OUTBOUND_HTTP_CIRCUIT_BREAKERS', False):
+            for _ in range(5):
+                assert outbound.get(service, URL).status_code == 503
+
+    @responses.activate
+    def test_varnish_servers_have_their_own_circuits(self):
+        responses.add('BAN', 'http://down.varnish/v2/', body=requests.ConnectionError())
+        responses.add('BAN', 'http://up.varnish/v2/', status=200)
+        with mock.patch.object(settings, 'VARNISH_BAN_RETRIES', 0), \
+                mock.patch.dict(settings.OUTBOUND_HTTP, {'varnish': {'failure_threshold': 3, 'reset_timeout': 30}}):
+            # Bans to the server that is up don't reset the failures of the one that is down
+            for _ in range(3):
+                assert not send_ban('http://down.varnish', 'api.osf.io', '/v2/')
+                assert send_ban('http://up.varnish', 'api.osf.io', '/v2/')
+            assert not send_ban('http://down.varnish', 'api.osf.io', '/v2/')
+            assert send_ban('http://up.varnish', 'api.osf.io', '/v2/')
+
+        assert len([call for call in responses.calls if 'down.varnish' in call.request.url]) == 3
+        assert outbound.metrics()['varnish']['down.varnish']['errors']['circuit_open'] == 1
+        assert outbound.metrics()['varnish']['up.varnish']['requests'] == 4
@@ -8,6 +8,7 @@ from addons.osfstorage.models import OsfStorageFile, OsfStorageFolder, OsfStorag
 from addons.s3.models import S3File
 from osf.models import File
 from osf.models import Folder
+from osf.models import files
 from osf.models.files import BaseFileNode
 from tests.base import OsfTestCase
 from osf_tests.factories import AuthUserFactory, ProjectFactory
@@ -528,7 +529,7 @@ class TestFileObj(FilesTestCase):
         v1.refresh_from_db()
         assert_equal(v1.size, 1337)
 
-    @mock.patch('osf.models.files.requests.get')
+    @mock.patch('osf.models.files.outbound.get')
     def test_touch(self, mock_requests):
         file = TestFile(
             _path='/afile',
@@ -557,7 +558,7 @@ class TestFileObj(FilesTestCase):
         assert_equals(v.size, 0xDEADBEEF)
         assert_equals(file.versions.count(), 0)
 
-    @mock.patch('osf.models.files.requests.get')
+    @mock.patch('osf.models.files.outbound.get')
     def test_touch_caching(self, mock_requests):
         file = TestFile(
             _path='/afile',
@@ -584,7 +585,7 @@ class TestFileObj(FilesTestCase):
         assert_equals(file.versions.count(), 1)
         assert_equals(file.touch(None, revision='foo'), v)
 
-    @mock.patch('osf.models.files.requests.get')
+    @mock.patch('osf.models.files.outbound.get')
     def test_touch_auth(self, mock_requests):
         file = TestFile(
             _path='/afile',
@@ -602,6 +603,62 @@ class TestFileObj(FilesTestCase):
             'Authorization': 'Bearer bearer'
         })
 
+    @mock.patch('osf.models.files.settings.WATERBUTLER_METADATA_CACHE_TIMEOUT', 30)
+    @mock.patch('osf.models.files.outbound.get')
+    def test_touch_metadata_cache(self, mock_requests):
+        file = TestFile(
+            _path='/afile',
+            name='name',
+            node=self.node,
+            provider='test',
+            materialized_path='/long/path/to/name',
+        )
+
+        mock_response = mock.Mock(status_code=200)
+        mock_response.json.return_value = {
+            'data': {
+                'attributes': {
+                    'name': 'fairly',
+                    'modified': '2015',
+                    'size': 0xDEADBEEF,
+                    'materialized': '/ephemeral',
+                    'etag': 'abc',
+                }
+            }
+        }
+        mock_requests.return_value = mock_response
+
+        assert_equals(file.touch(None).size, 0xDEADBEEF)
+        with mock.patch.object(TestFile, 'save') as mock_save:
+            v = file.touch(None)
+        assert_equals(v.size, 0xDEADBEEF)
+        assert_equals(mock_requests.call_count, 1)
+        assert_false(mock_save.called)
+
+        # Another revision is fetched
+        file.touch(None, revision='bar')
+        assert_equals(mock_requests.call_count, 2)
+
+        files.forget_waterbutler_metadata(self.node)
+        file.touch(None)
+        assert_equals(mock_requests.call_count, 3)
+
+    @mock.patch('osf.models.files.settings.WATERBUTLER_METADATA_CACHE_TIMEOUT', 30)
+    @mock.patch('osf.models.files.outbound.get')
+    def test_touch_does_not_cache_errors(self, mock_requests):
+        file = TestFile(
+            _path='/afile',
+            name='name',
+            node=self.node,
+            provider='test',
+            materialized_path='/long/path/to/name',
+        )
+
+        mock_requests.return_value = mock.Mock(status_code=404)
+        assert_is(file.touch(None), None)
+        assert_is(file.touch(None), None)
+        assert_equals(mock_requests.call_count, 2)
+
     def test_download_url(self):
         pass
 
@@ -21,6 +21,7 @@ from framework.logging import logger as root_logger  # noqa
 from framework.postcommit_tasks import handlers as postcommit_handlers
 from framework.sentry import sentry
 from framework.transactions import handlers as transaction_handlers
+from osf.utils import permission_resolver as permission_resolver_handlers
 # Imports necessary to connect signals
 from website.archiver import listeners  # noqa
 from website.mails import listeners  # noqa
@@ -58,6 +59,7 @@ def attach_handlers(app, settings):
     add_handlers(app, celery_task_handlers.handlers)
     add_handlers(app, transaction_handlers.handlers)
     add_handlers(app, postcommit_handlers.handlers)
+    add_handlers(app, permission_resolver_handlers.handlers)
 
     # Attach handler for checking view-only link keys.
     # NOTE: This must be attached AFTER the TokuMX to avoid calling
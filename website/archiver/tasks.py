@@ -1,10 +1,10 @@
-import requests
 import json
 import httplib as http
 
 import celery
 from celery.utils.log import get_task_logger
 
+from framework import outbound
 from framework.celery_tasks import app as celery_app
 from framework.celery_tasks.utils import logged
 from framework.exceptions import HTTPError
@@ -161,7 +161,10 @@ def make_copy_request(job_pk, url, data):
     job = ArchiveJob.load(job_pk)
     src, dst, user = job.info()
     logger.info('Sending copy request for addon: {0} on node: {1}'.format(data['provider'], dst._id))
-    res = requests.post(url, data=json.dumps(data))
+    try:
+        res = outbound.post('waterbutler', url, data=json.dumps(data))
+    except outbound.CircuitOpenError:
+        raise HTTPError(http.SERVICE_UNAVAILABLE)
     if res.status_code not in (http.OK, http.CREATED, http.ACCEPTED):
         raise HTTPError(res.status_code)
 
@@ -174,13 +174,8 @@ def get_node_lineage(node):
     """ Get a list of node ids in order from the node to top most project
         e.g. [parent._id, node._id]
     """
-    lineage = [node._id]
-
-    while node.parent_id:
-        node = node.parent_node
-        lineage = [node._id] + lineage
-
-    return lineage
+    ancestor_ids = AbstractNode.objects.get_ancestors(node).order_by('-depth').values_list('guids___id', flat=True)
+    return list(ancestor_ids) + [node._id]
 
 
 def get_settings_url(uid, user):
@@ -2,8 +2,8 @@ from django.apps import apps
 import logging
 import urlparse
 import random
-import requests
 
+from framework import outbound
 from framework.celery_tasks import app as celery_app
 
 from website import settings, mails
@@ -31,13 +31,25 @@ def on_node_updated(node_id, user_id, first_save, saved_fields, request_headers=
         need_update = False
 
     if need_update:
-        node.update_search()
+        node.update_search(saved_fields=saved_fields)
         update_node_share(node)
         update_collecting_metadata(node, saved_fields)
 
     if node.get_identifier_value('doi') and bool(node.IDENTIFIER_UPDATE_FIELDS.intersection(saved_fields)):
         node.request_identifier_update(category='doi')
 
+@celery_app.task(ignore_results=True)
+def on_nodes_created(node_ids):
+    """Index nodes that were created in bulk, e.g. from a template, with one search request
+    and send the public ones to SHARE, instead of running on_node_updated for each of them.
+    """
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    nodes = list(AbstractNode.objects.filter(guids___id__in=node_ids))
+    AbstractNode.bulk_update_search(nodes)
+    for node in nodes:
+        if node.is_public:
+            update_node_share(node)
+
 def update_collecting_metadata(node, saved_fields):
     from website.search.search import update_collected_metadata
     if node.is_collected:
@@ -89,7 +101,7 @@ def _async_update_node_share(self, node_id):
             send_desk_share_error(node, resp, self.request.retries)
 
 def send_share_node_data(data):
-    resp = requests.post('{}api/normalizeddata/'.format(settings.SHARE_URL), json=data, headers={'Authorization': 'Bearer {}'.format(settings.SHARE_API_TOKEN), 'Content-Type': 'application/vnd.api+json'})
+    resp = outbound.post('share', '{}api/normalizeddata/'.format(settings.SHARE_URL), json=data, headers={'Authorization': 'Bearer {}'.format(settings.SHARE_API_TOKEN), 'Content-Type': 'application/vnd.api+json'})
     logger.debug(resp.content)
     return resp
 
@@ -171,3 +183,22 @@ def send_desk_share_error(node, resp, retries):
         retries=retries,
         can_change_preferences=False,
     )
+
+
+@celery_app.task(ignore_results=True)
+def fork_node(node_id, user_id, title=None):
+    """Fork a node tree outside of the request cycle and email the user the outcome.
+    Used by the fork endpoint for trees of more than ``FORK_ASYNC_NODE_THRESHOLD`` nodes.
+    """
+    from framework.auth import Auth
+    AbstractNode = apps.get_model('osf.AbstractNode')
+    OSFUser = apps.get_model('osf.OSFUser')
+    node = AbstractNode.load(node_id)
+    user = OSFUser.load(user_id)
+    try:
+        fork = node.fork_node(Auth(user), title=title)
+    except Exception:
+        logger.exception('Failed to fork node {}'.format(node_id))
+        mails.send_mail(user.email, mails.FORK_FAILED, title=node.title, guid=node._id, mimetype='html', can_change_preferences=False)
+        raise
+    mails.send_mail(user.email, mails.FORK_COMPLETED, title=node.title, guid=fork._id, mimetype='html', can_change_preferences=False)
@@ -2,7 +2,6 @@
 from __future__ import absolute_import
 import os
 import httplib as http
-import requests
 import urlparse
 import waffle
 
@@ -14,6 +13,7 @@ from django.core.urlresolvers import reverse
 
 from geolite2 import geolite2
 
+from framework import outbound
 from framework import status
 from framework import sentry
 from framework.auth import cas
@@ -232,7 +232,7 @@ def ember_app(path=None):
     if settings.PROXY_EMBER_APPS:
         path = request.path[len(ember_app['path']):]
         url = urlparse.urljoin(ember_app['server'], path)
-        resp = requests.get(url, stream=True, timeout=EXTERNAL_EMBER_SERVER_TIMEOUT, headers={'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'})
+        resp = outbound.get('ember', url, stream=True, timeout=EXTERNAL_EMBER_SERVER_TIMEOUT, headers={'accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8'})
         excluded_headers = ['content-encoding', 'content-length', 'transfer-encoding', 'connection']
         headers = [(name, value) for (name, value) in resp.raw.headers.items() if name.lower() not in excluded_headers]
         return Response(resp.content, resp.status_code, headers)
@@ -1733,5 +1733,5 @@ def make_url_map(app):
 
         @app.route('/ember-cli-live-reload.js')
         def ember_cli_live_reload():
-            req = requests.get('{}/ember-cli-live-reload.js'.format(settings.LIVE_RELOAD_DOMAIN), stream=True)
+            req = outbound.get('ember', '{}/ember-cli-live-reload.js'.format(settings.LIVE_RELOAD_DOMAIN), stream=True)
             return Response(stream_with_context(req.iter_content()), content_type=req.headers['content-type'])
@@ -3,8 +3,10 @@
 
 from __future__ import division
 
-import copy
+import collections
 import functools
+import hashlib
+import json
 import logging
 import math
 import re
@@ -14,10 +16,13 @@ from framework import sentry
 import six
 
 from django.apps import apps
+from django.core.cache import cache
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import F, Max, Q
+from django.utils.functional import cached_property
 from elasticsearch import (ConnectionError, Elasticsearch, NotFoundError,
                            RequestError, TransportError, helpers)
+from elasticsearch.exceptions import HTTP_EXCEPTIONS
 from framework.celery_tasks import app as celery_app
 from framework.database import paginated
 from osf.models import AbstractNode
@@ -27,6 +32,7 @@ from osf.models import Institution
 from osf.models import QuickFilesNode
 from osf.models import CollectedGuidMetadata
 from osf.utils.sanitize import unescape_entities
+from osf.utils.workflows import DefaultStates
 from website import settings
 from website.filters import profile_image_url
 from osf.models.licenses import serialize_node_license_record
@@ -68,6 +74,20 @@ ENGLISH_ANALYZER_PROPERTY = {'type': 'string', 'analyzer': 'english'}
 
 INDEX = settings.ELASTIC_INDEX
 
+# Node fields that serialize_file reads: they appear in, or decide the visibility of, the search
+# documents of the node's files. Tags and titles decide whether the node is a QA node
+FILE_DOC_NODE_FIELDS = {
+    'title',
+    'tags',
+    'is_public',
+    'is_deleted',
+    'archiving',
+    'retraction',
+    'parent_node',
+    'creator',
+    'type',
+}
+
 CLIENT = None
 
 
@@ -135,17 +155,34 @@ def requires_search(func):
     return wrapped
 
 
-@requires_search
-def get_aggregations(query, doc_type):
-    query['aggregations'] = {
-        'licenses': {
-            'terms': {
-                'field': 'license.id'
-            }
+TAG_AGGREGATIONS = {
+    'tag_cloud': {
+        'terms': {'field': 'tags'}
+    }
+}
+
+LICENSE_AGGREGATIONS = {
+    'licenses': {
+        'terms': {
+            'field': 'license.id'
         }
     }
+}
 
-    res = client().search(index=INDEX, doc_type=doc_type, search_type='count', body=query)
+COUNT_AGGREGATIONS = {
+    'counts': {
+        'terms': {
+            'field': '_type',
+        }
+    }
+}
+
+
+def format_tags(res):
+    return res['aggregations']['tag_cloud']['buckets']
+
+
+def format_aggregations(res):
     ret = {
         doc_type: {
             item['key']: item['doc_count']
@@ -157,35 +194,40 @@ def get_aggregations(query, doc_type):
     return ret
 
 
-@requires_search
-def get_counts(count_query, clean=True):
-    count_query['aggregations'] = {
-        'counts': {
-            'terms': {
-                'field': '_type',
-            }
-        }
-    }
-
-    res = client().search(index=INDEX, doc_type=None, search_type='count', body=count_query)
+def format_counts(res):
     counts = {x['key']: x['doc_count'] for x in res['aggregations']['counts']['buckets'] if x['key'] in ALIASES.keys()}
 
     counts['total'] = sum([val for val in counts.values()])
     return counts
 
 
-@requires_search
-def get_tags(query, index):
-    query['aggregations'] = {
-        'tag_cloud': {
-            'terms': {'field': 'tags'}
-        }
-    }
+def msearch(searches):
+    """Run ``searches``, a list of ``(header, body)``, in a single request.
+
+    A failed search raises the exception ``client().search`` would have raised for it.
+    """
+    body = []
+    for header, query in searches:
+        body.extend([header, query])
+    responses = client().msearch(body=body)['responses']
+    for response in responses:
+        if 'error' in response:
+            error = response['error']
+            status = response.get('status', 400)
+            raise HTTP_EXCEPTIONS.get(status, TransportError)(status, error.get('type') if isinstance(error, dict) else error, response)
+    return responses
+
 
-    results = client().search(index=index, doc_type=None, body=query)
-    tags = results['aggregations']['tag_cloud']['buckets']
+def search_header(index, doc_type=None):
+    header = {'index': index}
+    if doc_type and doc_type != '_all':
+        header['type'] = doc_type
+    return header
 
-    return tags
+
+def search_cache_key(query, index, doc_type, raw):
+    normalized = json.dumps([query, index, doc_type, raw], sort_keys=True, separators=(',', ':'), default=str)
+    return 'elastic_search:{}'.format(hashlib.sha1(normalized).hexdigest())
 
 
 @requires_search
@@ -201,53 +243,62 @@ def search(query, index=None, doc_type='_all', raw=False):
         counts: A dictionary in which keys are types and values are counts for that type, e.g, count['total'] is the sum of the other counts
         tags: A list of tags that are returned by the search query
         typeAliases: the doc_types that exist in the search database
+
+    Identical searches are answered from the cache for ``settings.SEARCH_RESULTS_CACHE_TIMEOUT`` seconds.
     """
     index = index or INDEX
-    tag_query = copy.deepcopy(query)
-    aggs_query = copy.deepcopy(query)
-    count_query = copy.deepcopy(query)
-
-    for key in ['from', 'size', 'sort']:
-        try:
-            del tag_query[key]
-            del aggs_query[key]
-            del count_query[key]
-        except KeyError:
-            pass
-
-    tags = get_tags(tag_query, index)
+    cache_key = None
+    if settings.SEARCH_RESULTS_CACHE_TIMEOUT:
+        cache_key = search_cache_key(query, index, doc_type, raw)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    # The tag cloud, aggregations and counts ignore pagination, and the latter two the filter too
+    tag_query = {key: value for key, value in query.items() if key not in ('from', 'size', 'sort')}
+    count_query = tag_query
     try:
-        del aggs_query['query']['filtered']['filter']
-        del count_query['query']['filtered']['filter']
-    except KeyError:
+        filtered = tag_query['query']['filtered']
+        if 'filter' in filtered:
+            filtered = {key: value for key, value in filtered.items() if key != 'filter'}
+            count_query = dict(tag_query, query=dict(tag_query['query'], filtered=filtered))
+    except (KeyError, TypeError):
         pass
-    aggregations = get_aggregations(aggs_query, doc_type=doc_type)
-    counts = get_counts(count_query, index)
 
-    # Run the real query and get the results
-    raw_results = client().search(index=index, doc_type=doc_type, body=query)
+    tag_results, aggs_results, count_results, raw_results = msearch([
+        (search_header(index), dict(tag_query, size=0, aggregations=TAG_AGGREGATIONS)),
+        (search_header(index, doc_type), dict(count_query, size=0, aggregations=LICENSE_AGGREGATIONS)),
+        (search_header(index), dict(count_query, size=0, aggregations=COUNT_AGGREGATIONS)),
+        (search_header(index, doc_type), query),
+    ])
     results = [hit['_source'] for hit in raw_results['hits']['hits']]
 
     return_value = {
         'results': raw_results['hits']['hits'] if raw else format_results(results),
-        'counts': counts,
-        'aggs': aggregations,
-        'tags': tags,
+        'counts': format_counts(count_results),
+        'aggs': format_aggregations(aggs_results),
+        'tags': format_tags(tag_results),
         'typeAliases': ALIASES
     }
+    if cache_key:
+        cache.set(cache_key, return_value, settings.SEARCH_RESULTS_CACHE_TIMEOUT)
     return return_value
 
 def format_results(results):
+    parents = load_parents(
+        result.get('parent_id') for result in results
+        if result.get('category') in {'file', 'project', 'component', 'registration', 'preprint'}
+    )
     ret = []
     for result in results:
         if result.get('category') == 'user':
             result['url'] = '/profile/' + result['id']
         elif result.get('category') == 'file':
-            parent_info = load_parent(result.get('parent_id'))
+            parent_info = parents.get(result.get('parent_id'))
             result['parent_url'] = parent_info.get('url') if parent_info else None
             result['parent_title'] = parent_info.get('title') if parent_info else None
         elif result.get('category') in {'project', 'component', 'registration', 'preprint'}:
-            result = format_result(result, result.get('parent_id'))
+            result = format_result(result, parents.get(result.get('parent_id')))
         elif result.get('category') == 'collectionSubmission':
             continue
         elif not result.get('category'):
@@ -256,8 +307,7 @@ def format_results(results):
         ret.append(result)
     return ret
 
-def format_result(result, parent_id=None):
-    parent_info = load_parent(parent_id)
+def format_result(result, parent_info=None):
     formatted_result = {
         'contributors': result['contributors'],
         'wiki_link': result['url'] + 'wiki/',
@@ -287,16 +337,20 @@ def format_result(result, parent_id=None):
     return formatted_result
 
 
-def load_parent(parent_id):
-    parent = AbstractNode.load(parent_id)
-    if parent and parent.is_public:
-        return {
+def load_parents(parent_ids):
+    """Map the ids of the public nodes among ``parent_ids`` to what search results show of them."""
+    parent_ids = {parent_id for parent_id in parent_ids if parent_id}
+    if not parent_ids:
+        return {}
+    return {
+        parent._id: {
             'title': parent.title,
             'url': parent.url,
             'id': parent._id,
             'is_registation': parent.is_registration,
         }
-    return None
+        for parent in AbstractNode.objects.filter(guids___id__in=parent_ids, is_public=True)
+    }
 
 
 COMPONENT_CATEGORIES = set(settings.NODE_CATEGORY_MAP.keys())
@@ -316,11 +370,11 @@ def get_doctype_from_node(node):
         return node.category
 
 @celery_app.task(bind=True, max_retries=5, default_retry_delay=60)
-def update_node_async(self, node_id, index=None, bulk=False):
+def update_node_async(self, node_id, index=None, bulk=False, saved_fields=None):
     AbstractNode = apps.get_model('osf.AbstractNode')
     node = AbstractNode.load(node_id)
     try:
-        update_node(node=node, index=index, bulk=bulk, async=True)
+        update_node(node=node, index=index, bulk=bulk, async=True, saved_fields=saved_fields)
     except Exception as exc:
         self.retry(exc=exc)
 
@@ -333,10 +387,17 @@ def update_user_async(self, user_id, index=None):
     except Exception as exc:
         self.retry(exc)
 
-def serialize_node(node, category):
-    elastic_document = {}
-    parent_id = node.parent_id
+REGISTRATION_STATE_FIELDS = ('is_pending_registration', 'is_retracted', 'is_pending_retraction', 'embargo_end_date', 'is_pending_embargo')
+RegistrationState = collections.namedtuple('RegistrationState', REGISTRATION_STATE_FIELDS)
+NOT_A_REGISTRATION = RegistrationState(False, False, False, False, False)
+
+def build_node_document(node, category, contributors, parent_id, license, registration, preprint_url, wikis):
+    """Assemble the search document of ``node`` from the data that does not live on its own row.
 
+    :param contributors: Visible contributors, as dicts with 'fullname', 'guids___id' and 'is_active'
+    :param registration: An object with the ``REGISTRATION_STATE_FIELDS`` of ``node``
+    :param wikis: The latest ``WikiVersion`` of each of the node's wiki pages
+    """
     try:
         normalized_title = six.u(node.title)
     except TypeError:
@@ -349,48 +410,272 @@ def serialize_node(node, category):
                 'fullname': x['fullname'],
                 'url': '/{}/'.format(x['guids___id']) if x['is_active'] else None
             }
-            for x in node._contributors.filter(contributor__visible=True).order_by('contributor___order')
-            .values('fullname', 'guids___id', 'is_active')
+            for x in contributors
         ],
         'title': node.title,
         'normalized_title': normalized_title,
         'category': category,
         'public': node.is_public,
-        'tags': list(node.tags.filter(system=False).values_list('name', flat=True)),
+        'tags': [tag.name for tag in node.tags.all() if not tag.system],
         'description': node.description,
         'url': node.url,
         'is_registration': node.is_registration,
-        'is_pending_registration': node.is_pending_registration,
-        'is_retracted': node.is_retracted,
-        'is_pending_retraction': node.is_pending_retraction,
-        'embargo_end_date': node.embargo_end_date.strftime('%A, %b. %d, %Y') if node.embargo_end_date else False,
-        'is_pending_embargo': node.is_pending_embargo,
+        'is_pending_registration': registration.is_pending_registration,
+        'is_retracted': registration.is_retracted,
+        'is_pending_retraction': registration.is_pending_retraction,
+        'embargo_end_date': registration.embargo_end_date.strftime('%A, %b. %d, %Y') if registration.embargo_end_date else False,
+        'is_pending_embargo': registration.is_pending_embargo,
         'registered_date': node.registered_date,
         'wikis': {},
         'parent_id': parent_id,
         'date_created': node.created,
-        'license': serialize_node_license_record(node.license),
-        'affiliated_institutions': list(node.affiliated_institutions.values_list('name', flat=True)),
+        'license': serialize_node_license_record(license),
+        'affiliated_institutions': [institution.name for institution in node.affiliated_institutions.all()],
         'boost': int(not node.is_registration) + 1,  # This is for making registered projects less relevant
         'extra_search_terms': clean_splitters(node.title),
-        'preprint_url': node.preprint_url,
+        'preprint_url': preprint_url,
     }
-    if not node.is_retracted:
-        for wiki in node.get_wiki_pages_latest():
+    if not registration.is_retracted:
+        for wiki in wikis:
             # '.' is not allowed in field names in ES2
             elastic_document['wikis'][wiki.wiki_page.page_name.replace('.', ' ')] = wiki.raw_text(node)
 
     return elastic_document
 
+def serialize_node(node, category):
+    return build_node_document(
+        node,
+        category,
+        contributors=node._contributors.filter(contributor__visible=True).order_by('contributor___order')
+        .values('fullname', 'guids___id', 'is_active'),
+        parent_id=node.parent_id,
+        license=node.license,
+        registration=node,
+        preprint_url=node.preprint_url,
+        wikis=[] if node.is_retracted else node.get_wiki_pages_latest(),
+    )
+
+
+class NodeSearchBatch(object):
+    """What the search documents of a batch of nodes are built from, loaded with a number of
+    queries that does not depend on the size of the batch.
+
+    Mirrors the properties ``serialize_node`` and ``should_delete_node`` read one node at a time
+    (``parent_node``, ``license``, the registration sanctions, ``is_preprint``...). Each kind of
+    data is only loaded when first needed.
+    """
+    SANCTIONS = ('registration_approval', 'retraction', 'embargo')
+
+    def __init__(self, nodes):
+        node_ids = [node.id for node in nodes]
+        self.nodes = list(
+            AbstractNode.objects.filter(id__in=node_ids)
+            .select_related('preprint_file', *self.SANCTIONS)
+            .prefetch_related('tags', 'affiliated_institutions')
+            .order_by('id')
+        )
+        self.node_ids = [node.id for node in self.nodes]
+
+    @cached_property
+    def ancestors(self):
+        """Map node ids to their ancestors, parent first."""
+        NodeClosure = apps.get_model('osf.NodeClosure')
+        closures = list(
+            NodeClosure.objects.filter(descendant_id__in=self.node_ids)
+            .order_by('depth').values_list('descendant_id', 'ancestor_id')
+        )
+        nodes = AbstractNode.objects.select_related(*self.SANCTIONS).in_bulk({ancestor_id for _, ancestor_id in closures})
+        ancestors = {node_id: [] for node_id in self.node_ids}
+        for descendant_id, ancestor_id in closures:
+            ancestors[descendant_id].append(nodes[ancestor_id])
+        return ancestors
+
+    def parent(self, node):
+        ancestors = self.ancestors[node.id]
+        return ancestors[0] if ancestors else None
+
+    @cached_property
+    def licenses(self):
+        """Map node ids to their own or inherited ``NodeLicenseRecord``."""
+        NodeLicenseRecord = apps.get_model('osf.NodeLicenseRecord')
+        license_ids = {}
+        for node in self.nodes:
+            license_ids[node.id] = next(
+                (each.node_license_id for each in [node] + self.ancestors[node.id] if each.node_license_id),
+                None
+            )
+        records = NodeLicenseRecord.objects.select_related('node_license').in_bulk(
+            {license_id for license_id in license_ids.values() if license_id}
+        )
+        return {node_id: records.get(license_id) for node_id, license_id in license_ids.items()}
+
+    def registration_state(self, node):
+        if not node.is_registration:
+            return NOT_A_REGISTRATION
+        lineage = [node] + self.ancestors[node.id]
+        # Like the Registration properties, a sanction is inherited from the nearest ancestor that has one
+        approval, retraction, embargo = [
+            next((getattr(each, field) for each in lineage if getattr(each, field + '_id')), None)
+            for field in self.SANCTIONS
+        ]
+        return RegistrationState(
+            is_pending_registration=approval.is_pending_approval if approval else False,
+            is_retracted=retraction.is_approved if retraction else False,
+            is_pending_retraction=retraction.is_pending_approval if retraction else False,
+            embargo_end_date=embargo.embargo_end_date if embargo else False,
+            is_pending_embargo=embargo.is_pending_approval if embargo else False,
+        )
+
+    @cached_property
+    def preprints(self):
+        """Map node ids to their preprints, by creation, for the nodes that may be preprints."""
+        PreprintService = apps.get_model('osf.PreprintService')
+        candidates = [
+            node.id for node in self.nodes
+            if node.preprint_file_id and node.is_public and node.preprint_file.node_id == node.id
+        ]
+        preprints = {}
+        if candidates:
+            for preprint in PreprintService.objects.filter(node_id__in=candidates).select_related('provider').order_by('id'):
+                preprints.setdefault(preprint.node_id, []).append(preprint)
+        return preprints
+
+    def is_preprint(self, node):
+        return any(preprint.machine_state != DefaultStates.INITIAL.value for preprint in self.preprints.get(node.id, []))
+
+    def preprint_url(self, node):
+        if self.is_preprint(node):
+            preprints = self.preprints[node.id]
+            return next((preprint for preprint in preprints if preprint.is_published), preprints[0]).url
+
+    @cached_property
+    def archive_jobs(self):
+        """Map registration ids to their archive job."""
+        ArchiveJob = apps.get_model('osf.ArchiveJob')
+        registration_ids = [node.id for node in self.nodes if node.is_registration]
+        jobs = {}
+        if registration_ids:
+            for job in ArchiveJob.objects.filter(dst_node_id__in=registration_ids).order_by('-id'):
+                jobs[job.dst_node_id] = job
+        return jobs
+
+    def archiving(self, node):
+        job = self.archive_jobs.get(node.id)
+        return bool(job and not job.done and not job.archive_tree_finished())
+
+    @cached_property
+    def contributors(self):
+        """Map node ids to their visible contributors, in order."""
+        Contributor = apps.get_model('osf.Contributor')
+        contributors = {node_id: [] for node_id in self.node_ids}
+        for contributor in (
+            Contributor.objects.filter(node_id__in=self.node_ids, visible=True).order_by('_order')
+            .values('node_id', 'user__fullname', 'user__guids___id', 'user__is_active')
+        ):
+            contributors[contributor['node_id']].append({
+                'fullname': contributor['user__fullname'],
+                'guids___id': contributor['user__guids___id'],
+                'is_active': contributor['user__is_active'],
+            })
+        return contributors
+
+    @cached_property
+    def wikis(self):
+        """Map node ids to the latest version of each of their wiki pages, for unretracted nodes."""
+        WikiVersion = apps.get_model('addons_wiki.WikiVersion')
+        node_ids = [node.id for node in self.nodes if not self.registration_state(node).is_retracted]
+        wikis = {}
+        if node_ids:
+            versions = WikiVersion.objects.annotate(
+                newest_version=Max('wiki_page__versions__identifier')
+            ).filter(
+                identifier=F('newest_version'),
+                wiki_page__node_id__in=node_ids,
+                wiki_page__deleted__isnull=True,
+            ).select_related('wiki_page')
+            for version in versions:
+                wikis.setdefault(version.wiki_page.node_id, []).append(version)
+        return wikis
+
+    def doc_type(self, node):
+        """Like ``get_doctype_from_node``."""
+        if node.is_registration:
+            return 'registration'
+        elif self.is_preprint(node):
+            return 'preprint'
+        elif self.parent(node) is None:
+            return 'project'
+        elif node.category in COMPONENT_CATEGORIES:
+            return 'component'
+        return node.category
+
+    def delete_doc_type(self, node):
+        """Like ``get_delete_doctype_from_node``."""
+        if node.is_registration:
+            return 'registration'
+        elif self.is_preprint(node):
+            return 'preprint'
+        return 'component' if self.parent(node) else 'project'
+
+    def should_delete(self, node):
+        """Like ``should_delete_node``."""
+        return node.is_deleted or not node.is_public or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or \
+            node.is_quickfiles or is_qa_node(node) or (node.is_registration and self.archiving(node))
+
+    def serialize(self, node):
+        parent = self.parent(node)
+        return build_node_document(
+            node,
+            self.doc_type(node),
+            contributors=self.contributors[node.id],
+            parent_id=parent._id if parent else None,
+            license=self.licenses[node.id],
+            registration=self.registration_state(node),
+            preprint_url=self.preprint_url(node),
+            wikis=self.wikis.get(node.id, []),
+        )
+
+def serialize_nodes(nodes):
+    """Serialize ``nodes`` for ``bulk_update_nodes`` with a number of queries that does not grow
+    with the number of nodes.
+
+    :return: ``(node, doc_type, elastic_document)`` for every node, with ``elastic_document``
+        None for the nodes that must be removed from the index
+    """
+    batch = NodeSearchBatch(nodes)
+    return [
+        (node, batch.delete_doc_type(node), None) if batch.should_delete(node) else (node, batch.doc_type(node), batch.serialize(node))
+        for node in batch.nodes
+    ]
+
+def is_qa_node(node):
+    return bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(tag.name for tag in node.tags.all())) or \
+        any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
+
+def should_delete_node(node):
+    """Whether ``node`` must be removed from, rather than written to, the search index."""
+    return node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or \
+        node.is_quickfiles or is_qa_node(node)
+
+def get_delete_doctype_from_node(node):
+    if node.is_registration:
+        return 'registration'
+    elif node.is_preprint:
+        return 'preprint'
+    return node.project_or_component
+
 @requires_search
-def update_node(node, index=None, bulk=False, async=False):
+def update_node(node, index=None, bulk=False, async=False, saved_fields=None):
+    """Index ``node``. Its files are re-indexed too, unless ``saved_fields`` is given and
+    none of them appear in the file documents.
+    """
     from addons.osfstorage.models import OsfStorageFile
     index = index or INDEX
-    for file_ in paginated(OsfStorageFile, Q(node=node)):
-        update_file(file_, index=index)
+    if saved_fields is None or FILE_DOC_NODE_FIELDS.intersection(saved_fields):
+        for file_ in paginated(OsfStorageFile, Q(node=node)):
+            update_file(file_, index=index)
 
-    is_qa_node = bool(set(settings.DO_NOT_INDEX_LIST['tags']).intersection(node.tags.all().values_list('name', flat=True))) or any(substring in node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if node.is_deleted or not node.is_public or node.archiving or (node.is_spammy and settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH) or node.is_quickfiles or is_qa_node:
+    if should_delete_node(node):
         delete_doc(node._id, node, index=index)
     else:
         category = get_doctype_from_node(node)
@@ -403,26 +688,37 @@ def update_node(node, index=None, bulk=False, async=False):
 def bulk_update_nodes(serialize, nodes, index=None):
     """Updates the list of input projects
 
-    :param function Node-> dict serialize:
+    :param function Node[] -> [(Node, str, dict)] serialize: Returns the document type and the
+        (partial) document of each node, the document being None for nodes to remove from the index.
+        See ``serialize_nodes``
     :param Node[] nodes: Projects, components, registrations, or preprints
     :param str index: Index of the nodes
     :return:
     """
     index = index or INDEX
     actions = []
-    for node in nodes:
-        serialized = serialize(node)
-        if serialized:
+    for node, doc_type, serialized in serialize(nodes):
+        if serialized is None:
+            actions.append(_delete_action(index, doc_type, node._id))
+        elif serialized:
             actions.append({
                 '_op_type': 'update',
                 '_index': index,
                 '_id': node._id,
-                '_type': get_doctype_from_node(node),
+                '_type': doc_type,
                 'doc': serialized,
                 'doc_as_upsert': True,
             })
     if actions:
-        return helpers.bulk(client(), actions)
+        return _bulk(actions)
+
+@requires_search
+def bulk_index_nodes(nodes, index=None):
+    """Index ``nodes`` and their files, or remove them from the index, in bulk."""
+    from addons.osfstorage.models import OsfStorageFile
+    nodes = list(nodes)
+    bulk_update_nodes(serialize_nodes, nodes, index=index)
+    index_documents({'file': list(OsfStorageFile.objects.filter(node__in=nodes).values_list('_id', flat=True))}, index=index)
 
 def serialize_cgm_contributor(contrib):
     return {
@@ -467,16 +763,19 @@ def bulk_update_cgm(cgms, actions=None, op='update', index=None):
     except helpers.BulkIndexError as e:
         raise exceptions.BulkUpdateError(e.errors)
 
-def serialize_contributors(node):
-    return {
-        'contributors': [
-            {
-                'fullname': x['user__fullname'],
-                'url': '/{}/'.format(x['user__guids___id'])
-            } for x in
-            node.contributor_set.filter(visible=True, user__is_active=True).order_by('_order').values('user__fullname', 'user__guids___id')
-        ]
-    }
+def serialize_contributors(nodes):
+    batch = NodeSearchBatch(nodes)
+    return [
+        (node, batch.doc_type(node), {
+            'contributors': [
+                {
+                    'fullname': x['fullname'],
+                    'url': '/{}/'.format(x['guids___id'])
+                } for x in batch.contributors[node.id] if x['is_active']
+            ]
+        })
+        for node in batch.nodes
+    ]
 
 
 bulk_update_contributors = functools.partial(bulk_update_nodes, serialize_contributors)
@@ -490,28 +789,7 @@ def update_contributors_async(self, user_id):
     for page_num in p.page_range:
         bulk_update_contributors(p.page(page_num).object_list)
 
-@requires_search
-def update_user(user, index=None):
-
-    index = index or INDEX
-    if not user.is_active:
-        try:
-            client().delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
-            # update files in their quickfiles node if the user has been marked as spam
-            if 'spam_confirmed' in user.system_tags:
-                quickfiles = QuickFilesNode.objects.get_for_user(user)
-                for quickfile_id in quickfiles.files.values_list('_id', flat=True):
-                    client().delete(
-                        index=index,
-                        doc_type='file',
-                        id=quickfile_id,
-                        refresh=True,
-                        ignore=[404]
-                    )
-        except NotFoundError:
-            pass
-        return
-
+def serialize_user(user):
     names = dict(
         fullname=user.fullname,
         given_name=user.given_name,
@@ -529,7 +807,7 @@ def update_user(user, index=None):
                 pass  # This is fine, will only happen in 2.x if val is already unicode
             normalized_names[key] = unicodedata.normalize('NFKD', val).encode('ascii', 'ignore')
 
-    user_doc = {
+    return {
         'id': user._id,
         'user': user.fullname,
         'normalized_user': normalized_names['fullname'],
@@ -546,27 +824,43 @@ def update_user(user, index=None):
         'boost': 2,  # TODO(fabianvf): Probably should make this a constant or something
     }
 
-    client().index(index=index, doc_type='user', body=user_doc, id=user._id, refresh=True)
+def get_spam_quickfile_ids(user):
+    """Ids of the quickfiles to remove from the index along with an inactive ``user``."""
+    if 'spam_confirmed' in user.system_tags:
+        quickfiles = QuickFilesNode.objects.get_for_user(user)
+        return list(quickfiles.files.values_list('_id', flat=True))
+    return []
 
 @requires_search
-def update_file(file_, index=None, delete=False):
+def update_user(user, index=None):
+
     index = index or INDEX
+    if not user.is_active:
+        try:
+            client().delete(index=index, doc_type='user', id=user._id, refresh=True, ignore=[404])
+            # update files in their quickfiles node if the user has been marked as spam
+            for quickfile_id in get_spam_quickfile_ids(user):
+                client().delete(
+                    index=index,
+                    doc_type='file',
+                    id=quickfile_id,
+                    refresh=True,
+                    ignore=[404]
+                )
+        except NotFoundError:
+            pass
+        return
 
+    client().index(index=index, doc_type='user', body=serialize_user(user), id=user._id, refresh=True)
+
+def serialize_file(file_):
+    """Return the search document of ``file_``, or None if it must be removed from the index."""
     # TODO: Can remove 'not file_.name' if we remove all base file nodes with name=None
     file_node_is_qa = bool(
-        set(settings.DO_NOT_INDEX_LIST['tags']).intersection(file_.tags.all().values_list('name', flat=True))
-    ) or bool(
-        set(settings.DO_NOT_INDEX_LIST['tags']).intersection(file_.node.tags.all().values_list('name', flat=True))
-    ) or any(substring in file_.node.title for substring in settings.DO_NOT_INDEX_LIST['titles'])
-    if not file_.name or not file_.node.is_public or delete or file_.node.is_deleted or file_.node.archiving or file_node_is_qa:
-        client().delete(
-            index=index,
-            doc_type='file',
-            id=file_._id,
-            refresh=True,
-            ignore=[404]
-        )
-        return
+        set(settings.DO_NOT_INDEX_LIST['tags']).intersection(tag.name for tag in file_.tags.all())
+    ) or is_qa_node(file_.node)
+    if not file_.name or not file_.node.is_public or file_.node.is_deleted or file_.node.archiving or file_node_is_qa:
+        return None
 
     # We build URLs manually here so that this function can be
     # run outside of a Flask request context (e.g. in a celery task)
@@ -584,11 +878,11 @@ def update_file(file_, index=None, delete=False):
     file_guid = file_.get_guid(create=False)
     if file_guid:
         guid_url = '/{file_guid}/'.format(file_guid=file_guid._id)
-    file_doc = {
+    return {
         'id': file_._id,
         'deep_url': file_deep_url,
         'guid_url': guid_url,
-        'tags': list(file_.tags.filter(system=False).values_list('name', flat=True)),
+        'tags': [tag.name for tag in file_.tags.all() if not tag.system],
         'name': file_.name,
         'category': 'file',
         'node_url': node_url,
@@ -599,6 +893,21 @@ def update_file(file_, index=None, delete=False):
         'extra_search_terms': clean_splitters(file_.name),
     }
 
+@requires_search
+def update_file(file_, index=None, delete=False):
+    index = index or INDEX
+
+    file_doc = None if delete else serialize_file(file_)
+    if file_doc is None:
+        client().delete(
+            index=index,
+            doc_type='file',
+            id=file_._id,
+            refresh=True,
+            ignore=[404]
+        )
+        return
+
     client().index(
         index=index,
         doc_type='file',
@@ -607,6 +916,105 @@ def update_file(file_, index=None, delete=False):
         refresh=True
     )
 
+def _delete_action(index, doc_type, doc_id):
+    return {'_op_type': 'delete', '_index': index, '_type': doc_type, '_id': doc_id}
+
+def _index_action(index, doc_type, doc_id, doc):
+    return {'_op_type': 'index', '_index': index, '_type': doc_type, '_id': doc_id, '_source': doc}
+
+def _bulk(actions):
+    success, errors = helpers.bulk(client(), actions, raise_on_error=False)
+    # Deleting a document that was never indexed is not an error
+    errors = [error for error in errors if error.get('delete', {}).get('status') != 404]
+    if errors:
+        raise exceptions.BulkUpdateError(errors)
+    return success, errors
+
+def get_node_actions(doc_ids, index):
+    for node, doc_type, doc in serialize_nodes(AbstractNode.objects.filter(guids___id__in=doc_ids)):
+        yield _delete_action(index, doc_type, node._id) if doc is None else _index_action(index, doc_type, node._id, doc)
+
+def get_file_actions(doc_ids, index):
+    from addons.osfstorage.models import OsfStorageFile
+    files = OsfStorageFile.objects.filter(_id__in=doc_ids).select_related('node').prefetch_related('tags', 'node__tags')
+    seen = set()
+    for file_ in files:
+        seen.add(file_._id)
+        doc = serialize_file(file_)
+        yield _index_action(index, 'file', file_._id, doc) if doc else _delete_action(index, 'file', file_._id)
+    # Trashed or removed files
+    for doc_id in set(doc_ids) - seen:
+        yield _delete_action(index, 'file', doc_id)
+
+def get_user_actions(doc_ids, index):
+    users = OSFUser.objects.filter(guids___id__in=doc_ids)
+    seen = set()
+    for user in users:
+        seen.add(user._id)
+        if user.is_active:
+            yield _index_action(index, 'user', user._id, serialize_user(user))
+        else:
+            yield _delete_action(index, 'user', user._id)
+            for quickfile_id in get_spam_quickfile_ids(user):
+                yield _delete_action(index, 'file', quickfile_id)
+    for doc_id in set(doc_ids) - seen:
+        yield _delete_action(index, 'user', doc_id)
+
+QUEUE_ACTIONS = {
+    'node': get_node_actions,
+    'file': get_file_actions,
+    'user': get_user_actions,
+}
+
+@requires_search
+def index_documents(doc_ids_by_category, index=None):
+    """Write the current state of the given documents to the index with a single bulk request,
+    without forcing a refresh.
+
+    :param dict doc_ids_by_category: Maps 'node', 'file' or 'user' to search document ids
+    :return: The number of documents written or deleted
+    """
+    index = index or INDEX
+    actions = [
+        action
+        for category, doc_ids in doc_ids_by_category.items()
+        for action in QUEUE_ACTIONS[category](doc_ids, index)
+    ]
+    if not actions:
+        return 0
+    _bulk(actions)
+    return len(actions)
+
+@celery_app.task(ignore_results=True)
+def process_index_queue(index=None, batch_size=None):
+    """Index the documents queued by ``website.search.search`` when
+    ``settings.ENABLE_SEARCH_INDEX_QUEUE`` is on, ``batch_size`` documents per bulk request.
+
+    Entries dirtied again while this runs are left for the next run.
+    """
+    SearchIndexQueueEntry = apps.get_model('osf.SearchIndexQueueEntry')
+    batch_size = batch_size or settings.SEARCH_INDEX_QUEUE_BATCH_SIZE
+    metrics = SearchIndexQueueEntry.objects.metrics()
+    logger.info('Search index queue depth: {depth} {depth_by_category}, lag: {lag:.0f}s'.format(**metrics))
+
+    started = SearchIndexQueueEntry.objects.clock()
+    entries = SearchIndexQueueEntry.objects.filter(modified__lt=started).order_by('id')
+    indexed = 0
+    last_id = 0
+    while True:
+        batch = list(entries.filter(id__gt=last_id).values_list('id', 'category', 'doc_id')[:batch_size])
+        if not batch:
+            break
+        doc_ids_by_category = {}
+        for _, category, doc_id in batch:
+            doc_ids_by_category.setdefault(category, []).append(doc_id)
+        indexed += index_documents(doc_ids_by_category, index=index) or 0
+        SearchIndexQueueEntry.objects.filter(id__in=[entry_id for entry_id, _, _ in batch], modified__lt=started).delete()
+        last_id = batch[-1][0]
+
+    logger.info('Indexed {} search documents from the queue'.format(indexed))
+    return indexed
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or INDEX
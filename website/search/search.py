@@ -1,5 +1,7 @@
 import logging
 
+from django.apps import apps
+
 from framework.celery_tasks.handlers import enqueue_task
 
 from website import settings
@@ -24,13 +26,30 @@ def search(query, index=None, doc_type=None, raw=None):
     index = index or settings.ELASTIC_INDEX
     return search_engine.search(query, index=index, doc_type=doc_type, raw=raw)
 
+def use_index_queue(index):
+    return settings.ENABLE_SEARCH_INDEX_QUEUE and index is None
+
+def enqueue_documents(category, doc_ids):
+    """Queue search documents to be indexed by `process_index_queue`."""
+    SearchIndexQueueEntry = apps.get_model('osf.SearchIndexQueueEntry')
+    SearchIndexQueueEntry.objects.enqueue(category, doc_ids)
+
 @requires_search
 def update_node(node, index=None, bulk=False, async=True, saved_fields=None):
     kwargs = {
         'index': index,
         'bulk': bulk
     }
-    if async:
+    if saved_fields is not None:
+        # Must be JSON-serializable to be passed to celery
+        saved_fields = list(saved_fields)
+    if async and use_index_queue(index):
+        SearchIndexQueueEntry = apps.get_model('osf.SearchIndexQueueEntry')
+        SearchIndexQueueEntry.objects.enqueue('node', [node._id])
+        if saved_fields is None or search_engine.FILE_DOC_NODE_FIELDS.intersection(saved_fields):
+            SearchIndexQueueEntry.objects.enqueue_node_files([node.id])
+    elif async:
+        kwargs['saved_fields'] = saved_fields
         node_id = node._id
         # We need the transaction to be committed before trying to run celery tasks.
         # For example, when updating a Node's privacy, is_public must be True in the
@@ -42,13 +61,18 @@ def update_node(node, index=None, bulk=False, async=True, saved_fields=None):
             search_engine.update_node_async(node_id=node_id, **kwargs)
     else:
         index = index or settings.ELASTIC_INDEX
-        return search_engine.update_node(node, **kwargs)
+        return search_engine.update_node(node, saved_fields=saved_fields, **kwargs)
 
 @requires_search
 def bulk_update_nodes(serialize, nodes, index=None):
     index = index or settings.ELASTIC_INDEX
     search_engine.bulk_update_nodes(serialize, nodes, index=index)
 
+@requires_search
+def bulk_index_nodes(nodes, index=None):
+    index = index or settings.ELASTIC_INDEX
+    search_engine.bulk_index_nodes(nodes, index=index)
+
 @requires_search
 def delete_node(node, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -69,6 +93,8 @@ def update_contributors_async(user_id):
 
 @requires_search
 def update_user(user, index=None, async=True):
+    if async and use_index_queue(index):
+        return enqueue_documents('user', [user._id])
     index = index or settings.ELASTIC_INDEX
     if async:
         user_id = user.id
@@ -81,9 +107,18 @@ def update_user(user, index=None, async=True):
 
 @requires_search
 def update_file(file_, index=None, delete=False):
+    if use_index_queue(index):
+        # Whether to delete the document is decided when the queue is processed
+        return enqueue_documents('file', [file_._id])
     index = index or settings.ELASTIC_INDEX
     search_engine.update_file(file_, index=index, delete=delete)
 
+@requires_search
+def index_queue_metrics():
+    """Depth and lag of the search index queue; see `SearchIndexQueueEntryManager.metrics`."""
+    SearchIndexQueueEntry = apps.get_model('osf.SearchIndexQueueEntry')
+    return SearchIndexQueueEntry.objects.metrics()
+
 @requires_search
 def update_institution(institution, index=None):
     index = index or settings.ELASTIC_INDEX
@@ -1,10 +1,14 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 '''Migration script for Search-enabled Models.'''
-from __future__ import absolute_import
-from math import ceil
+from __future__ import absolute_import, division
 
+import json
 import logging
+import os
+import threading
+import time
+from multiprocessing.pool import ThreadPool
 
 from django.db import connection
 from elasticsearch import helpers
@@ -12,7 +16,6 @@ from elasticsearch import helpers
 import website.search.search as search
 from website.search.elastic_search import client
 from website.search_migration import (
-    JSON_UPDATE_NODES_SQL, JSON_DELETE_NODES_SQL,
     JSON_UPDATE_FILES_SQL, JSON_DELETE_FILES_SQL,
     JSON_UPDATE_USERS_SQL, JSON_DELETE_USERS_SQL)
 from scripts import utils as script_utils
@@ -20,116 +23,157 @@ from osf.models import OSFUser, Institution, AbstractNode, BaseFileNode, Collect
 from website import settings
 from website.app import init_app
 from website.search.elastic_search import client as es_client
-from website.search.elastic_search import bulk_update_cgm
+from website.search.elastic_search import bulk_update_cgm, bulk_update_nodes, serialize_nodes
 from website.search.search import update_institution, bulk_update_collected_metadata
 
 logger = logging.getLogger(__name__)
 
-def sql_migrate(index, sql, max_id, increment, es_args=None, **kwargs):
-    """ Run provided SQL and send output to elastic.
+class ReindexCheckpoint(object):
+    """The id ranges a reindex has finished, saved to ``path`` after each range so that an
+    interrupted reindex can resume where it stopped. Without a path nothing is saved.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.lock = threading.Lock()
+        self.state = {'index': None, 'done': {}}
+        if path and os.path.exists(path):
+            with open(path) as fp:
+                self.state = json.load(fp)
+
+    @property
+    def index(self):
+        return self.state['index']
+
+    @index.setter
+    def index(self, value):
+        self.state['index'] = value
+        self.save()
+
+    def is_done(self, doc_type, start, end):
+        return [start, end] in self.state['done'].get(doc_type, [])
+
+    def mark_done(self, doc_type, start, end):
+        with self.lock:
+            self.state['done'].setdefault(doc_type, []).append([start, end])
+            self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        # Write then rename, so that a crash never leaves a truncated checkpoint behind
+        tmp_path = '{}.tmp'.format(self.path)
+        with open(tmp_path, 'w') as fp:
+            json.dump(self.state, fp)
+        os.rename(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def sql_migrate_range(index, sql, page_start, page_end, es_args=None, **kwargs):
+    """ Run provided SQL for the objects with ids in (page_start, page_end] and send output to elastic.
 
     :param str index: Elastic index to update (formatted into `sql`)
     :param str sql: SQL to format and run. See __init__.py in this module
-    :param int max_id: Last known object id. Indicates when to stop paging
-    :param int increment: Page size
     :param  dict es_args:  Dict or None, to pass to `helpers.bulk`
     :kwargs: Additional format arguments for `sql` arg
 
     :return int: Number of migrated objects
     """
-    if es_args is None:
-        es_args = {}
-    total_pages = int(ceil(max_id / float(increment)))
-    total_objs = 0
-    page_start = 0
-    page_end = 0
-    page = 0
-    while page_end <= (max_id + increment):
-        page += 1
-        page_end += increment
-        if page <= total_pages:
-            logger.info('Updating page {} / {}'.format(page_end / increment, total_pages))
-        else:
-            # An extra page is included to cover the edge case where:
-            #       max_id == (total_pages * increment) - 1
-            # and two additional objects are created during runtime.
-            logger.info('Cleaning up...')
-        with connection.cursor() as cursor:
-            cursor.execute(sql.format(
-                index=index,
-                page_start=page_start,
-                page_end=page_end,
-                **kwargs))
-            ser_objs = cursor.fetchone()[0]
-            if ser_objs:
-                total_objs += len(ser_objs)
-                helpers.bulk(client(), ser_objs, **es_args)
-        page_start = page_end
-    return total_objs
-
-def migrate_nodes(index, delete, increment=10000):
-    logger.info('Migrating nodes to index: {}'.format(index))
-    max_nid = AbstractNode.objects.last().id
-    total_nodes = sql_migrate(
-        index,
-        JSON_UPDATE_NODES_SQL,
-        max_nid,
-        increment,
-        spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-    logger.info('{} nodes migrated'.format(total_nodes))
-    if delete:
-        logger.info('Preparing to delete old node documents')
-        max_nid = AbstractNode.objects.last().id
-        total_nodes = sql_migrate(
-            index,
-            JSON_DELETE_NODES_SQL,
-            max_nid,
-            increment,
-            es_args={'raise_on_error': False},  # ignore 404s
-            spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-        logger.info('{} nodes marked deleted'.format(total_nodes))
-
-def migrate_files(index, delete, increment=10000):
-    logger.info('Migrating files to index: {}'.format(index))
-    max_fid = BaseFileNode.objects.last().id
-    total_files = sql_migrate(
-        index,
-        JSON_UPDATE_FILES_SQL,
-        max_fid,
-        increment,
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            index=index,
+            page_start=page_start,
+            page_end=page_end,
+            **kwargs))
+        ser_objs = cursor.fetchone()[0]
+    if ser_objs:
+        helpers.bulk(client(), ser_objs, **(es_args or {}))
+        return len(ser_objs)
+    return 0
+
+def serialize_searchable_nodes(nodes):
+    return [(node, doc_type, doc) for node, doc_type, doc in serialize_nodes(nodes) if doc is not None]
+
+def migrate_node_range(index, delete, page_start, page_end):
+    """Index the nodes with ids in (page_start, page_end] with ``serialize_nodes``. With ``delete``,
+    the nodes that should not be searchable are removed from the index in the same bulk request.
+    """
+    nodes = AbstractNode.objects.filter(id__gt=page_start, id__lte=page_end).only('id')
+    result = bulk_update_nodes(serialize_nodes if delete else serialize_searchable_nodes, nodes, index=index)
+    return result[0] if result else 0
+
+def migrate_file_range(index, delete, page_start, page_end):
+    total = sql_migrate_range(
+        index, JSON_UPDATE_FILES_SQL, page_start, page_end,
         spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-    logger.info('{} files migrated'.format(total_files))
     if delete:
-        logger.info('Preparing to delete old file documents')
-        max_fid = BaseFileNode.objects.last().id
-        total_files = sql_migrate(
-            index,
-            JSON_DELETE_FILES_SQL,
-            max_fid,
-            increment,
+        total += sql_migrate_range(
+            index, JSON_DELETE_FILES_SQL, page_start, page_end,
             es_args={'raise_on_error': False},  # ignore 404s
             spam_flagged_removed_from_search=settings.SPAM_FLAGGED_REMOVE_FROM_SEARCH)
-        logger.info('{} files marked deleted'.format(total_files))
-
-def migrate_users(index, delete, increment=10000):
-    logger.info('Migrating users to index: {}'.format(index))
-    max_uid = OSFUser.objects.last().id
-    total_users = sql_migrate(
-        index,
-        JSON_UPDATE_USERS_SQL,
-        max_uid,
-        increment)
-    logger.info('{} users migrated'.format(total_users))
+    return total
+
+def migrate_user_range(index, delete, page_start, page_end):
+    total = sql_migrate_range(index, JSON_UPDATE_USERS_SQL, page_start, page_end)
     if delete:
-        logger.info('Preparing to delete old user documents')
-        max_uid = OSFUser.objects.last().id
-        total_users = sql_migrate(
-            index,
-            JSON_DELETE_USERS_SQL,
-            max_uid,
-            increment,
+        total += sql_migrate_range(
+            index, JSON_DELETE_USERS_SQL, page_start, page_end,
             es_args={'raise_on_error': False})  # ignore 404s
-        logger.info('{} users marked deleted'.format(total_users))
+    return total
+
+MIGRATIONS = (
+    # doc type, model, range migration, default range size
+    ('node', AbstractNode, migrate_node_range, 1000),
+    ('file', BaseFileNode, migrate_file_range, 10000),
+    ('user', OSFUser, migrate_user_range, 10000),
+)
+
+def migrate_ranges(index, delete, doc_type, model, migrate_range, increment, workers=1, checkpoint=None):
+    """Migrate the objects of ``model`` in id ranges of ``increment``, running ``workers`` ranges
+    at a time so that reading from the database overlaps with indexing. Ranges recorded in
+    ``checkpoint`` are skipped, and finished ranges are recorded in it.
+
+    :return int: Number of migrated objects
+    """
+    checkpoint = checkpoint or ReindexCheckpoint()
+    last = model.objects.order_by('id').last()
+    max_id = last.id if last else 0
+    # An extra range covers objects created while migrating
+    ranges = [
+        (page_start, page_start + increment)
+        for page_start in range(0, max_id + increment, increment)
+        if not checkpoint.is_done(doc_type, page_start, page_start + increment)
+    ]
+    logger.info('Migrating {} {} ranges to index: {}'.format(len(ranges), doc_type, index))
+
+    def migrate_one(page_range):
+        try:
+            count = migrate_range(index, delete, *page_range)
+            checkpoint.mark_done(doc_type, *page_range)
+            logger.info('Migrated {} {} documents with ids in ({}, {}]'.format(count, doc_type, *page_range))
+            return count
+        finally:
+            if workers > 1:
+                # Each worker thread has its own database connection
+                connection.close()
+
+    started = time.time()
+    if workers > 1:
+        pool = ThreadPool(workers)
+        try:
+            total = sum(pool.imap_unordered(migrate_one, ranges))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        total = sum(migrate_one(page_range) for page_range in ranges)
+    elapsed = time.time() - started
+    logger.info('{} {} documents migrated in {:.1f}s ({:.1f} docs/sec)'.format(
+        total, doc_type, elapsed, total / elapsed if elapsed else 0))
+    return total
 
 def migrate_collected_metadata(index, delete):
     cgms = CollectedGuidMetadata.objects.filter(
@@ -160,13 +204,16 @@ def migrate_institutions(index):
     for inst in Institution.objects.filter(is_deleted=False):
         update_institution(inst, index)
 
-def migrate(delete, remove=False, index=None, app=None):
+def migrate(delete, remove=False, index=None, app=None, workers=1, checkpoint=None):
     """Reindexes relevant documents in ES
 
     :param bool delete: Delete documents that should not be indexed
     :param bool remove: Removes old index after migrating
     :param str index: index alias to version and migrate
     :param App app: Flask app for context
+    :param int workers: Number of id ranges to migrate at a time
+    :param str checkpoint: Path of a file recording progress. If a previous run with the same
+        checkpoint did not finish, it is resumed, in the index it was writing to.
     """
     index = index or settings.ELASTIC_INDEX
     app = app or init_app('website.settings', set_backends=True, routes=True)
@@ -178,13 +225,17 @@ def migrate(delete, remove=False, index=None, app=None):
     ctx = app.test_request_context()
     ctx.push()
 
-    new_index = set_up_index(index)
+    checkpoint = ReindexCheckpoint(checkpoint)
+    if checkpoint.index:
+        new_index = checkpoint.index
+        logger.info('Resuming migration to {}'.format(new_index))
+    else:
+        new_index = checkpoint.index = set_up_index(index)
 
     if settings.ENABLE_INSTITUTIONS:
         migrate_institutions(new_index)
-    migrate_nodes(new_index, delete=delete)
-    migrate_files(new_index, delete=delete)
-    migrate_users(new_index, delete=delete)
+    for doc_type, model, migrate_range, increment in MIGRATIONS:
+        migrate_ranges(new_index, delete, doc_type, model, migrate_range, increment, workers=workers, checkpoint=checkpoint)
     migrate_collected_metadata(new_index, delete=delete)
 
     set_up_alias(index, new_index)
@@ -192,6 +243,7 @@ def migrate(delete, remove=False, index=None, app=None):
     if remove:
         remove_old_index(new_index)
 
+    checkpoint.clear()
     ctx.pop()
 
 def set_up_index(idx):
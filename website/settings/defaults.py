@@ -42,6 +42,11 @@ EXPIRATION_TIME_DICT = {
 }
 
 CITATION_STYLES_PATH = os.path.join(BASE_PATH, 'static', 'vendor', 'bower_components', 'styles')
+# Number of parsed citation styles kept in memory by each process
+CITATION_STYLES_CACHE_SIZE = 50
+# Seconds a rendered citation is cached for. Changes to the node start a new cache entry, but
+# changes to the names of its contributors are only seen after the timeout. 0 disables the cache
+CITATION_CACHE_TIMEOUT = 60 * 10
 
 # Minimum seconds between forgot password email attempts
 SEND_EMAIL_THROTTLE = 30
@@ -116,6 +121,12 @@ ELASTIC_KWARGS = {
     # 'client_cert': None,
     # 'client_key': None
 }
+# Queue search updates in the database and index them in bulk with the process_index_queue task,
+# instead of indexing each document as soon as it changes.
+ENABLE_SEARCH_INDEX_QUEUE = False
+SEARCH_INDEX_QUEUE_BATCH_SIZE = 500
+# Seconds for which identical searches are answered from the cache. 0 disables the cache.
+SEARCH_RESULTS_CACHE_TIMEOUT = 30
 
 # Sessions
 COOKIE_NAME = 'osf'
@@ -123,6 +134,10 @@ COOKIE_NAME = 'osf'
 OSF_COOKIE_DOMAIN = None
 # server-side verification timeout
 OSF_SESSION_TIMEOUT = 30 * 24 * 60 * 60  # 30 days in seconds
+# Size of the Bloom filters of the pages visited in a session, and bits set per page.
+# 8192 bits and 6 bits per page misjudge about 2% of first visits after 1000 pages
+SESSION_VISITS_BLOOM_BITS = 8192
+SESSION_VISITS_BLOOM_HASHES = 6
 # TODO: Override SECRET_KEY in local.py in production
 SECRET_KEY = 'CHANGEME'
 SESSION_COOKIE_SECURE = SECURE_MODE
@@ -189,6 +204,32 @@ MAILGUN_API_KEY = None
 # Use Celery for file rendering
 USE_CELERY = True
 
+# Tasks whose calls queued during one request, with the same argument names, are published
+# as a single framework.celery_tasks.run_batch task
+BATCHED_CELERY_TASKS = {
+    'website.project.tasks.on_node_updated',
+    'website.preprints.tasks.on_preprint_updated',
+    'website.search.elastic_search.update_node_async',
+    'website.search.elastic_search.update_user_async',
+    'website.search.elastic_search.update_contributors_async',
+}
+
+# Seconds the total of a paginated API node list (the views with cache_list_count) is cached for,
+# by view, filters and user. Changes to nodes, their tags or contributors forget the cached totals.
+# 0 disables the cache
+API_LIST_COUNT_CACHE_TIMEOUT = 30
+# Paginated API lists that the Postgres planner estimates to be longer than this return the
+# estimate as their total, with meta.total_is_estimate, instead of counting. None always counts
+API_LIST_COUNT_ESTIMATE_THRESHOLD = None
+
+# Page visits and user actions are recorded as increments and added to their counters by the
+# flush_counters task, this many at a time.
+ANALYTICS_FLUSH_BATCH_SIZE = 10000
+
+# Number of greenlets, shared by all requests of a process, that run postcommit functions.
+# One db connection per greenlet
+POSTCOMMIT_POOL_SIZE = 30
+
 # File rendering timeout (in ms)
 MFR_TIMEOUT = 30000
 
@@ -344,6 +385,9 @@ DEFAULT_HMAC_ALGORITHM = hashlib.sha256
 WATERBUTLER_URL = 'http://localhost:7777'
 WATERBUTLER_INTERNAL_URL = WATERBUTLER_URL
 WATERBUTLER_ADDRS = ['127.0.0.1']
+# Seconds the WaterButler metadata of a file version is cached for when the file is viewed or
+# downloaded. WaterButler callbacks clear the cache of the node. 0 disables the cache
+WATERBUTLER_METADATA_CACHE_TIMEOUT = 30
 
 ####################
 #   Identifiers   #
@@ -385,6 +429,13 @@ SHARE_URL = None
 SHARE_API_TOKEN = None  # Required to send project updates to SHARE
 
 CAS_SERVER_URL = 'http://localhost:8080'
+# Seconds the profile CAS returns for an OAuth bearer token is cached for, by a hash of the token,
+# and the rejection of an invalid token. Revoking tokens clears the cache, of the current process
+# only if the cache isn't shared. 0 disables the cache
+CAS_PROFILE_CACHE_TIMEOUT = 60
+CAS_PROFILE_NEGATIVE_CACHE_TIMEOUT = 10
+# The hits and misses of the profile cache are logged every so many lookups. 0 disables the logging
+CAS_PROFILE_CACHE_METRICS_INTERVAL = 1000
 MFR_SERVER_URL = 'http://localhost:7778'
 
 ###### ARCHIVER ###########
@@ -492,6 +543,7 @@ class CeleryConfig:
     # Modules to import when celery launches
     imports = (
         'framework.celery_tasks',
+        'framework.analytics.tasks',
         'framework.email.tasks',
         'website.mailchimp_utils',
         'website.notifications.tasks',
@@ -625,6 +677,14 @@ class CeleryConfig:
                 'task': 'scripts.generate_prereg_csv',
                 'schedule': crontab(minute=0, hour=10, day_of_week=0),  # Sunday 5:00 a.m.
             },
+            'process_search_index_queue': {
+                'task': 'website.search.elastic_search.process_index_queue',
+                'schedule': crontab(minute='*'),  # Every minute
+            },
+            'flush_analytics_counters': {
+                'task': 'framework.analytics.tasks.flush_counters',
+                'schedule': crontab(minute='*'),  # Every minute
+            },
         }
 
         # Tasks that need metrics and release requirements
@@ -661,8 +721,44 @@ ENABLE_INSTITUTIONS = True
 ENABLE_VARNISH = False
 ENABLE_ESI = False
 VARNISH_SERVERS = []  # This should be set in local.py or cache invalidation won't work
+# Bans of the paths changed by a request are collapsed into regexes of at most VARNISH_BAN_MAX_LENGTH
+# characters and sent to every Varnish server, VARNISH_BAN_CONCURRENCY at a time over kept-alive connections.
+# A ban that times out or gets a 5xx is retried VARNISH_BAN_RETRIES times, after VARNISH_BAN_BACKOFF,
+# then twice that, ... seconds
+VARNISH_BAN_TIMEOUT = 0.3
+VARNISH_BAN_RETRIES = 2
+VARNISH_BAN_BACKOFF = 0.1
+VARNISH_BAN_MAX_LENGTH = 2000
+VARNISH_BAN_CONCURRENCY = 10
 ESI_MEDIA_TYPES = {'application/vnd.api+json', 'application/json'}
 
+# Requests to other services, see framework.outbound. Each service keeps up to pool_size connections
+# alive, times requests out after timeout (connect, read) seconds, and retries idempotent requests
+# that fail to connect or get a 502/503/504 `retries` times, backoff * 2 ** retry seconds apart.
+# After failure_threshold connection errors, timeouts or 502/503/504s in a row from a host of a service,
+# e.g. one of the VARNISH_SERVERS, requests to that host fail fast for reset_timeout seconds. Other 5xx,
+# e.g. the errors of storage providers that WaterButler relays, don't count. The requests to each host
+# and their latencies are logged every OUTBOUND_HTTP_METRICS_INTERVAL requests, 0 disables the logging
+OUTBOUND_HTTP_CIRCUIT_BREAKERS = True
+OUTBOUND_HTTP_METRICS_INTERVAL = 1000
+OUTBOUND_HTTP_DEFAULTS = {
+    'timeout': (3.05, 30),
+    'retries': 0,
+    'backoff': 0.5,
+    'pool_size': 10,
+    'failure_threshold': 5,
+    'reset_timeout': 30,
+}
+OUTBOUND_HTTP = {
+    'cas': {'timeout': (3.05, 10), 'retries': 2},
+    'waterbutler': {'timeout': (3.05, 60), 'retries': 2},
+    'share': {'timeout': (3.05, 60)},
+    'akismet': {'timeout': (3.05, 5)},
+    # Bans are retried by api.caching.tasks.send_ban
+    'varnish': {'timeout': VARNISH_BAN_TIMEOUT, 'pool_size': VARNISH_BAN_CONCURRENCY},
+    'ember': {'timeout': EXTERNAL_EMBER_SERVER_TIMEOUT},
+}
+
 # Used for gathering meta information about the current build
 GITHUB_API_TOKEN = None
 
@@ -670,6 +766,10 @@ GITHUB_API_TOKEN = None
 # the modm to django migration
 RUNNING_MIGRATION = False
 
+# Answer AbstractNodeQuerySet.can_view and the API's default node permission queryset
+# from the denormalized NodeReadAccess table rather than contributor subqueries
+ENABLE_NODE_READ_ACCESS_INDEX = False
+
 # External Identity Provider
 EXTERNAL_IDENTITY_PROFILE = {
     'OrcidProfile': 'ORCID',